@@ -0,0 +1,127 @@
+"""
+Adaptive quiz: pick each next question from the question bank to settle
+whichever MBTI axis is still most uncertain, and stop once all four are
+settled.
+
+The respondent is modelled by a latent preference per axis (standard
+normal prior, positive = the first letter) and picks option o with
+probability proportional to exp(ADAPTIVE_DECISIVENESS * weights_o . preference).
+The posterior is tracked with a fixed cloud of prior samples re-weighted
+by the answers so far, so an update is a few vector operations. An axis's
+confidence is the posterior probability of its more likely letter.
+
+Each step targets the least confident axis and asks the unasked item
+whose answer is expected to leave that axis with the least uncertainty
+(expected binary entropy, averaged over the predicted answers). The quiz
+ends once every axis reaches ADAPTIVE_CONFIDENCE (after at least
+ADAPTIVE_MIN_QUESTIONS), or after ADAPTIVE_MAX_QUESTIONS.
+"""
+from typing import Optional, Sequence, Tuple
+import os
+import threading
+
+import numpy as np
+
+from question_bank import QuestionBank, get_question_bank
+from scoring import AXES, build_weight_matrix
+from settings import load_env
+
+load_env()
+
+ADAPTIVE_CONFIDENCE = float(os.getenv("ADAPTIVE_CONFIDENCE", "0.8"))
+ADAPTIVE_MIN_QUESTIONS = int(os.getenv("ADAPTIVE_MIN_QUESTIONS", "4"))
+ADAPTIVE_MAX_QUESTIONS = int(os.getenv("ADAPTIVE_MAX_QUESTIONS", "10"))
+# How consistently answers follow the underlying preference in the response model
+ADAPTIVE_DECISIVENESS = float(os.getenv("ADAPTIVE_DECISIVENESS", "0.8"))
+ADAPTIVE_SAMPLES = int(os.getenv("ADAPTIVE_SAMPLES", "4000"))
+
+# (question bank item id, chosen option index)
+Response = Tuple[str, int]
+
+
+def binary_entropy(p: np.ndarray) -> np.ndarray:
+    p = np.clip(p, 1e-9, 1 - 1e-9)
+    return -(p * np.log2(p) + (1 - p) * np.log2(1 - p))
+
+
+class AdaptiveQuiz:
+    """Chooses questions and decides when to stop; holds no per-user state."""
+
+    def __init__(self, bank: QuestionBank,
+                 confidence: float = ADAPTIVE_CONFIDENCE,
+                 min_questions: int = ADAPTIVE_MIN_QUESTIONS,
+                 max_questions: int = ADAPTIVE_MAX_QUESTIONS,
+                 decisiveness: float = ADAPTIVE_DECISIVENESS,
+                 samples: int = ADAPTIVE_SAMPLES,
+                 seed: int = 0):
+        self.bank = bank
+        self.confidence = confidence
+        self.min_questions = min_questions
+        self.max_questions = min(max_questions, len(bank))
+
+        # (items, options, axes); items with fewer options get -inf logits below
+        weights = build_weight_matrix([q["weights"] for q in bank.questions])[:, :-1]
+        has_option = np.array([[o < len(q["options"]) for o in range(weights.shape[1])]
+                               for q in bank.questions])
+        self.samples = np.random.default_rng(seed).standard_normal((samples, len(AXES))).astype(np.float32)
+        logits = decisiveness * (weights @ self.samples.T)
+        logits = np.where(has_option[:, :, None], logits, -np.inf)
+        logits -= logits.max(axis=1, keepdims=True)
+        # Answer probabilities and their logs per item, option and sample
+        self.likelihood = np.exp(logits)
+        self.likelihood /= self.likelihood.sum(axis=1, keepdims=True)
+        with np.errstate(divide="ignore"):
+            self.log_likelihood = np.log(self.likelihood)
+        self.first_letter = (self.samples > 0).astype(np.float32)
+
+    def posterior(self, responses: Sequence[Response]) -> np.ndarray:
+        """Normalized weight of every prior sample given the answers."""
+        log_weights = np.zeros(len(self.samples), dtype=np.float32)
+        for item_id, option in responses:
+            log_weights += self.log_likelihood[self.bank.positions[item_id], option]
+        weights = np.exp(log_weights - log_weights.max())
+        return weights / weights.sum()
+
+    def axis_confidence(self, responses: Sequence[Response]) -> np.ndarray:
+        """Posterior probability of the more likely letter, per axis."""
+        leans_first = self.posterior(responses) @ self.first_letter
+        return np.maximum(leans_first, 1 - leans_first)
+
+    def is_finished(self, responses: Sequence[Response]) -> bool:
+        if len(responses) >= self.max_questions:
+            return True
+        if len(responses) < self.min_questions:
+            return False
+        return bool((self.axis_confidence(responses) >= self.confidence).all())
+
+    def next_question(self, responses: Sequence[Response]) -> Optional[str]:
+        """Id of the item to ask next, or None once the quiz should end."""
+        if self.is_finished(responses):
+            return None
+        asked = {self.bank.positions[item_id] for item_id, _ in responses}
+        candidates = np.array([i for i in range(len(self.bank)) if i not in asked])
+        weights = self.posterior(responses)
+        leans_first = weights @ self.first_letter
+        target = int(np.argmin(np.abs(leans_first - 0.5)))
+
+        # P(option) and P(first letter | option) for every candidate and axis
+        joint = self.likelihood[candidates] * weights
+        option_probability = joint.sum(axis=2)
+        first_given_option = joint @ self.first_letter / np.maximum(option_probability, 1e-12)[:, :, None]
+        expected_entropy = (option_probability[:, :, None] * binary_entropy(first_given_option)).sum(axis=1)
+        # Settle the target axis; the other axes only break ties
+        score = expected_entropy[:, target] + 1e-3 * expected_entropy.sum(axis=1)
+        return self.bank.questions[candidates[int(np.argmin(score))]]["id"]
+
+
+_quiz = None
+_quiz_lock = threading.Lock()
+
+
+def get_adaptive_quiz() -> AdaptiveQuiz:
+    """The process-wide engine over the configured question bank, built on first use."""
+    global _quiz
+    with _quiz_lock:
+        if _quiz is None:
+            _quiz = AdaptiveQuiz(get_question_bank())
+        return _quiz
@@ -1,132 +1,205 @@
 import streamlit as st
+import streamlit.components.v1 as components
 from datetime import datetime, timedelta
+import os
 import time
-from quiz_agent import analyze_personality, get_mistral_analysis
-import plotly.graph_objects as go
+import html
+import json
+import hashlib
+import functools
+import importlib
+import threading
+from metrics import start_exporters, timed
+from diagnostics import log_startup_report
+from question_bank import get_question_bank
 
 # Quiz Configuration
 TIMER_DURATION = 30  # seconds per question
+ENRICHMENT_POLL_SECONDS = 0.5  # how often the results page checks on the LLM analysis
 
-# Quiz questions and options
-QUESTIONS = [
-    {
-        "text": "Your friend just spilled a huge secret. You...",
-        "options": [
-            "Can't help but tell someone else",
-            "Take it to the grave",
-            "Tell only if someone really needs to know",
-            "Forget about it immediately"
-        ]
-    },
-    {
-        "text": "It's Friday night and your phone's buzzing with plans. You're most likely to...",
-        "options": [
-            "Already be out somewhere",
-            "Make up an excuse to stay in",
-            "Join if your best friend is going",
-            "Suggest a smaller hangout instead"
-        ]
-    },
-    {
-        "text": "Your brain at 3 AM usually...",
-        "options": [
-            "Replays embarrassing moments from 2015",
-            "Plans your next big life move",
-            "Thinks about random facts",
-            "Actually sleeps like a normal person"
-        ]
-    },
-    {
-        "text": "Someone disagrees with you in the group chat. You...",
-        "options": [
-            "Write a whole essay with sources cited",
-            "Send a meme and change the subject",
-            "Start a friendly debate",
-            "Leave them on read"
-        ]
-    },
-    {
-        "text": "Your idea of a perfect weekend is...",
-        "options": [
-            "Netflix marathon in your blanket fort",
-            "Spontaneous road trip with friends",
-            "Trying that new thing everyone's talking about",
-            "Finally organizing your life"
-        ]
-    },
-    {
-        "text": "When your friend is going through it, you typically...",
-        "options": [
-            "Offer practical solutions",
-            "Just listen and validate",
-            "Share your own similar experience",
-            "Distract them with fun activities"
-        ]
-    },
-    {
-        "text": "Your camera roll is full of...",
-        "options": [
-            "Aesthetic shots that never make it to Instagram",
-            "Screenshots you'll never look at again",
-            "Memes to send at the perfect moment",
-            "Photos of things you need to remember"
-        ]
-    },
-    {
-        "text": "When making big decisions, you usually...",
-        "options": [
-            "Go with your gut feeling",
-            "Make a pros and cons list",
-            "Ask everyone you know for advice",
-            "Google it extensively"
-        ]
-    },
-    {
-        "text": "Your friends would describe you as the one who...",
-        "options": [
-            "Always has a crazy story to tell",
-            "Knows everyone's secrets",
-            "Comes through in a crisis",
-            "Has the best recommendations"
-        ]
-    },
-    {
-        "text": "In group projects, you naturally become the...",
-        "options": [
-            "Ideas person with big plans",
-            "One who actually gets it done",
-            "Peacekeeper between strong personalities",
-            "Editor who fixes everything last minute"
-        ]
-    }
-]
+# Only the results page needs these (the Mistral SDK, NumPy, Plotly), so they are
+# imported there instead of here and the first question renders without them
+RESULTS_PAGE_MODULES = ("quiz_agent", "scoring", "plotly.graph_objects")
+
+QUIZ_MODE = os.getenv("QUIZ_MODE", "fixed")  # "adaptive" picks each question from the whole bank
+RENDER_CACHE_ENTRIES = int(os.getenv("RENDER_CACHE_ENTRIES", "256"))  # rendered results kept per process
+
+# Download formats: label -> (file extension, MIME type)
+EXPORT_FORMATS = {
+    "Text": ("txt", "text/plain"),
+    "JSON": ("json", "application/json"),
+    "HTML": ("html", "text/html"),
+}
+
+# Every question with its option weights comes from the question bank file;
+# the fixed quiz is the classic ten of them, in order
+BANK = get_question_bank()
+QUESTIONS = BANK.fixed_quiz
+FIXED_IDS = [q['id'] for q in QUESTIONS]
+
+def format_answer_code(asked, indices):
+    # The fixed quiz is one base-4 digit (the option index) per question, e.g. "0312...";
+    # any other question set names each item too, e.g. "recharge.1-packing.0-..."
+    if asked == FIXED_IDS:
+        return "".join(str(index) for index in indices)
+    return "-".join(f"{item_id}.{index}" for item_id, index in zip(asked, indices))
+
+def parse_answer_code(code):
+    # Returns (asked item ids, option indices), or None for a malformed code
+    if code.isdigit():
+        if len(code) != len(QUESTIONS):
+            return None
+        pairs = list(zip(FIXED_IDS, code))
+    else:
+        pairs = [tuple(pair.split(".", 1)) for pair in code.split("-")]
+    asked, indices = [], []
+    for pair in pairs:
+        if len(pair) != 2 or BANK.get(pair[0]) is None or pair[0] in asked or not pair[1].isdigit():
+            return None
+        if int(pair[1]) >= len(BANK.get(pair[0])['options']):
+            return None
+        asked.append(pair[0])
+        indices.append(int(pair[1]))
+    return asked, indices
+
+def asked_questions():
+    return [BANK.get(item_id) for item_id in st.session_state.asked]
+
+def answer_texts(indices, questions):
+    # The analysis functions take the chosen option text keyed by question number
+    return {n: questions[n]['options'][index] for n, index in enumerate(indices)}
+
+def next_question_id(asked, indices):
+    # The item to show after these answers, or None once the quiz is over
+    if QUIZ_MODE != "adaptive":
+        return FIXED_IDS[len(indices)] if len(indices) < len(FIXED_IDS) else None
+    from adaptive import get_adaptive_quiz
+    return get_adaptive_quiz().next_question(list(zip(asked, indices)))
+
+def is_finished_quiz(asked, indices):
+    # Whether a shared link holds a whole quiz as this mode would have asked it;
+    # anything shorter would otherwise show results (and call upstream) for a partial quiz
+    if QUIZ_MODE != "adaptive":
+        return asked == FIXED_IDS
+    return next_question_id(asked, indices) is None
+
+def question_limit():
+    if QUIZ_MODE != "adaptive":
+        return len(QUESTIONS)
+    from adaptive import get_adaptive_quiz
+    return get_adaptive_quiz().max_questions
 
 def initialize_session_state():
-    if 'current_question' not in st.session_state:
-        st.session_state.current_question = 0
     if 'answers' not in st.session_state:
-        st.session_state.answers = {}
+        # Option index per answered question; a shared or reloaded results
+        # link carries the whole set in the URL
+        code = st.query_params.get("answers", "")
+        shared = parse_answer_code(code)
+        if shared and not is_finished_quiz(*shared):
+            shared = None
+        if code and shared is None:
+            # Anything but a finished quiz starts a fresh one
+            del st.query_params["answers"]
+        st.session_state.asked, st.session_state.answers = shared or ([], [])
+    if 'current_question' not in st.session_state:
+        st.session_state.current_question = len(st.session_state.answers)
     if 'quiz_complete' not in st.session_state:
-        st.session_state.quiz_complete = False
+        # Links are only written for finished quizzes
+        st.session_state.quiz_complete = bool(st.session_state.answers)
+    if 'next_item' not in st.session_state:
+        st.session_state.next_item = None if st.session_state.quiz_complete else next_question_id([], [])
     if 'start_time' not in st.session_state:
         st.session_state.start_time = None
+    if 'analysis_cache' not in st.session_state:
+        st.session_state.analysis_cache = {}
+    if 'analysis_job' not in st.session_state:
+        st.session_state.analysis_job = None
+    if 'celebrated' not in st.session_state:
+        st.session_state.celebrated = False
+
+# Countdown that ticks in the browser; the server only sends the seconds left
+TIMER_HTML = """
+<div style="font-family: 'Source Sans Pro', sans-serif;">
+    <div style="height: 8px; border-radius: 4px; background: rgba(111, 231, 219, 0.2);">
+        <div id="bar" style="height: 100%; width: 100%; border-radius: 4px; background: rgb(111, 231, 219);"></div>
+    </div>
+    <p id="label" style="margin: 8px 0 0;">⏱️ Time remaining: {remaining} seconds</p>
+</div>
+<script>
+    const duration = {duration}, remaining = {remaining}, started = performance.now();
+    const bar = document.getElementById("bar"), label = document.getElementById("label");
+    function tick() {{
+        const left = Math.max(remaining - (performance.now() - started) / 1000, 0);
+        bar.style.width = (100 * left / duration) + "%";
+        label.textContent = left > 0
+            ? "⏱️ Time remaining: " + Math.ceil(left) + " seconds"
+            : "⏰ Time's up! Just go with your gut.";
+        if (left > 0) setTimeout(tick, 250);
+    }}
+    tick();
+</script>
+"""
+
+# Newer Streamlit releases embed raw HTML with st.iframe instead of components.html
+embed_html = getattr(st, "iframe", None) or components.html
 
 def display_timer():
-    if st.session_state.start_time:
-        elapsed_time = datetime.now() - st.session_state.start_time
-        remaining_time = max(TIMER_DURATION - elapsed_time.seconds, 0)
-        progress = remaining_time / TIMER_DURATION
-        st.progress(progress)
-        st.write(f"⏱️ Time remaining: {remaining_time} seconds")
-        return remaining_time
-    return TIMER_DURATION
-
-def handle_answer(answer):
-    st.session_state.answers[st.session_state.current_question] = answer
+    # The page is re-sent only when the question changes, which restarts the countdown
+    if st.session_state.start_time is None:
+        st.session_state.start_time = datetime.now()
+    deadline = st.session_state.start_time + timedelta(seconds=TIMER_DURATION)
+    remaining_time = max((deadline - datetime.now()).total_seconds(), 0)
+    embed_html(TIMER_HTML.format(remaining=round(remaining_time, 1), duration=TIMER_DURATION), height=50)
+    return remaining_time
+
+def handle_answer(option_index):
+    # Button callback: runs before the rerun, so the rerun renders the next question straight away
+    st.session_state.answers.append(option_index)
+    st.session_state.asked.append(st.session_state.next_item)
     st.session_state.current_question += 1
+    st.session_state.next_item = next_question_id(st.session_state.asked, st.session_state.answers)
     st.session_state.start_time = datetime.now()
 
+@st.fragment
+def render_question():
+    # Answer clicks rerun only this fragment, not the title, intro and session setup around it
+    if st.session_state.next_item is None:
+        st.session_state.quiz_complete = True
+        # Make the results page addressable, so reloading or sharing the link brings it back
+        st.query_params["answers"] = format_answer_code(st.session_state.asked, st.session_state.answers)
+        st.rerun()  # the results page is outside the fragment
+    current_q = BANK.get(st.session_state.next_item)
+    
+    # Display progress; the adaptive quiz may finish before its limit
+    limit = question_limit()
+    progress = st.session_state.current_question / limit
+    st.progress(progress)
+    if QUIZ_MODE == "adaptive":
+        st.write(f"Question {st.session_state.current_question + 1} (at most {limit})")
+    else:
+        st.write(f"Question {st.session_state.current_question + 1} of {limit}")
+    display_timer()
+    
+    # Display question and options
+    st.write(f"### {current_q['text']}")
+    
+    for i, option in enumerate(current_q['options']):
+        st.button(option, key=f"q{st.session_state.current_question}_opt{i}", use_container_width=True,
+                  on_click=handle_answer, args=(i,))
+
+@st.cache_resource(show_spinner=False)
+def warm_up_results_page():
+    # Once per process, load the results page dependencies in the background
+    # while the user is still answering questions
+    def load():
+        for name in RESULTS_PAGE_MODULES:
+            importlib.import_module(name)
+    thread = threading.Thread(target=load, name="results-warmup", daemon=True)
+    thread.start()
+    return thread
+
 def create_trait_radar_chart(traits, values):
+    import plotly.graph_objects as go
     fig = go.Figure(data=go.Scatterpolar(
         r=values,
         theta=traits,
@@ -149,18 +222,12 @@ def create_trait_radar_chart(traits, values):
     )
     return fig
 
-def create_personality_bars(personality_result):
-    # Create sample scores for personality dimensions
-    dimensions = {
-        "Introversion-Extroversion": 65,
-        "Intuition-Sensing": 80,
-        "Thinking-Feeling": 45,
-        "Judging-Perceiving": 70
-    }
-    
+def create_personality_bars(axis_scores):
+    # axis_scores maps each dimension label to the % leaning towards its first letter
+    import plotly.graph_objects as go
     fig = go.Figure()
     
-    for dim, score in dimensions.items():
+    for dim, score in axis_scores.items():
         fig.add_trace(go.Bar(
             x=[score],
             y=[dim],
@@ -180,7 +247,165 @@ def create_personality_bars(personality_result):
     )
     return fig
 
+def render_type_box(personality_type):
+    return f"""
+                <div style='background-color: rgba(111, 231, 219, 0.1); 
+                           padding: 20px; 
+                           border-radius: 10px; 
+                           border: 2px solid rgba(111, 231, 219, 0.5);'>
+                    <h3 style='text-align: center;'>{personality_type}</h3>
+                </div>
+                """
+
+def render_headline(result):
+    st.markdown(f"## {result['title']}")
+    st.markdown(f"# {result['emoji']}")
+    
+    # Display personality type with custom styling
+    st.markdown(render_type_box(result['type']), unsafe_allow_html=True)
+    
+    # Display main description
+    st.markdown("### Here's Your Personality Breakdown")
+    st.markdown(result['description'] or "✨ Your full breakdown is on its way...")
+
+def merge_partial(local_result, partial):
+    # Streamed sections replace the local placeholders as soon as they have content
+    if not partial:
+        return local_result
+    return {key: partial.get(key) or value for key, value in local_result.items()}
+
+@st.fragment(run_every=ENRICHMENT_POLL_SECONDS)
+def render_pending_headline(job, local_result):
+    # Polls the background analysis without rerunning the rest of the page
+    if job.done():
+        st.rerun()
+    queue = job.queue_status()
+    if queue:
+        st.caption(
+            f"⏳ Busy moment! You're #{queue['position']} in line - "
+            f"about {queue['estimated_wait']:.0f}s until your full analysis starts."
+        )
+    render_headline(merge_partial(local_result, job.partial))
+
+CARD_HTML = """
+<div style='background-color: rgba(111, 231, 219, 0.1); 
+           padding: 10px; 
+           margin: 5px 0; 
+           border-radius: 5px;'>
+    {marker} {text}
+</div>
+"""
+
+def render_cards(items, marker):
+    return "".join(CARD_HTML.format(marker=marker, text=item) for item in items)
+
+def result_fingerprint(result, axis_scores):
+    # Identifies everything the results page shows, so identical results share a render bundle
+    payload = json.dumps([result, axis_scores], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+@st.cache_resource(max_entries=RENDER_CACHE_ENTRIES, show_spinner=False)
+def build_render_bundle(fingerprint, _result, _axis_scores):
+    # The parts of the results page that depend only on the result, built once per
+    # fingerprint and shared by every session showing it (underscored arguments
+    # aren't hashed; the fingerprint covers them). Exports are added on first download.
+    with timed("render_bundle"):
+        bundle = {
+            "result": _result,
+            "axis_scores": _axis_scores,
+            "traits_html": render_cards(_result['traits'], "✦"),
+            "strengths_html": render_cards(_result['strengths'], "•"),
+            "exports": {},
+        }
+        if _axis_scores:
+            from scoring import pole_scores
+            poles = pole_scores(_axis_scores)
+            bundle["bars"] = create_personality_bars(_axis_scores)
+            bundle["radar"] = create_trait_radar_chart(list(poles.keys()), list(poles.values()))
+    return bundle
+
+def export_text(result, axis_scores):
+    return f"""
+            Your Personality Scoop! ✨
+            
+            You're a: {result['type']}
+            
+            The Full Story:
+            {result['description']}
+            
+            Your Superpowers:
+            {', '.join(result['strengths'])}
+            
+            What Makes You Special:
+            {', '.join(result['traits'])}
+            """
+
+def export_json(result, axis_scores):
+    fields = ("type", "title", "emoji", "description", "traits", "strengths", "growth_areas")
+    return json.dumps({**{key: result.get(key) for key in fields}, "scores": axis_scores},
+                      indent=2, ensure_ascii=False)
+
+EXPORT_HTML = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>
+    body {{ font-family: 'Source Sans Pro', sans-serif; max-width: 720px; margin: 40px auto; padding: 0 20px; color: #262730; }}
+    .type {{ text-align: center; padding: 20px; border-radius: 10px; border: 2px solid rgba(111, 231, 219, 0.5);
+             background-color: rgba(111, 231, 219, 0.1); }}
+    .card {{ background-color: rgba(111, 231, 219, 0.1); padding: 10px; margin: 5px 0; border-radius: 5px; }}
+    .bar {{ height: 12px; border-radius: 6px; background: rgba(111, 231, 219, 0.2); }}
+    .bar div {{ height: 100%; border-radius: 6px; background: rgb(111, 231, 219); }}
+</style>
+</head>
+<body>
+<h1>{emoji} {title}</h1>
+<h2 class="type">{type}</h2>
+{description}
+<h3>✨ What Makes You, You</h3>
+{traits}
+<h3>🌟 Your Superpowers</h3>
+{strengths}
+<h3>🌱 Room to Grow</h3>
+{growth_areas}
+{scores}
+</body>
+</html>
+"""
+
+def export_html(result, axis_scores):
+    cards = lambda items: "".join(f'<div class="card">{html.escape(item)}</div>\n' for item in items)
+    paragraphs = [line.strip() for line in (result['description'] or "").splitlines() if line.strip()]
+    scores = ""
+    if axis_scores:
+        scores = "<h3>📊 Your Vibe Breakdown</h3>\n" + "".join(
+            f'<p>{html.escape(label)}: {score:g}%</p><div class="bar"><div style="width: {score:g}%"></div></div>\n'
+            for label, score in axis_scores.items())
+    return EXPORT_HTML.format(
+        title=html.escape(result['title']),
+        emoji=html.escape(result['emoji']),
+        type=html.escape(result['type']),
+        description="".join(f"<p>{html.escape(paragraph)}</p>\n" for paragraph in paragraphs),
+        traits=cards(result['traits']),
+        strengths=cards(result['strengths']),
+        growth_areas=cards(result.get('growth_areas') or []),
+        scores=scores,
+    )
+
+EXPORT_BUILDERS = {"Text": export_text, "JSON": export_json, "HTML": export_html}
+
+def export_payload(bundle, export_format):
+    # Runs when the download is clicked, not on every rerun; each format is built at most once per bundle
+    if export_format not in bundle["exports"]:
+        with timed("export", format=EXPORT_FORMATS[export_format][0]):
+            bundle["exports"][export_format] = EXPORT_BUILDERS[export_format](
+                bundle["result"], bundle["axis_scores"])
+    return bundle["exports"][export_format]
+
 def main():
+    start_exporters()
+    log_startup_report()
     st.title("✨ What's Your Vibe? Personality Quiz")
     st.markdown("""
     ### Hey there! 
@@ -191,114 +416,82 @@ def main():
     initialize_session_state()
 
     if not st.session_state.quiz_complete:
-        if st.session_state.current_question < len(QUESTIONS):
-            current_q = QUESTIONS[st.session_state.current_question]
-            
-            # Display progress
-            progress = st.session_state.current_question / len(QUESTIONS)
-            st.progress(progress)
-            st.write(f"Question {st.session_state.current_question + 1} of {len(QUESTIONS)}")
-            
-            # Display question and options
-            st.write(f"### {current_q['text']}")
-            
-            for option in current_q['options']:
-                if st.button(option, key=option, use_container_width=True):
-                    handle_answer(option)
-                    st.rerun()
-                
-        else:
-            st.session_state.quiz_complete = True
-            st.rerun()
+        render_question()
+        warm_up_results_page()
     
     else:
-        # Display results with a more casual loading message
-        with st.spinner("✨ Analyzing your vibes..."):
-            personality_result = analyze_personality(st.session_state.answers, QUESTIONS)
-            
-        st.success("The results are in! 🎉")
-        st.balloons()
+        from quiz_agent import submit_analysis, local_analysis
+        from scoring import score_answers
+        
+        questions = asked_questions()
+        answers = answer_texts(st.session_state.answers, questions)
+        if st.session_state.analysis_job is None:
+            # Start the LLM analysis once; later reruns attach to the same job
+            st.session_state.analysis_job = submit_analysis(
+                answers, questions,
+                session_cache=st.session_state.analysis_cache
+            )
+        job = st.session_state.analysis_job
+        
+        # Show the instant local result until the full analysis lands
+        enriched = job.done()
+        personality_result = job.result() if enriched else local_analysis(answers, questions)
+        local_scores = score_answers(answers, questions)
+        axis_scores = local_scores['axes'] if local_scores else None
+        bundle = build_render_bundle(result_fingerprint(personality_result, axis_scores),
+                                     personality_result, axis_scores)
+        
+        if enriched:
+            st.success("The results are in! 🎉")
+            if not st.session_state.celebrated:
+                st.balloons()
+                st.session_state.celebrated = True
+        else:
+            # Display results with a more casual loading message
+            st.info("✨ Here's your quick read - still analyzing your vibes for the full scoop...")
         
         # Create tabs for different sections of the results
         tab1, tab2 = st.tabs(["The Scoop", "The Details"])
         
         with tab1:
-            st.markdown(f"## {personality_result['title']}")
-            st.markdown(f"# {personality_result['emoji']}")
-            
-            # Display personality type with custom styling
-            st.markdown(
-                f"""
-                <div style='background-color: rgba(111, 231, 219, 0.1); 
-                           padding: 20px; 
-                           border-radius: 10px; 
-                           border: 2px solid rgba(111, 231, 219, 0.5);'>
-                    <h3 style='text-align: center;'>{personality_result['type']}</h3>
-                </div>
-                """, 
-                unsafe_allow_html=True
-            )
-            
-            # Display main description
-            st.markdown("### Here's Your Personality Breakdown")
-            st.markdown(personality_result['description'])
+            if enriched:
+                render_headline(personality_result)
+            else:
+                render_pending_headline(job, personality_result)
         
         with tab2:
             col1, col2 = st.columns(2)
             
             with col1:
                 st.markdown("### ✨ What Makes You, You")
-                for trait in personality_result['traits']:
-                    st.markdown(
-                        f"""
-                        <div style='background-color: rgba(111, 231, 219, 0.1); 
-                                   padding: 10px; 
-                                   margin: 5px 0; 
-                                   border-radius: 5px;'>
-                            ✦ {trait}
-                        </div>
-                        """, 
-                        unsafe_allow_html=True
-                    )
+                st.markdown(bundle["traits_html"], unsafe_allow_html=True)
             
             with col2:
                 st.markdown("### 🌟 Your Superpowers")
-                for strength in personality_result['strengths']:
-                    st.markdown(
-                        f"""
-                        <div style='background-color: rgba(111, 231, 219, 0.1); 
-                                   padding: 10px; 
-                                   margin: 5px 0; 
-                                   border-radius: 5px;'>
-                            • {strength}
-                        </div>
-                        """, 
-                        unsafe_allow_html=True
-                    )
+                st.markdown(bundle["strengths_html"], unsafe_allow_html=True)
+            
+            # Dimension scores come from the local scorer, not the LLM
+            if "bars" in bundle:
+                st.markdown("### 📊 Your Vibe Breakdown")
+                st.plotly_chart(bundle["bars"], use_container_width=True)
+                st.plotly_chart(bundle["radar"], use_container_width=True)
         
-        # Add a download button for full report
+        # Add a download button for full report, built only when clicked
+        export_format = st.radio("Save as", list(EXPORT_FORMATS), horizontal=True, key="export_format")
+        extension, mime = EXPORT_FORMATS[export_format]
         st.download_button(
             label="Save Your Results ✨",
-            data=f"""
-            Your Personality Scoop! ✨
-            
-            You're a: {personality_result['type']}
-            
-            The Full Story:
-            {personality_result['description']}
-            
-            Your Superpowers:
-            {', '.join(personality_result['strengths'])}
-            
-            What Makes You Special:
-            {', '.join(personality_result['traits'])}
-            """,
-            file_name="my_personality_scoop.txt",
-            mime="text/plain",
+            data=functools.partial(export_payload, bundle, export_format),
+            file_name=f"my_personality_scoop.{extension}",
+            mime=mime,
+            on_click="ignore",
         )
         
+        st.caption("🔗 Want to share your results? This page's link brings them right back.")
+        
         if st.button("Take the Quiz Again!", use_container_width=True):
             st.session_state.clear()
+            st.query_params.clear()
             st.rerun()
 
 if __name__ == "__main__":
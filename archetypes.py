@@ -0,0 +1,322 @@
+"""
+Offline archetype library served from a memory-mapped index.
+
+    python archetypes.py build [--output archetypes.idx] [--patterns-per-type 4] [--patterns-file F] [--offline]
+    python archetypes.py info [--index archetypes.idx]
+
+``build`` pre-generates a narrative for each of the 16 types plus full
+analyses for common answer patterns and writes them to one index file.
+``--offline`` builds the type narratives from the canned local tables
+without calling the API. Answer patterns default to the answer vectors
+that express each type most strongly; pass a JSONL file of answer code
+integers (or answer-index lists) to index the patterns real users pick.
+
+File layout: a fixed header, a JSON metadata block, a table of
+(key, length, offset) records sorted by key, then the UTF-8 JSON payloads.
+The file is mapped read-only, so every worker process on a host shares
+the same page-cache copy instead of loading its own.
+"""
+from typing import Dict, List, Optional, Tuple
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+
+import numpy as np
+
+from scoring import (AXES, TYPE_TABLE, WEIGHT_MATRIX, answer_code, decode_answer_code,
+                     score_indices, tiebreak_scores, type_letters)
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+ARCHETYPE_INDEX_PATH = os.getenv("ARCHETYPE_INDEX", os.path.join(ROOT, "archetypes.idx"))
+
+MAGIC = b"MBTIARC1"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<8sIII4x")  # magic, version, record count, metadata length
+RECORD_DTYPE = np.dtype([("key", "<u4"), ("length", "<u4"), ("offset", "<u8")])
+
+# Answer codes use 2 bits per question, so 10 questions fill 20 bits; the
+# type-level narrative sits in the slot just above them
+CODE_BITS = 2 * WEIGHT_MATRIX.shape[0]
+GENERIC = 1 << CODE_BITS
+TYPE_INDEX = {str(mbti): i for i, mbti in enumerate(TYPE_TABLE)}
+
+
+def archetype_key(mbti: str, code: Optional[int] = None) -> int:
+    """Index key for a type's narrative, or for one answer pattern of that type."""
+    return (TYPE_INDEX[mbti] << (CODE_BITS + 1)) | (GENERIC if code is None else code)
+
+
+def questions_fingerprint(questions) -> str:
+    """Identifies the question set (and the weights that typed its patterns) an index was built for."""
+    payload = json.dumps([[q["text"], q["options"]] for q in questions], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8") + WEIGHT_MATRIX.tobytes()).hexdigest()[:16]
+
+
+def write_index(path: str, entries: Dict[int, dict], meta: dict):
+    """Write ``entries`` (key -> result dict) to ``path`` atomically."""
+    keys = sorted(entries)
+    payloads = [json.dumps(entries[k], ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+                for k in keys]
+    meta_bytes = json.dumps(meta, ensure_ascii=False).encode("utf-8")
+    meta_bytes += b" " * (-(HEADER.size + len(meta_bytes)) % 8)  # keep the table 8-byte aligned
+
+    records = np.zeros(len(keys), dtype=RECORD_DTYPE)
+    offset = HEADER.size + len(meta_bytes) + records.nbytes
+    for i, (key, payload) in enumerate(zip(keys, payloads)):
+        records[i] = (key, len(payload), offset)
+        offset += len(payload)
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(keys), len(meta_bytes)))
+        f.write(meta_bytes)
+        f.write(records.tobytes())
+        for payload in payloads:
+            f.write(payload)
+    os.replace(tmp_path, path)
+
+
+class ArchetypeIndex:
+    """Read-only, memory-mapped view of an archetype index file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count, meta_length = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self._map.close()
+            raise ValueError(f"{path} is not a version {FORMAT_VERSION} archetype index")
+        self.meta = json.loads(self._map[HEADER.size:HEADER.size + meta_length])
+        # A view onto the mapped pages, not a copy
+        self._records = np.frombuffer(self._map, dtype=RECORD_DTYPE, count=count,
+                                      offset=HEADER.size + meta_length)
+        self._keys = self._records["key"]
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def get(self, key: int) -> Optional[dict]:
+        i = int(np.searchsorted(self._keys, key))
+        if i == len(self._keys) or self._keys[i] != key:
+            return None
+        record = self._records[i]
+        start = int(record["offset"])
+        return json.loads(self._map[start:start + int(record["length"])])
+
+    def lookup(self, mbti: str, code: Optional[int] = None) -> Tuple[Optional[str], Optional[dict]]:
+        """
+        Find the best entry for a type and answer code.
+
+        Returns ("exact", result) for an indexed answer pattern, ("type",
+        result) for the type-level narrative, or (None, None).
+        """
+        if mbti not in TYPE_INDEX:
+            return None, None
+        if code is not None:
+            result = self.get(archetype_key(mbti, code))
+            if result is not None:
+                return "exact", result
+        result = self.get(archetype_key(mbti))
+        return ("type", result) if result is not None else (None, None)
+
+    def close(self):
+        self._records = self._keys = None
+        self._map.close()
+
+
+_index = None
+_index_checked = False
+_index_lock = threading.Lock()
+
+
+def get_archetype_index() -> Optional[ArchetypeIndex]:
+    """
+    The process-wide index, opened on first use; None if there is no usable
+    index file. An index built with a different prompt version than this
+    process sends (PROMPT_VERSION, prompt mode, split-mode models) is refused.
+    """
+    global _index, _index_checked
+    with _index_lock:
+        if not _index_checked:
+            _index_checked = True
+            if os.path.exists(ARCHETYPE_INDEX_PATH):
+                try:
+                    index = ArchetypeIndex(ARCHETYPE_INDEX_PATH)
+                except (OSError, ValueError) as e:
+                    print(f"Could not open archetype index: {str(e)}")
+                else:
+                    from quiz_agent import current_prompt_version
+                    built_for, current = index.meta.get("prompt_version"), current_prompt_version()
+                    if built_for == current:
+                        _index = index
+                    else:
+                        print(f"Ignoring archetype index {ARCHETYPE_INDEX_PATH}: built for prompt version "
+                              f"{built_for!r}, this process sends {current!r}; rebuild it")
+                        index.close()
+        return _index
+
+
+# --- Offline build -----------------------------------------------------------
+
+ARCHETYPE_PROMPT = """Write the general personality profile for the MBTI type {mbti}, for someone who just took a casual personality quiz.
+        Cover their cognitive function stack, energy style, decision-making, social style, stress patterns and how the type shows up in friendships and work.
+        Keep it warm and relatable, and don't refer to specific quiz answers - this profile is shared by everyone of the type.
+
+"""
+
+
+def prototypical_patterns(per_type: int) -> Dict[str, List[int]]:
+    """
+    The answer codes that express each type most strongly.
+
+    Scores every possible complete answer vector (4^10 of them) in one batch
+    and ranks each type's vectors by their weakest axis, so the chosen
+    patterns sit well inside the type rather than on a boundary.
+    """
+    num_questions = WEIGHT_MATRIX.shape[0]
+    codes = np.arange(4 ** num_questions, dtype=np.int64)
+    indices = ((codes[:, None] // 4 ** np.arange(num_questions - 1, -1, -1)) % 4).astype(np.int8)
+    percentages = score_indices(indices)
+    types = type_letters(percentages, tiebreak_scores(indices))
+    margins = np.abs(percentages - 50).min(axis=1)
+
+    patterns = {}
+    for mbti in TYPE_INDEX:
+        members = np.flatnonzero(types == mbti)
+        best = members[np.argsort(-margins[members], kind="stable")[:per_type]]
+        patterns[mbti] = [int(c) for c in codes[best]]
+    return patterns
+
+
+def patterns_from_file(path: str, questions) -> Dict[str, List[int]]:
+    """Read answer patterns (one code or index list per line) and group them by local type."""
+    patterns = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            value = json.loads(line)
+            code = value if isinstance(value, int) else answer_code(value)
+            if code is None:
+                continue
+            indices = decode_answer_code(code, len(questions))
+            mbti = type_letters(score_indices(indices), tiebreak_scores(indices))
+            patterns.setdefault(str(mbti), []).append(code)
+    return patterns
+
+
+def answers_for_code(code: int, questions) -> Dict[int, str]:
+    indices = decode_answer_code(code, len(questions))
+    return {i: questions[i]["options"][int(o)] for i, o in enumerate(indices)}
+
+
+def offline_type_narrative(mbti: str) -> dict:
+    """A type narrative assembled from the canned local tables, no API call needed."""
+    from quiz_agent import LETTER_STRENGTHS, LETTER_TRAITS, canned_result
+
+    poles = {}
+    for first, second, label in AXES:
+        poles[first], poles[second] = label.split("-")
+    description = (
+        f"As an {mbti}, you lead with {', '.join(poles[letter] for letter in mbti[:-1])} "
+        f"and {poles[mbti[-1]]}. "
+        + "In a nutshell: " + ", ".join(LETTER_TRAITS[letter].lower() for letter in mbti) + "."
+        + "\n\nYour superpowers: " + ", ".join(LETTER_STRENGTHS[letter].lower() for letter in mbti) + "."
+    )
+    return canned_result(mbti, description)
+
+
+def generate_type_narrative(mbti: str) -> Optional[dict]:
+    """Ask the LLM for a type-level narrative in the usual response format."""
+    from mistralai.models.chat_completion import ChatMessage
+    import quiz_agent
+
+    prompt = ARCHETYPE_PROMPT.format(mbti=mbti) + quiz_agent.TEXT_FORMAT_INSTRUCTIONS
+    response = quiz_agent.get_shared_client().chat(
+        model=quiz_agent.ANALYSIS_MODEL,
+        messages=[ChatMessage(role="system", content=quiz_agent.SYSTEM_PROMPT),
+                  ChatMessage(role="user", content=prompt)],
+        temperature=quiz_agent.ANALYSIS_TEMPERATURE,
+        max_tokens=quiz_agent.ANALYSIS_MAX_TOKENS,
+    )
+    if not response.choices or not response.choices[0].message.content:
+        return None
+    result = quiz_agent.parse_response_text(response.choices[0].message.content)
+    result["type"] = mbti  # the parsed TYPE line carries an explanation too
+    return result
+
+
+def build(output: str, per_type: int, patterns_file: Optional[str], offline: bool):
+    import quiz_agent
+    from app import QUESTIONS
+
+    entries = {}
+    started = time.monotonic()
+    for mbti in TYPE_INDEX:
+        result = offline_type_narrative(mbti) if offline else generate_type_narrative(mbti)
+        if result is None:
+            print(f"{mbti}: empty response, using the offline narrative")
+            result = offline_type_narrative(mbti)
+        entries[archetype_key(mbti)] = result
+        print(f"{mbti}: type narrative ({len(result['description'])} chars)")
+
+    pattern_count = 0
+    if not offline:
+        patterns = (patterns_from_file(patterns_file, QUESTIONS) if patterns_file
+                    else prototypical_patterns(per_type))
+        analyzer = quiz_agent.PersonalityAnalyzer(reuse_results=False)
+        for mbti, codes in patterns.items():
+            for code in codes:
+                result = analyzer.analyze_responses(answers_for_code(code, QUESTIONS), QUESTIONS)
+                if analyzer.used_fallback:
+                    print(f"{mbti} pattern {code}: analysis failed ({analyzer.fallback_reason}), skipped")
+                    continue
+                entries[archetype_key(mbti, code)] = result
+                pattern_count += 1
+        print(f"{pattern_count} answer patterns analysed")
+
+    write_index(output, entries, {
+        "built": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "questions": questions_fingerprint(QUESTIONS),
+        "model": None if offline else quiz_agent.ANALYSIS_MODEL,
+        "prompt_version": quiz_agent.current_prompt_version(),
+        "types": len(TYPE_INDEX),
+        "patterns": pattern_count,
+    })
+    print(f"Wrote {len(entries)} entries ({os.path.getsize(output) / 1024:.0f} KiB) to {output} "
+          f"in {time.monotonic() - started:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    build_parser = commands.add_parser("build", help="generate the library and write the index")
+    build_parser.add_argument("--output", default=ARCHETYPE_INDEX_PATH)
+    build_parser.add_argument("--patterns-per-type", type=int, default=4,
+                              help="answer patterns to analyse per type (0 for type narratives only)")
+    build_parser.add_argument("--patterns-file", help="JSONL of answer codes or index lists to index instead")
+    build_parser.add_argument("--offline", action="store_true",
+                              help="build type narratives from the canned tables without calling the API")
+    info_parser = commands.add_parser("info", help="describe an index file")
+    info_parser.add_argument("--index", default=ARCHETYPE_INDEX_PATH)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        build(args.output, args.patterns_per_type, args.patterns_file, args.offline)
+    else:
+        index = ArchetypeIndex(args.index)
+        generic = int(np.count_nonzero(index._keys & GENERIC))
+        print(json.dumps(index.meta, indent=2))
+        print(f"{len(index)} entries: {generic} type narratives, {len(index) - generic} answer patterns")
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
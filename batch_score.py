@@ -0,0 +1,409 @@
+"""
+Score exported quiz submissions in bulk.
+
+    python batch_score.py submissions.jsonl --output scored.jsonl [--enrich] [--workers 8] [--concurrency 4]
+
+Each input line is a JSON object with an optional ``id`` and the answers
+as ``answers`` (a list of option indices, -1 for a skipped question, or a
+mapping of question number to answer text) or ``code`` (a packed answer
+code); a bare list or integer works too. Types and axis scores are
+computed locally in a process pool, a chunk of lines at a time. With
+``--enrich`` every scored record also gets the full LLM analysis through
+``analyze_personality`` from a bounded pool of workers, so results already
+in the cache, the result store or the archetype library cost nothing and
+the shared rate limits still apply.
+
+Output is one JSON line per input line, in input order. Progress is
+checkpointed after every chunk; run the same command again after an
+interruption to pick up where it stopped (``--restart`` starts over).
+The summary reports throughput, token usage and an estimated cost.
+"""
+from typing import Dict, Iterator, List, Optional, Tuple
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
+from question_bank import get_question_bank
+from scoring import AXES, decode_answer_code, encode_answers, score_indices, tiebreak_scores, type_letters
+
+# USD per million (prompt, completion) tokens; override with --price MODEL=IN,OUT
+MODEL_PRICES = {
+    "mistral-medium": (2.7, 8.1),
+    "mistral-small": (0.2, 0.6),
+}
+
+CHECKPOINT_VERSION = 1
+ENRICH_RETRY_SECONDS = 2.0  # wait before retrying an analysis that fell back, times the attempt number
+AXIS_LABELS = [label for _, _, label in AXES]
+
+_questions = None
+
+
+def _load_questions():
+    global _questions
+    if _questions is None:
+        # Straight from the question bank: importing app would pull in Streamlit in every worker
+        _questions = get_question_bank().fixed_quiz
+    return _questions
+
+
+def record_indices(record, questions) -> Tuple[Optional[np.ndarray], Optional[str]]:
+    """Option indices for one input record, or an error message."""
+    answers = record
+    if isinstance(record, dict):
+        answers = record.get("answers", record.get("code"))
+    num_questions = len(questions)
+    if isinstance(answers, bool):
+        return None, "answers must be a list, a mapping or an answer code"
+    if isinstance(answers, int):
+        if not 0 <= answers < 4 ** num_questions:
+            return None, f"answer code {answers} out of range"
+        return decode_answer_code(answers, num_questions), None
+    if isinstance(answers, list) and all(isinstance(a, int) and not isinstance(a, bool) for a in answers):
+        if len(answers) != num_questions:
+            return None, f"expected {num_questions} answers, got {len(answers)}"
+        for q, option in enumerate(answers):
+            if not -1 <= option < len(questions[q]["options"]):
+                return None, f"question {q}: no option {option}"
+        return np.array(answers, dtype=np.int8), None
+    if isinstance(answers, list):
+        answers = dict(enumerate(answers))
+    if isinstance(answers, dict):
+        try:
+            answers = {int(q): text for q, text in answers.items()}
+        except ValueError:
+            return None, "question numbers must be integers"
+        indices = encode_answers(answers, questions)
+        if indices is None:
+            return None, "answers don't match the quiz options"
+        return indices, None
+    return None, "answers must be a list, a mapping or an answer code"
+
+
+def score_chunk(first_line: int, lines: List[str]) -> List[dict]:
+    """Parse and score a chunk of input lines (runs in a worker process)."""
+    questions = _load_questions()
+    records, vectors, scored = [], [], []
+    for offset, line in enumerate(lines):
+        if not line.strip():
+            continue
+        record = {"line": first_line + offset}
+        try:
+            value = json.loads(line)
+        except ValueError as e:
+            record["error"] = f"invalid JSON: {str(e)}"
+            records.append(record)
+            continue
+        record["id"] = value.get("id", record["line"]) if isinstance(value, dict) else record["line"]
+        indices, error = record_indices(value, questions)
+        if error:
+            record["error"] = error
+        else:
+            vectors.append(indices)
+            scored.append(record)
+        records.append(record)
+
+    if vectors:
+        batch = np.stack(vectors)
+        percentages = score_indices(batch)
+        # answer_code() for the whole chunk at once; skipped answers have no code
+        codes = batch.astype(np.int64) @ (4 ** np.arange(batch.shape[1] - 1, -1, -1))
+        complete = ((batch >= 0) & (batch <= 3)).all(axis=1)
+        for record, answers, pct, mbti, code, has_code in zip(
+                scored, batch.tolist(), np.round(percentages.astype(np.float64), 1).tolist(),
+                type_letters(percentages, tiebreak_scores(batch)), codes.tolist(), complete):
+            record["answers"] = answers
+            if has_code:
+                record["code"] = code
+            record["type"] = str(mbti)
+            record["axes"] = dict(zip(AXIS_LABELS, pct))
+    return records
+
+
+def read_chunks(path: str, chunk_size: int, skip_lines: int) -> Iterator[Tuple[int, List[str]]]:
+    """Yield (first line number, lines) chunks, skipping lines already processed."""
+    chunk, first = [], skip_lines
+    with (sys.stdin if path == "-" else open(path, encoding="utf-8")) as f:
+        for line_number, line in enumerate(f):
+            if line_number < skip_lines:
+                continue
+            chunk.append(line)
+            if len(chunk) >= chunk_size:
+                yield first, chunk
+                chunk, first = [], line_number + 1
+    if chunk:
+        yield first, chunk
+
+
+class Checkpoint:
+    """Progress of one run: input lines done and output bytes written, saved atomically."""
+
+    def __init__(self, path: str, fingerprint: str):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.next_line = 0
+        self.output_bytes = 0
+        self.totals = {}
+
+    def load(self) -> bool:
+        """Restore a matching checkpoint; False if there is none or it belongs to a different run."""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if state.get("version") != CHECKPOINT_VERSION or state.get("run") != self.fingerprint:
+            print(f"Ignoring checkpoint {self.path}: it was written for a different run")
+            return False
+        self.next_line = state["next_line"]
+        self.output_bytes = state["output_bytes"]
+        self.totals = state.get("totals", {})
+        return True
+
+    def save(self):
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": CHECKPOINT_VERSION, "run": self.fingerprint, "next_line": self.next_line,
+                       "output_bytes": self.output_bytes, "totals": self.totals}, f)
+        os.replace(tmp_path, self.path)
+
+    def remove(self):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+def run_fingerprint(args) -> str:
+    """Identifies the input and the options that change the output, so a resume can't mix runs."""
+    stat = os.stat(args.input) if args.input != "-" else None
+    payload = {"input": os.path.abspath(args.input), "size": stat.st_size if stat else None,
+               "mtime": stat.st_mtime if stat else None, "enrich": args.enrich}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+def enrich(record: dict, questions, retries: int = 0) -> dict:
+    """
+    Add the full analysis to a scored record (runs on an enrichment worker).
+
+    An analysis that fell back to local results, wholly or for some split-mode
+    sections, is retried up to ``retries`` times before the record is written
+    with ``analysis_fallback`` set to the reason.
+    """
+    import quiz_agent
+
+    answers = {q: questions[q]["options"][o] for q, o in enumerate(record["answers"]) if o >= 0}
+    for attempt in range(retries + 1):
+        if attempt:
+            time.sleep(ENRICH_RETRY_SECONDS * attempt)
+        try:
+            result, fallback_reason = quiz_agent.analyze_personality_outcome(answers, questions)
+        except Exception as e:
+            record["analysis_error"] = str(e)
+            return record
+        # Without a key every attempt would fall back the same way
+        if fallback_reason is None or fallback_reason == "no_key":
+            break
+    record["analysis"] = result
+    if fallback_reason is not None:
+        record["analysis_fallback"] = fallback_reason
+    return record
+
+
+def token_usage() -> Dict[str, List[float]]:
+    """Prompt and completion tokens reported so far, per model."""
+    import quiz_agent
+
+    usage = {}
+    for index, metric in enumerate((quiz_agent.PROMPT_TOKENS, quiz_agent.COMPLETION_TOKENS)):
+        for _, labels, value in metric.samples():
+            model = dict(labels).get("model", "unknown")
+            usage.setdefault(model, [0, 0])[index] += value
+    return usage
+
+
+def usage_cost(usage: Dict[str, List[float]], prices: Dict[str, Tuple[float, float]]) -> Optional[float]:
+    """USD cost of the usage, or None if a model has no price."""
+    total = 0.0
+    for model, (prompt_tokens, completion_tokens) in usage.items():
+        if model not in prices:
+            return None
+        total += (prompt_tokens * prices[model][0] + completion_tokens * prices[model][1]) / 1e6
+    return total
+
+
+def enrichment_estimate(distinct: int, prices: Dict[str, Tuple[float, float]]) -> Optional[dict]:
+    """
+    Upper bound on tokens and cost of enriching ``distinct`` answer sets:
+    every one a fresh full analysis using all of ANALYSIS_MAX_TOKENS.
+    """
+    import quiz_agent
+
+    questions = _load_questions()
+    answers = {q: question["options"][0] for q, question in enumerate(questions)}
+    messages = quiz_agent.PersonalityAnalyzer()._build_messages(answers, questions)
+    prompt_tokens = sum(quiz_agent.estimate_tokens(m.content) for m in messages)
+    usage = {quiz_agent.ANALYSIS_MODEL: [distinct * prompt_tokens, distinct * quiz_agent.ANALYSIS_MAX_TOKENS]}
+    return {"prompt_tokens": usage[quiz_agent.ANALYSIS_MODEL][0],
+            "completion_tokens": usage[quiz_agent.ANALYSIS_MODEL][1],
+            "cost_usd": usage_cost(usage, prices)}
+
+
+def parse_prices(values: List[str]) -> Dict[str, Tuple[float, float]]:
+    prices = dict(MODEL_PRICES)
+    for value in values or []:
+        model, _, pair = value.partition("=")
+        prompt_price, _, completion_price = pair.partition(",")
+        prices[model] = (float(prompt_price), float(completion_price))
+    return prices
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("input", help="JSONL file of answer sets")
+    parser.add_argument("--output", required=True, help="JSONL file to write")
+    parser.add_argument("--enrich", action="store_true", help="add the full LLM analysis to every record")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="scoring processes (0 scores in this process)")
+    parser.add_argument("--concurrency", type=int, default=4, help="LLM analyses in flight at once")
+    parser.add_argument("--retries", type=int, default=2, help="extra attempts for an analysis that fell back")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="lines per chunk and per checkpoint")
+    parser.add_argument("--checkpoint", help="progress file (default: <output>.checkpoint)")
+    parser.add_argument("--restart", action="store_true", help="ignore an existing checkpoint and start over")
+    parser.add_argument("--price", action="append", metavar="MODEL=IN,OUT",
+                        help="USD per million prompt and completion tokens for a model")
+    args = parser.parse_args()
+    if args.input == "-" and not args.restart:
+        args.restart = True  # stdin can't be replayed, so there is nothing to resume
+    prices = parse_prices(args.price)
+
+    checkpoint = Checkpoint(args.checkpoint or f"{args.output}.checkpoint", run_fingerprint(args))
+    resumed = not args.restart and checkpoint.load()
+    if resumed:
+        print(f"Resuming at line {checkpoint.next_line} ({checkpoint.totals.get('records', 0)} records already written)")
+        out = open(args.output, "r+b")
+        out.truncate(checkpoint.output_bytes)  # drop whatever the interrupted chunk left behind
+        out.seek(checkpoint.output_bytes)
+    else:
+        out = open(args.output, "wb")
+    totals = {"records": 0, "scored": 0, "errors": 0, "enriched": 0, "fallbacks": 0, "types": {},
+              **checkpoint.totals}
+    distinct_codes = set()
+
+    questions = _load_questions()
+    if args.enrich:
+        import quiz_agent  # imported up front so the model settings below are known
+        usage_before = token_usage()
+    scoring_pool = ProcessPoolExecutor(max_workers=args.workers) if args.workers > 0 else None
+    enrich_pool = ThreadPoolExecutor(max_workers=args.concurrency, thread_name_prefix="batch-enrich") if args.enrich else None
+
+    started = time.perf_counter()
+    scoring_seconds = 0.0
+    records_this_run = 0
+    pending = deque()
+    chunks = read_chunks(args.input, args.chunk_size, checkpoint.next_line)
+
+    def submit_next() -> bool:
+        chunk = next(chunks, None)
+        if chunk is None:
+            return False
+        first, lines = chunk
+        if scoring_pool is not None:
+            pending.append((first, lines, scoring_pool.submit(score_chunk, first, lines)))
+        else:
+            pending.append((first, lines, None))
+        return True
+
+    try:
+        # Keep a few chunks scoring ahead of the one being enriched and written
+        for _ in range(max(1, args.workers) * 2):
+            if not submit_next():
+                break
+        while pending:
+            first, lines, future = pending.popleft()
+            chunk_started = time.perf_counter()
+            records = future.result() if future is not None else score_chunk(first, lines)
+            scoring_seconds += time.perf_counter() - chunk_started
+            submit_next()
+
+            if enrich_pool is not None:
+                scored = [r for r in records if "type" in r]
+                for record in enrich_pool.map(lambda r: enrich(r, questions, args.retries), scored):
+                    # Fallbacks still carry the local analysis but aren't counted as enriched
+                    totals["fallbacks"] += bool(record.get("analysis_fallback"))
+                    totals["enriched"] += "analysis" in record and not record.get("analysis_fallback")
+
+            payload = bytearray()
+            for record in records:
+                totals["records"] += 1
+                if "error" in record:
+                    totals["errors"] += 1
+                else:
+                    totals["scored"] += 1
+                    totals["types"][record["type"]] = totals["types"].get(record["type"], 0) + 1
+                    if "code" in record:
+                        distinct_codes.add(record["code"])
+                payload += (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+            out.write(payload)
+            out.flush()
+            os.fsync(out.fileno())
+            records_this_run += len(records)
+
+            checkpoint.next_line = first + len(lines)
+            checkpoint.output_bytes = out.tell()
+            checkpoint.totals = totals
+            checkpoint.save()
+            elapsed = time.perf_counter() - started
+            print(f"  {totals['records']} records ({records_this_run / elapsed:.0f}/s)", file=sys.stderr)
+    except KeyboardInterrupt:
+        print(f"\nInterrupted after line {checkpoint.next_line}; run the same command again to resume")
+        sys.exit(130)
+    finally:
+        out.close()
+        if scoring_pool is not None:
+            scoring_pool.shutdown(cancel_futures=True)
+        if enrich_pool is not None:
+            enrich_pool.shutdown(cancel_futures=True)
+
+    wall = time.perf_counter() - started
+    checkpoint.remove()
+    summary = {
+        "records": totals["records"],
+        "scored": totals["scored"],
+        "errors": totals["errors"],
+        "types": dict(sorted(totals["types"].items())),
+        "wall_seconds": round(wall, 2),
+        "records_per_second": round(records_this_run / wall, 1) if wall else None,
+        "scoring_wait_seconds": round(scoring_seconds, 2),
+        "distinct_answer_sets": len(distinct_codes),  # in this run; a resumed run only counts its own part
+    }
+    if args.enrich:
+        before = usage_before
+        usage = {model: [tokens[0] - before.get(model, [0, 0])[0], tokens[1] - before.get(model, [0, 0])[1]]
+                 for model, tokens in token_usage().items()}
+        summary.update({
+            "enriched": totals["enriched"],
+            "fallbacks": totals["fallbacks"],
+            "fallback_reasons": quiz_agent.FALLBACKS.snapshot(),
+            "analyses_per_second": round(totals["enriched"] / wall, 2) if wall else None,
+            "tokens": usage,
+            "cost_usd": usage_cost(usage, prices),
+            "cache": quiz_agent.get_cache_stats(),
+        })
+    else:
+        summary["enrichment_estimate"] = enrichment_estimate(len(distinct_codes), prices)
+
+    print(json.dumps(summary, indent=2))
+    if args.enrich and summary["cost_usd"] is None:
+        print("No price known for some models; pass --price MODEL=IN,OUT to include them in the cost")
+
+
+if __name__ == "__main__":
+    main()
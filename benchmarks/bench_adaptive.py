@@ -0,0 +1,123 @@
+"""
+How many questions the adaptive quiz needs compared with the fixed list.
+
+    python benchmarks/bench_adaptive.py [--respondents 500] [--confidence 0.75,0.8,0.85,0.9] [--max-questions 10] [--answer-decisiveness 0.8]
+
+Simulates respondents with a random latent preference per axis who answer
+by the adaptive engine's response model (optionally more or less
+consistently than the engine assumes, via --answer-decisiveness), and
+puts each through the fixed quiz, the adaptive quiz at every confidence
+threshold and the whole question bank. A run's type is what the results
+page would show: score_answers over the questions it asked. Reports
+questions asked, how often each axis and the whole type match the
+respondent's true preference, agreement with the fixed-list type, and
+the engine's time per question.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from adaptive import ADAPTIVE_DECISIVENESS, ADAPTIVE_MAX_QUESTIONS, AdaptiveQuiz
+from question_bank import get_question_bank
+from scoring import AXES, score_answers
+
+
+class Respondent:
+    """Answers like the engine's response model, with its own preference and consistency."""
+
+    def __init__(self, preference: np.ndarray, decisiveness: float, rng: np.random.Generator):
+        self.preference = preference
+        self.decisiveness = decisiveness
+        self.rng = rng
+        self.choices = {}
+
+    def answer(self, question: dict) -> int:
+        # Remember choices so every strategy sees the same answer to the same item
+        if question["id"] not in self.choices:
+            logits = self.decisiveness * (np.array(question["weights"]) @ self.preference)
+            p = np.exp(logits - logits.max())
+            self.choices[question["id"]] = int(self.rng.choice(len(p), p=p / p.sum()))
+        return self.choices[question["id"]]
+
+    @property
+    def true_type(self) -> str:
+        return "".join(first if lean > 0 else second
+                       for (first, second, _), lean in zip(AXES, self.preference))
+
+
+def result_type(respondent: Respondent, questions) -> str:
+    answers = {n: q["options"][respondent.answer(q)] for n, q in enumerate(questions)}
+    return score_answers(answers, questions)["type"]
+
+
+def run_adaptive(quiz: AdaptiveQuiz, respondent: Respondent, step_times: list):
+    responses, asked = [], []
+    while True:
+        started = time.perf_counter()
+        item_id = quiz.next_question(responses)
+        step_times.append(time.perf_counter() - started)
+        if item_id is None:
+            return asked
+        question = quiz.bank.get(item_id)
+        asked.append(question)
+        responses.append((item_id, respondent.answer(question)))
+
+
+def summarize(name: str, counts, types, respondents, fixed_types) -> str:
+    counts = np.asarray(counts)
+    axis_hits = np.mean([[a == b for a, b in zip(t, r.true_type)] for t, r in zip(types, respondents)], axis=0)
+    type_hits = np.mean([t == r.true_type for t, r in zip(types, respondents)])
+    agreement = np.mean([t == f for t, f in zip(types, fixed_types)])
+    return (f"{name:<18} {counts.mean():>6.1f} {np.percentile(counts, 50):>5.0f} {np.percentile(counts, 90):>5.0f} "
+            f"{counts.max():>5} {' '.join(f'{hit:>5.0%}' for hit in axis_hits)} {type_hits:>6.0%} {agreement:>7.0%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--respondents", type=int, default=500)
+    parser.add_argument("--confidence", default="0.75,0.8,0.85,0.9",
+                        help="comma-separated adaptive confidence thresholds to compare")
+    parser.add_argument("--max-questions", type=int, default=ADAPTIVE_MAX_QUESTIONS)
+    parser.add_argument("--answer-decisiveness", type=float, default=ADAPTIVE_DECISIVENESS,
+                        help="how consistently simulated respondents answer (the engine assumes "
+                             f"{ADAPTIVE_DECISIVENESS})")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    bank = get_question_bank()
+    rng = np.random.default_rng(args.seed)
+    respondents = [Respondent(rng.standard_normal(len(AXES)), args.answer_decisiveness, rng)
+                   for _ in range(args.respondents)]
+    fixed = bank.fixed_quiz
+    fixed_types = [result_type(r, fixed) for r in respondents]
+
+    print(f"{len(bank)} questions in the bank, {len(fixed)} in the fixed quiz, "
+          f"{args.respondents} simulated respondents\n")
+    print(f"{'strategy':<18} {'mean':>6} {'p50':>5} {'p90':>5} {'max':>5} "
+          f"{' '.join(f'{first + second:>5}' for first, second, _ in AXES)} {'type':>6} {'=fixed':>7}")
+    print(summarize("fixed list", [len(fixed)] * len(respondents), fixed_types, respondents, fixed_types))
+
+    step_times = []
+    for confidence in (float(value) for value in args.confidence.split(",")):
+        quiz = AdaptiveQuiz(bank, confidence=confidence, max_questions=args.max_questions)
+        asked = [run_adaptive(quiz, r, step_times) for r in respondents]
+        types = [result_type(r, questions) for r, questions in zip(respondents, asked)]
+        print(summarize(f"adaptive @ {confidence:g}", [len(questions) for questions in asked],
+                        types, respondents, fixed_types))
+
+    full_types = [result_type(r, bank.questions) for r in respondents]
+    print(summarize("whole bank", [len(bank)] * len(respondents), full_types, respondents, fixed_types))
+
+    step_times = np.array(step_times) * 1000
+    print(f"\nAdaptive engine: {np.percentile(step_times, 50):.2f} ms per question p50, "
+          f"{np.percentile(step_times, 95):.2f} ms p95")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Benchmark the response parsers against the original multi-pass parser.
+
+    python benchmarks/bench_parsers.py [--repeat N]
+
+Compares the original line-by-line parser, the table-driven single-pass
+text parser and the JSON-mode validator on realistic and large responses,
+and checks that the text parsers produce identical dicts.
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from quiz_agent import parse_json_response, parse_response_text
+
+
+def legacy_parse(response_text: str) -> dict:
+    """The original multi-pass parser, frozen here as the benchmark baseline."""
+    try:
+        sections = {
+            "title": "",
+            "type": "",
+            "emoji": "",
+            "description": [],
+            "traits": [],
+            "strengths": [],
+            "growth_areas": []
+        }
+        
+        current_section = None
+        lines = response_text.split('\n')
+        
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+                
+            if line.startswith("TITLE:"):
+                current_section = "title"
+                sections["title"] = line.replace("TITLE:", "").strip()
+            elif line.startswith("TYPE:"):
+                current_section = "type"
+                sections["type"] = line.replace("TYPE:", "").strip()
+            elif line.startswith("EMOJI:"):
+                sections["emoji"] = line.replace("EMOJI:", "").strip()
+            elif line.startswith("DESCRIPTION:"):
+                current_section = "description"
+            elif line.startswith("TRAITS:"):
+                current_section = "traits"
+                traits = line.replace("TRAITS:", "").strip()
+                if traits and ',' in traits:
+                    sections["traits"] = [t.strip() for t in traits.split(",")]
+                else:
+                    sections["traits"] = [traits] if traits else []
+            elif line.startswith("STRENGTHS:"):
+                current_section = "strengths"
+                strengths = line.replace("STRENGTHS:", "").strip()
+                if strengths and ',' in strengths:
+                    sections["strengths"] = [s.strip() for s in strengths.split(",")]
+                else:
+                    sections["strengths"] = [strengths] if strengths else []
+            elif line.startswith("GROWTH_AREAS:"):
+                current_section = "growth_areas"
+                areas = line.replace("GROWTH_AREAS:", "").strip()
+                if areas and ',' in areas:
+                    sections["growth_areas"] = [a.strip() for a in areas.split(",")]
+                else:
+                    sections["growth_areas"] = [areas] if areas else []
+            elif current_section == "description":
+                sections["description"].append(line)
+            elif current_section == "traits" and line and not line.startswith("-"):
+                sections["traits"].append(line)
+            elif current_section == "strengths" and line and not line.startswith("-"):
+                sections["strengths"].append(line)
+            elif current_section == "growth_areas" and line and not line.startswith("-"):
+                sections["growth_areas"].append(line)
+        
+        # Clean up lists - remove any empty strings
+        sections["traits"] = [t for t in sections["traits"] if t]
+        sections["strengths"] = [s for s in sections["strengths"] if s]
+        sections["growth_areas"] = [a for a in sections["growth_areas"] if a]
+        
+        # Handle bullet points if present
+        for key in ["traits", "strengths", "growth_areas"]:
+            new_items = []
+            for item in sections[key]:
+                if item.startswith("- "):
+                    new_items.append(item[2:])
+                elif item.startswith("• "):
+                    new_items.append(item[2:])
+                else:
+                    new_items.append(item)
+            sections[key] = new_items
+        
+        return {
+            "title": sections["title"] or "The Personality Explorer",
+            "type": sections["type"] or "Personality Type Analysis",
+            "emoji": sections["emoji"] or "✨",
+            "description": "\n\n".join(sections["description"]),
+            "traits": sections["traits"] or ["Unique", "Complex", "Multifaceted"],
+            "strengths": sections["strengths"] or ["Adaptability", "Insight", "Growth Mindset"],
+            "growth_areas": sections["growth_areas"] or ["Continuing to explore", "Embracing change", "Self-discovery"]
+        }
+    except Exception as e:
+        print(f"Error parsing AI response: {str(e)}")
+        raise
+
+
+def make_response(paragraphs: int, items: int) -> dict:
+    """Build matching text-format and JSON-format responses of a given size."""
+    sentence = ("You're the friend who notices when the group chat goes quiet and "
+                "quietly checks in - classic Fe energy with a Ni twist. ")
+    result = {
+        "title": "The Midnight Strategist",
+        "type": "INFJ - you plan quietly and feel everything",
+        "emoji": "🌙",
+        "description": [sentence * 4 for _ in range(paragraphs)],
+        "traits": [f"Trait {i} with a specific example from the answers" for i in range(items)],
+        "strengths": [f"Strength {i}" for i in range(items)],
+        "growth_areas": [f"Growth area {i}" for i in range(items)],
+    }
+    text = "\n".join([
+        f"TITLE: {result['title']}",
+        f"TYPE: {result['type']}",
+        f"EMOJI: {result['emoji']}",
+        "DESCRIPTION:",
+        *result["description"],
+        "TRAITS:",
+        *[f"• {item}" for item in result["traits"]],
+        f"STRENGTHS: {', '.join(result['strengths'])}",
+        "GROWTH_AREAS:",
+        *result["growth_areas"],
+    ])
+    as_json = dict(result, description="\n\n".join(result["description"]))
+    return {"text": text, "json": json.dumps(as_json, ensure_ascii=False)}
+
+
+SIZES = {
+    "realistic": (6, 5),
+    "large": (200, 100),
+    "huge": (5000, 2000),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="timing repeats per case")
+    args = parser.parse_args()
+
+    print(f"{'case':<10} {'size':>10} {'legacy':>12} {'single-pass':>12} {'json':>12} {'speedup':>8}")
+    for name, (paragraphs, items) in SIZES.items():
+        response = make_response(paragraphs, items)
+        text = response["text"]
+        if legacy_parse(text) != parse_response_text(text):
+            sys.exit(f"{name}: single-pass parser disagrees with the legacy parser")
+
+        number = max(1, 200_000 // len(text))
+        timings = {}
+        for label, fn, payload in (("legacy", legacy_parse, text),
+                                   ("single", parse_response_text, text),
+                                   ("json", parse_json_response, response["json"])):
+            best = min(timeit.repeat(lambda: fn(payload), number=number, repeat=args.repeat))
+            timings[label] = best / number * 1e6
+        print(f"{name:<10} {len(text):>9}B {timings['legacy']:>10.1f}us {timings['single']:>10.1f}us "
+              f"{timings['json']:>10.1f}us {timings['legacy'] / timings['single']:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
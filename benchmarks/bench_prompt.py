@@ -0,0 +1,131 @@
+"""
+Size and latency of the verbose and compact analysis prompts.
+
+    python benchmarks/bench_prompt.py [--runs 10] [--answer-chars 1500] [--budget TOKENS] [--prefill 2500] [--live]
+
+Builds the analysis prompt for quiz answers and long free-text answers
+with PROMPT_MODE=verbose and =compact (and with --budget, a verbose
+builder held to that many input tokens) and reports characters,
+estimated input tokens (split into the system prompt, which is the same
+for every request on a question set, and the per-answer user prompt),
+build time and any trimming. Then runs --runs analyses per prompt over
+the same random quiz answers and reports latency, prompt tokens per
+request and fallbacks. By default the client is a stub that takes as
+long as a model would, including prompt prefill at --prefill tokens per
+second (scaled down by --time-scale; latencies are reported unscaled).
+The stub's answers don't depend on the prompt, so output quality is not
+compared here; judge that with --live, which uses the real API.
+"""
+import argparse
+import os
+import random
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import quiz_agent
+from quiz_agent import (ANALYSIS_MODEL, TEXT_FORMAT_INSTRUCTIONS, PersonalityAnalyzer, PromptBuilder,
+                        RateLimiter, estimate_tokens)
+from app import QUESTIONS
+from batch_score import token_usage
+from bench_quiz_agent import free_text_answers
+from bench_split_mode import MODEL_SPEEDS, TimedStubClient, percentile
+
+
+class PrefillStubClient(TimedStubClient):
+    """The split-mode stub, plus time to read the prompt before the first token."""
+
+    def __init__(self, speeds: dict, time_scale: float, prefill: float):
+        super().__init__(speeds, time_scale)
+        self.prefill = prefill
+
+    def _respond(self, model: str, messages):
+        content, usage, ttft, decode = super()._respond(model, messages)
+        return content, usage, ttft + usage.prompt_tokens / self.prefill * self.time_scale, decode
+
+
+def prompt_size(builder: PromptBuilder, answers: dict) -> dict:
+    system, prompt, stats = builder.build(answers, QUESTIONS, TEXT_FORMAT_INSTRUCTIONS)
+    runs = 200
+    seconds = min(timeit.repeat(lambda: builder.build(answers, QUESTIONS, TEXT_FORMAT_INSTRUCTIONS),
+                                number=runs, repeat=5)) / runs
+    return {"chars": len(system) + len(prompt), "tokens": stats["tokens"],
+            "system_tokens": estimate_tokens(system), "build_us": seconds * 1e6,
+            "trimmed": stats["trimmed"] or "-"}
+
+
+def run_builder(builder: PromptBuilder, client, answer_sets, scale: float) -> dict:
+    """Analyze every answer set once with ``builder`` and summarise latency and usage."""
+    before = token_usage()
+    latencies, fallbacks = [], 0
+    for answers in answer_sets:
+        analyzer = PersonalityAnalyzer(client=client, reuse_results=False, prompt_builder=builder)
+        started = timeit.default_timer()
+        analyzer.analyze_responses(answers, QUESTIONS)
+        latencies.append((timeit.default_timer() - started) / scale)
+        fallbacks += analyzer.used_fallback
+    after = token_usage()
+    prompt_tokens = sum(after[model][0] - before.get(model, [0, 0])[0] for model in after)
+    return {
+        "p50": percentile(latencies, 50), "p95": percentile(latencies, 95),
+        "prompt_tokens": prompt_tokens / len(answer_sets), "fallbacks": fallbacks,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10, help="analyses per prompt")
+    parser.add_argument("--answer-chars", type=int, default=1500, help="length of each free-text answer")
+    parser.add_argument("--budget", type=int, default=0, help="also compare a verbose builder held to this budget")
+    parser.add_argument("--prefill", type=float, default=2500.0, help="stub prompt tokens read per second")
+    parser.add_argument("--time-scale", type=float, default=0.02,
+                        help="stub latencies are multiplied by this while running")
+    parser.add_argument("--live", action="store_true", help="call the real API instead of the stub")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    builders = {"verbose": PromptBuilder("verbose", 0), "compact": PromptBuilder("compact", 0)}
+    if args.budget:
+        builders[f"budget {args.budget}"] = PromptBuilder("verbose", args.budget)
+
+    quiz = {i: q["options"][i % len(q["options"])] for i, q in enumerate(QUESTIONS)}
+    free_text = free_text_answers(args.answer_chars)
+    print(f"{'prompt':<14} {'answers':<10} {'chars':>7} {'tokens':>7} {'system':>7} {'build us':>9}  trimmed")
+    for name, builder in builders.items():
+        for label, answers in (("quiz", quiz), ("free text", free_text)):
+            size = prompt_size(builder, answers)
+            print(f"{name:<14} {label:<10} {size['chars']:>7} {size['tokens']:>7} {size['system_tokens']:>7} "
+                  f"{size['build_us']:>9.1f}  {size['trimmed']}")
+
+    # Every run should reach upstream: no hedged duplicates, no throttling
+    quiz_agent.HEDGE_PERCENTILE = 0
+    quiz_agent._rate_limiter = RateLimiter(requests_per_second=1e9, tokens_per_minute=1e12,
+                                           max_queue=10_000, max_wait=60)
+    if args.live:
+        client, scale = quiz_agent.get_shared_client(), 1.0
+    else:
+        os.environ.setdefault("MISTRAL_API_KEY", "benchmark")
+        client, scale = PrefillStubClient(MODEL_SPEEDS, args.time_scale, args.prefill), args.time_scale
+    rng = random.Random(args.seed)
+    answer_sets = [{i: rng.choice(q["options"]) for i, q in enumerate(QUESTIONS)} for _ in range(args.runs)]
+
+    print(f"\n{args.runs} analyses per prompt with {ANALYSIS_MODEL} ({'live' if args.live else 'stub'})")
+    print(f"{'prompt':<14} {'p50':>7} {'p95':>7} {'prompt tok':>11} {'fallbacks':>10}")
+    results = {}
+    for name, builder in builders.items():
+        result = results[name] = run_builder(builder, client, answer_sets, scale)
+        print(f"{name:<14} {result['p50']:>6.2f}s {result['p95']:>6.2f}s {result['prompt_tokens']:>11.0f} "
+              f"{result['fallbacks']:>10}")
+
+    verbose, compact = results["verbose"], results["compact"]
+    print(f"\nCompact prompt: {compact['prompt_tokens'] / verbose['prompt_tokens']:.0%} of the verbose prompt "
+          f"tokens, latency p50 {compact['p50'] / verbose['p50']:.0%}")
+    print(f"System prompt: verbose {estimate_tokens(quiz_agent.SYSTEM_PROMPT)} tokens, "
+          f"compact {estimate_tokens(builders['compact'].system_prompt('compact', QUESTIONS))} "
+          f"with the question legend")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+"""
+Micro-benchmarks for the quiz_agent hot paths.
+
+    python benchmarks/bench_quiz_agent.py [--latency MS] [--baseline PATH] [--update]
+
+Times prompt generation, response parsing on realistic and adversarial
+inputs, the local fallback on long free-text answers and the full
+analyze_responses flow against a stubbed client with a configurable
+latency. Prints throughput and per-call percentiles, and compares the
+median of every case against a baseline JSON file: the first run (or
+--update) writes the baseline, later runs exit non-zero when a case is
+slower than the baseline by more than --threshold.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import quiz_agent
+from quiz_agent import PersonalityAnalyzer, RateLimiter
+from app import QUESTIONS
+from bench_parsers import make_response
+
+DEFAULT_BASELINE = os.path.join(ROOT, "benchmarks", "baseline_quiz_agent.json")
+
+
+def percentile(sorted_values, pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def calibrate(fn, target_seconds: float = 2e-4) -> int:
+    """How many calls of ``fn`` make one sample long enough to time reliably."""
+    batch = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(batch):
+            fn()
+        if time.perf_counter() - start >= target_seconds or batch >= 1 << 16:
+            return batch
+        batch *= 2
+
+
+def run_case(fn, min_calls: int, min_seconds: float, concurrency: int = 1) -> dict:
+    """Call ``fn`` repeatedly and summarise the per-call latencies."""
+    for _ in range(min(3, min_calls)):
+        fn()  # warm up caches and lazily built tables
+    # Sub-microsecond paths are timed in batches so timer overhead and
+    # scheduler noise don't dominate; latencies are still reported per call
+    batch = calibrate(fn) if concurrency == 1 else 1
+
+    def timed_call(_):
+        start = time.perf_counter()
+        for _ in range(batch):
+            fn()
+        return (time.perf_counter() - start) / batch
+
+    latencies = []
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        while len(latencies) * batch < min_calls or time.perf_counter() - started < min_seconds:
+            latencies.extend(pool.map(timed_call, range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "calls": len(latencies) * batch,
+        "ops_per_sec": round(len(latencies) * batch / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 50) * 1e3, 4),
+        "p95_ms": round(percentile(latencies, 95) * 1e3, 4),
+        "p99_ms": round(percentile(latencies, 99) * 1e3, 4),
+    }
+
+
+def quiz_answers() -> dict:
+    return {i: q["options"][i % len(q["options"])] for i, q in enumerate(QUESTIONS)}
+
+
+def free_text_answers(chars: int) -> dict:
+    """Long free-text answers that don't match any option, hitting the keyword path."""
+    filler = ("I usually plan ahead but I love to explore and go with the flow when friends "
+              "want to party, though honestly I care about harmony and think about logic. ")
+    return {i: (filler * (chars // len(filler) + 1))[:chars] for i in range(len(QUESTIONS))}
+
+
+def adversarial_responses() -> dict:
+    """Inputs that stress the parser rather than resemble a real answer."""
+    header_storm = "\n".join(f"TRAITS: a{i}, b{i}\nSTRENGTHS:\n- s{i}\nTYPE: INFJ" for i in range(5000))
+    return {
+        "single_line_1mb": "DESCRIPTION: " + "word " * 200_000,
+        "header_storm": header_storm,
+        "bullets_only": "\n".join(f"- orphan bullet {i}" for i in range(50_000)),
+        "no_headers": "\n".join("just prose with no structure at all" for _ in range(20_000)),
+    }
+
+
+class StubClient:
+    """Stands in for MistralClient with a fixed response latency."""
+
+    def __init__(self, latency: float, content: str):
+        self.latency = latency
+        self.response = SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=SimpleNamespace(prompt_tokens=600, completion_tokens=900, total_tokens=1500),
+        )
+
+    def chat(self, **kwargs):
+        time.sleep(self.latency)
+        return self.response
+
+
+def build_cases(args) -> dict:
+    """Map case name -> (callable, concurrency)."""
+    answers = quiz_answers()
+    long_answers = free_text_answers(args.answer_chars)
+    realistic = make_response(6, 5)
+    large = make_response(200, 100)
+    analyzer = PersonalityAnalyzer(client=StubClient(args.latency / 1e3, realistic["text"]))
+
+    cases = {
+        "prompt/quiz_answers": (lambda: analyzer.generate_analysis_prompt(answers, QUESTIONS), 1),
+        "prompt/long_free_text": (lambda: analyzer.generate_analysis_prompt(long_answers, QUESTIONS), 1),
+        "parse/realistic": (lambda: analyzer._parse_mistral_response(realistic["text"]), 1),
+        "parse/large": (lambda: analyzer._parse_mistral_response(large["text"]), 1),
+        "fallback/quiz_answers": (lambda: analyzer._get_fallback_analysis(answers, QUESTIONS, reason="bench"), 1),
+        "fallback/long_free_text": (lambda: analyzer._get_fallback_analysis(long_answers, reason="bench"), 1),
+    }
+    for name, text in adversarial_responses().items():
+        cases[f"parse/{name}"] = (lambda text=text: analyzer._parse_mistral_response(text), 1)
+
+    # The stub never sends the key, and the real rate limiter would throttle
+    # the benchmark itself, so give it an unlimited budget
+    os.environ.setdefault("MISTRAL_API_KEY", "benchmark")
+    quiz_agent._rate_limiter = RateLimiter(requests_per_second=1e9, tokens_per_minute=1e12,
+                                           max_queue=10_000, max_wait=60)
+
+    def analyze():
+        stubbed = PersonalityAnalyzer(client=analyzer.client)
+        result = stubbed.analyze_responses(answers, QUESTIONS)
+        if stubbed.used_fallback:
+            raise RuntimeError(f"stubbed analysis fell back ({stubbed.fallback_reason})")
+        return result
+
+    cases["analyze/stub"] = (analyze, 1)
+    cases[f"analyze/stub_x{args.concurrency}"] = (analyze, args.concurrency)
+    return cases
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Names of cases whose median regressed past the threshold."""
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if result["p50_ms"] > previous["p50_ms"] * (1 + threshold):
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--latency", type=float, default=20, help="stub client latency in ms")
+    parser.add_argument("--concurrency", type=int, default=8, help="threads for the concurrent analyze case")
+    parser.add_argument("--answer-chars", type=int, default=20_000, help="length of each free-text answer")
+    parser.add_argument("--min-calls", type=int, default=20, help="minimum calls per case")
+    parser.add_argument("--min-seconds", type=float, default=0.5, help="minimum wall time per case")
+    parser.add_argument("--only", help="run only cases whose name contains this string")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON to compare against")
+    parser.add_argument("--update", action="store_true", help="overwrite the baseline with this run")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed median slowdown before failing (0.25 = 25%%)")
+    parser.add_argument("--retries", type=int, default=2,
+                        help="re-measure a regressed case this many times before failing it")
+    args = parser.parse_args()
+
+    cases = build_cases(args)
+    results = {}
+    print(f"{'case':<30} {'calls':>7} {'ops/s':>11} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10}")
+    for name, (fn, concurrency) in cases.items():
+        if args.only and args.only not in name:
+            continue
+        result = run_case(fn, args.min_calls, args.min_seconds, concurrency)
+        results[name] = result
+        print(f"{name:<30} {result['calls']:>7} {result['ops_per_sec']:>11.1f} {result['p50_ms']:>10.3f} "
+              f"{result['p95_ms']:>10.3f} {result['p99_ms']:>10.3f}")
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    if args.update or not baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({
+                "_meta": {"python": platform.python_version(), "machine": platform.machine(),
+                          "latency_ms": args.latency, "written": time.strftime("%Y-%m-%d %H:%M:%S")},
+                **results,
+            }, f, indent=2)
+        print(f"\nBaseline written to {args.baseline}")
+        return
+
+    regressions = compare(results, baseline, args.threshold)
+    for _ in range(args.retries):
+        if not regressions:
+            break
+        # A one-off slow run is usually noise; keep the best median of the retries
+        for name in regressions:
+            fn, concurrency = cases[name]
+            retry = run_case(fn, args.min_calls, args.min_seconds, concurrency)
+            if retry["p50_ms"] < results[name]["p50_ms"]:
+                results[name] = retry
+        regressions = compare(results, baseline, args.threshold)
+    for name in regressions:
+        print(f"REGRESSION {name}: p50 {results[name]['p50_ms']:.3f}ms vs baseline "
+              f"{baseline[name]['p50_ms']:.3f}ms (> {args.threshold:.0%} slower)")
+    if regressions:
+        sys.exit(1)
+    print(f"\nNo case regressed more than {args.threshold:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""
+Latency and cost of split mode against the single-call analysis.
+
+    python benchmarks/bench_split_mode.py [--runs 10] [--time-scale 0.02] [--speed MODEL=TTFT,TOK_PER_S] [--live]
+
+Runs the same answers through analyze_responses and stream_responses with
+ANALYSIS_MODE=single and =split and reports per-analysis latency, time to
+the first description text, tokens per model and the cost per thousand
+analyses. By default the client is a stub that answers exactly the
+sections each prompt asks for and takes as long as a model would: time to
+first token plus completion tokens at that model's decode speed (scaled
+down by --time-scale so the benchmark runs quickly; latencies are
+reported unscaled). --live uses the real API instead.
+"""
+import argparse
+import os
+import re
+import sys
+import time
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import quiz_agent
+from quiz_agent import SECTION_INSTRUCTIONS, PersonalityAnalyzer, RateLimiter, estimate_tokens
+from app import QUESTIONS
+from batch_score import parse_prices, token_usage, usage_cost
+
+# (seconds to first token, completion tokens per second)
+MODEL_SPEEDS = {
+    "mistral-medium": (0.6, 35.0),
+    "mistral-small": (0.3, 90.0),
+}
+
+SENTENCE = ("You're the friend who notices when the group chat goes quiet and "
+            "quietly checks in - classic Fe energy with a Ni twist. ")
+
+
+def stub_content(prompt: str) -> str:
+    """A response with just the sections the prompt asks for, at realistic lengths."""
+    short = "single line" in prompt
+    lines = []
+    for header, instruction in SECTION_INSTRUCTIONS.items():
+        if f"{header}: {instruction}" not in prompt:
+            continue
+        if header == "DESCRIPTION":
+            lines.append("DESCRIPTION:")
+            lines.extend(SENTENCE * 4 for _ in range(6))
+        elif header in ("TRAITS", "STRENGTHS", "GROWTH_AREAS"):
+            if short:
+                lines.append(f"{header}: " + ", ".join(f"{header.lower()} {i} in a few words" for i in range(5)))
+            else:
+                lines.append(f"{header}:")
+                lines.extend(f"- {header.lower()} {i}, shown when you picked the option about plans "
+                             f"with friends over a quiet night in" for i in range(5))
+        elif header == "EMOJI":
+            lines.append("EMOJI: 🌙")
+        else:
+            lines.append(f"{header}: The Midnight Strategist - INFJ")
+    return "\n".join(lines)
+
+
+class TimedStubClient:
+    """Stands in for MistralClient, answering as slowly as the requested model would."""
+
+    def __init__(self, speeds: dict, time_scale: float):
+        self.speeds = speeds
+        self.time_scale = time_scale
+
+    def _respond(self, model: str, messages):
+        prompt = messages[-1].content
+        content = stub_content(prompt)
+        prompt_tokens = sum(estimate_tokens(m.content) for m in messages)
+        completion_tokens = estimate_tokens(content)
+        usage = SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                                total_tokens=prompt_tokens + completion_tokens)
+        ttft, tokens_per_second = self.speeds[model]
+        return content, usage, ttft * self.time_scale, completion_tokens / tokens_per_second * self.time_scale
+
+    def chat(self, model: str, messages, **kwargs):
+        content, usage, ttft, decode = self._respond(model, messages)
+        time.sleep(ttft + decode)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=usage)
+
+    def chat_stream(self, model: str, messages, **kwargs):
+        content, usage, ttft, decode = self._respond(model, messages)
+        time.sleep(ttft)
+        pieces = re.findall(r".{1,16}", content, re.S)
+        for i, piece in enumerate(pieces):
+            time.sleep(decode / len(pieces))
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece))],
+                                  usage=usage if i == len(pieces) - 1 else None)
+
+
+def percentile(values, pct: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, round(pct / 100 * len(values)) - 1))]
+
+
+def run_mode(mode: str, client, runs: int, answers: dict, scale: float, prices: dict) -> dict:
+    """Time ``runs`` blocking and streamed analyses in one mode and total up their usage."""
+    quiz_agent.ANALYSIS_MODE = mode
+    before = token_usage()
+    blocking, streamed, first_text = [], [], []
+    fallbacks = 0
+    for _ in range(runs):
+        analyzer = PersonalityAnalyzer(client=client, reuse_results=False)
+        started = time.perf_counter()
+        analyzer.analyze_responses(answers, QUESTIONS)
+        blocking.append((time.perf_counter() - started) / scale)
+        fallbacks += analyzer.used_fallback
+
+        analyzer = PersonalityAnalyzer(client=client, reuse_results=False)
+        started = time.perf_counter()
+        first = None
+        for partial in analyzer.stream_responses(answers, QUESTIONS):
+            if first is None and partial.get("description"):
+                first = time.perf_counter() - started
+        streamed.append((time.perf_counter() - started) / scale)
+        first_text.append((first or 0.0) / scale)
+        fallbacks += analyzer.used_fallback
+
+    after = token_usage()
+    usage = {}
+    for model, (prompt_tokens, completion_tokens) in after.items():
+        previous = before.get(model, [0, 0])
+        delta = [prompt_tokens - previous[0], completion_tokens - previous[1]]
+        if any(delta):
+            usage[model] = [round(tokens / (2 * runs)) for tokens in delta]
+    cost = usage_cost(usage, prices)
+    return {
+        "blocking_p50": percentile(blocking, 50), "blocking_p95": percentile(blocking, 95),
+        "stream_p50": percentile(streamed, 50), "first_text_p50": percentile(first_text, 50),
+        "usage": usage, "cost_per_1k": cost * 1000 if cost is not None else None,
+        "fallbacks": fallbacks,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10, help="analyses per mode (each blocking and streamed)")
+    parser.add_argument("--time-scale", type=float, default=0.02,
+                        help="stub latencies are multiplied by this while running")
+    parser.add_argument("--speed", action="append", metavar="MODEL=TTFT,TOK_PER_S",
+                        help="stub speed for a model (seconds to first token, tokens per second)")
+    parser.add_argument("--price", action="append", metavar="MODEL=IN,OUT",
+                        help="USD per million prompt and completion tokens for a model")
+    parser.add_argument("--live", action="store_true", help="call the real API instead of the stub")
+    args = parser.parse_args()
+
+    speeds = dict(MODEL_SPEEDS)
+    for value in args.speed or []:
+        model, _, pair = value.partition("=")
+        ttft, _, tokens_per_second = pair.partition(",")
+        speeds[model] = (float(ttft), float(tokens_per_second))
+    prices = parse_prices(args.price)
+
+    # Every run should reach upstream: no hedged duplicates, no throttling
+    quiz_agent.HEDGE_PERCENTILE = 0
+    quiz_agent._rate_limiter = RateLimiter(requests_per_second=1e9, tokens_per_minute=1e12,
+                                           max_queue=10_000, max_wait=60)
+    if args.live:
+        client, scale = quiz_agent.get_shared_client(), 1.0
+    else:
+        os.environ.setdefault("MISTRAL_API_KEY", "benchmark")
+        client, scale = TimedStubClient(speeds, args.time_scale), args.time_scale
+    answers = {i: q["options"][i % len(q["options"])] for i, q in enumerate(QUESTIONS)}
+
+    print(f"Split plan: {quiz_agent.split_plan()}")
+    print(f"{'mode':<8} {'blocking p50':>13} {'p95':>7} {'stream p50':>11} {'first text':>11} "
+          f"{'$ per 1k':>9}  tokens per analysis (prompt, completion)")
+    results = {}
+    for mode in ("single", "split"):
+        result = results[mode] = run_mode(mode, client, args.runs, answers, scale, prices)
+        cost = f"{result['cost_per_1k']:.2f}" if result["cost_per_1k"] is not None else "?"
+        print(f"{mode:<8} {result['blocking_p50']:>12.2f}s {result['blocking_p95']:>6.2f}s "
+              f"{result['stream_p50']:>10.2f}s {result['first_text_p50']:>10.2f}s {cost:>9}  {result['usage']}"
+              + (f"  ({result['fallbacks']} fallbacks)" if result["fallbacks"] else ""))
+
+    single, split = results["single"], results["split"]
+    print(f"\nSplit mode: blocking latency {split['blocking_p50'] / single['blocking_p50']:.0%} of single, "
+          f"streamed {split['stream_p50'] / single['stream_p50']:.0%}"
+          + (f", cost {split['cost_per_1k'] / single['cost_per_1k']:.0%}"
+             if split["cost_per_1k"] and single["cost_per_1k"] else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Startup diagnostics: where a cold worker spends its import time.
+
+    python diagnostics.py [--module app] [--top 20]
+
+Runs ``python -X importtime -c "import <module>"`` in a fresh interpreter
+and prints the slowest imports, then lists which heavy dependencies the
+module pulls in eagerly. Set STARTUP_DIAGNOSTICS=1 to have the app log the
+same report once per process when it starts.
+"""
+from typing import Dict, List
+import argparse
+import os
+import subprocess
+import sys
+import threading
+
+from metrics import register_collector
+
+STARTUP_DIAGNOSTICS = os.getenv("STARTUP_DIAGNOSTICS", "").lower() in ("1", "true", "yes")
+
+# Dependencies that only the results page needs and app.py loads lazily
+HEAVY_MODULES = ("quiz_agent", "mistralai", "scoring", "numpy", "plotly.graph_objects")
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+_report = {}
+_report_lock = threading.Lock()
+_report_started = False
+
+
+def parse_importtime(output: str) -> List[dict]:
+    """Parse ``-X importtime`` output into per-module self/cumulative seconds and depth."""
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append({
+            "module": name.strip(),
+            "depth": (len(name) - len(name.lstrip()) - 1) // 2,
+            "self_seconds": int(self_us) / 1e6,
+            "cumulative_seconds": int(cumulative_us) / 1e6,
+        })
+    return modules
+
+
+def import_time_report(module: str = "app", top: int = 20) -> dict:
+    """Cold-import ``module`` in a fresh interpreter and summarise where the time went."""
+    probe = (f"import sys; import {module}; "
+             f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", probe],
+        cwd=ROOT, capture_output=True, text=True, timeout=120,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"importing {module} failed: {result.stderr.strip().splitlines()[-1:]}")
+    modules = parse_importtime(result.stderr)
+    # -X importtime lists a module's imports before the module itself
+    total, direct, pending = None, [], []
+    for m in modules:
+        if m["depth"] == 0:
+            if m["module"] == module:
+                total, direct = m["cumulative_seconds"], pending
+            pending = []
+        elif m["depth"] == 1:
+            pending.append(m)
+    eager = [name for name in result.stdout.strip().split(",") if name]
+    return {
+        "module": module,
+        "total_seconds": total,
+        "slowest": sorted(direct, key=lambda m: m["cumulative_seconds"], reverse=True)[:top],
+        "slowest_self": sorted(modules, key=lambda m: m["self_seconds"], reverse=True)[:top],
+        "eager_heavy_modules": eager,
+        "deferred_heavy_modules": [name for name in HEAVY_MODULES if name not in eager],
+    }
+
+
+def format_report(report: dict) -> str:
+    lines = [f"Cold import of {report['module']}: {report['total_seconds']:.3f}s"]
+    lines.append(f"  Slowest imports made by {report['module']} (cumulative):")
+    for m in report["slowest"]:
+        lines.append(f"    {m['cumulative_seconds'] * 1e3:9.1f} ms  {m['module']}")
+    lines.append("  Slowest modules (self):")
+    for m in report["slowest_self"]:
+        lines.append(f"    {m['self_seconds'] * 1e3:9.1f} ms  {m['module']}")
+    lines.append(f"  Loaded eagerly: {', '.join(report['eager_heavy_modules']) or 'none of the heavy modules'}")
+    lines.append(f"  Deferred until needed: {', '.join(report['deferred_heavy_modules']) or 'nothing'}")
+    return "\n".join(lines)
+
+
+def log_startup_report(module: str = "app"):
+    """Measure and print the import report once per process, in the background."""
+    global _report_started
+    if not STARTUP_DIAGNOSTICS:
+        return
+    with _report_lock:
+        if _report_started:
+            return
+        _report_started = True
+
+    def run():
+        try:
+            report = import_time_report(module, top=10)
+        except Exception as e:
+            print(f"Startup diagnostics failed: {str(e)}")
+            return
+        with _report_lock:
+            _report.update(report)
+        print(format_report(report))
+
+    threading.Thread(target=run, name="startup-diagnostics", daemon=True).start()
+
+
+def _collect_startup_gauges() -> Dict[str, float]:
+    with _report_lock:
+        total = _report.get("total_seconds")
+    return {"app_cold_import_seconds": total} if total is not None else {}
+
+
+register_collector(_collect_startup_gauges)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--module", default="app", help="module to cold-import")
+    parser.add_argument("--top", type=int, default=20, help="how many imports to list")
+    args = parser.parse_args()
+    print(format_report(import_time_report(args.module, args.top)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+"""
+Local stand-in for the Mistral chat completions endpoint.
+
+    python loadtest/mock_mistral.py [--port 8089] [--latency-ms 1500] [--error-rate 0.02]
+
+Serves POST /v1/chat/completions in both the plain and the streaming (SSE)
+flavour with a canned personality analysis, after a latency drawn from a
+configurable distribution. A share of requests can fail with 429s or 500s.
+GET /stats returns request counts and latency percentiles; POST /reset
+clears them. Point the app at it with MISTRAL_ENDPOINT=http://127.0.0.1:8089.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CANNED_RESULT = {
+    "title": "The Midnight Strategist",
+    "type": "INFJ",
+    "emoji": "🌙",
+    "description": (
+        "You're the friend who notices when the group chat goes quiet and quietly checks in. "
+        "Your answers lean towards reflection over noise and plans over improvisation.\n\n"
+        "Under pressure you go inward first, then come back with a surprisingly complete plan."
+    ),
+    "traits": ["Reflective", "Warm but private", "Future-focused"],
+    "strengths": ["Reading the room", "Long-term planning", "Loyalty"],
+    "growth_areas": ["Asking for help", "Letting plans change", "Resting without guilt"],
+}
+
+CANNED_TEXT = "\n".join([
+    f"TITLE: {CANNED_RESULT['title']}",
+    f"TYPE: {CANNED_RESULT['type']}",
+    f"EMOJI: {CANNED_RESULT['emoji']}",
+    "DESCRIPTION:",
+    CANNED_RESULT["description"],
+    f"TRAITS: {', '.join(CANNED_RESULT['traits'])}",
+    f"STRENGTHS: {', '.join(CANNED_RESULT['strengths'])}",
+    f"GROWTH_AREAS: {', '.join(CANNED_RESULT['growth_areas'])}",
+])
+
+
+class MockConfig:
+    """Tunable behaviour of the stand-in server."""
+
+    def __init__(self, latency_ms: float = 1500, latency_dist: str = "lognormal",
+                 latency_sigma: float = 0.5, error_rate: float = 0.0,
+                 rate_limit_rate: float = 0.0, chunk_chars: int = 40,
+                 chunk_interval_ms: float = 30, seed: int = None):
+        self.latency_ms = latency_ms
+        self.latency_dist = latency_dist
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.chunk_chars = chunk_chars
+        self.chunk_interval_ms = chunk_interval_ms
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def latency(self) -> float:
+        """Seconds before the first byte of a response."""
+        with self._lock:
+            if self.latency_dist == "fixed":
+                ms = self.latency_ms
+            elif self.latency_dist == "uniform":
+                ms = self._random.uniform(0, 2 * self.latency_ms)
+            else:
+                # Median of latency_ms with a long right tail, like the real API
+                ms = self.latency_ms * self._random.lognormvariate(0, self.latency_sigma)
+        return ms / 1e3
+
+    def outcome(self) -> int:
+        """HTTP status for the next request."""
+        with self._lock:
+            roll = self._random.random()
+        if roll < self.rate_limit_rate:
+            return 429
+        if roll < self.rate_limit_rate + self.error_rate:
+            return 500
+        return 200
+
+
+class MockStats:
+    """Request counters and latency samples for GET /stats."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counts = {"requests": 0, "streamed": 0, "json_mode": 0, "ok": 0,
+                           "rate_limited": 0, "errors": 0, "in_flight": 0, "peak_in_flight": 0}
+            self.latencies = []
+
+    def start(self, stream: bool, json_mode: bool):
+        with self._lock:
+            self.counts["requests"] += 1
+            self.counts["streamed"] += stream
+            self.counts["json_mode"] += json_mode
+            self.counts["in_flight"] += 1
+            self.counts["peak_in_flight"] = max(self.counts["peak_in_flight"], self.counts["in_flight"])
+
+    def finish(self, status: int, seconds: float):
+        with self._lock:
+            self.counts["in_flight"] -= 1
+            key = {200: "ok", 429: "rate_limited"}.get(status, "errors")
+            self.counts[key] += 1
+            self.latencies.append(seconds)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            data = dict(self.counts)
+            latencies = sorted(self.latencies)
+        for pct in (50, 95, 99):
+            data[f"p{pct}_seconds"] = (
+                round(latencies[min(len(latencies) - 1, int(len(latencies) * pct / 100))], 3)
+                if latencies else None
+            )
+        return data
+
+
+def _usage(body: dict, completion: str) -> dict:
+    prompt_chars = sum(len(m.get("content", "")) for m in body.get("messages", []))
+    prompt_tokens = prompt_chars // 4 + 1
+    completion_tokens = len(completion) // 4 + 1
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens}
+
+
+class MockMistralHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so the client's connection pool is exercised
+    config: MockConfig = None
+    stats: MockStats = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload: dict):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/stats":
+            self._send_json(200, self.stats.snapshot())
+        else:
+            self._send_json(404, {"message": "not found"})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        raw = self.rfile.read(length) if length else b""
+        if self.path == "/reset":
+            self.stats.reset()
+            self._send_json(200, {"reset": True})
+            return
+        if self.path.rstrip("/") != "/v1/chat/completions":
+            self._send_json(404, {"message": "not found"})
+            return
+
+        body = json.loads(raw or b"{}")
+        stream = bool(body.get("stream"))
+        json_mode = (body.get("response_format") or {}).get("type") == "json_object"
+        completion = json.dumps(CANNED_RESULT, ensure_ascii=False) if json_mode else CANNED_TEXT
+
+        started = time.monotonic()
+        self.stats.start(stream, json_mode)
+        status = self.config.outcome()
+        try:
+            time.sleep(self.config.latency())
+            if status != 200:
+                message = "Requests rate limit exceeded" if status == 429 else "Internal server error"
+                self._send_json(status, {"object": "error", "message": message})
+            elif stream:
+                self._stream(body, completion)
+            else:
+                self._send_json(200, {
+                    "id": uuid.uuid4().hex,
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": body.get("model", "mistral-medium"),
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": completion}}],
+                    "usage": _usage(body, completion),
+                })
+        finally:
+            self.stats.finish(status, time.monotonic() - started)
+
+    def _stream(self, body: dict, completion: str):
+        """Send the completion as server-sent events, one chunk every chunk_interval_ms."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def send_event(data: str):
+            payload = f"data: {data}\n\n".encode("utf-8")
+            self.wfile.write(f"{len(payload):X}\r\n".encode("ascii") + payload + b"\r\n")
+            self.wfile.flush()
+
+        response_id = uuid.uuid4().hex
+        model = body.get("model", "mistral-medium")
+        size = self.config.chunk_chars
+        pieces = [completion[i:i + size] for i in range(0, len(completion), size)]
+        for i, piece in enumerate(pieces):
+            last = i == len(pieces) - 1
+            chunk = {
+                "id": response_id,
+                "object": "chat.completion.chunk",
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": piece},
+                             "finish_reason": "stop" if last else None}],
+            }
+            if last:
+                chunk["usage"] = _usage(body, completion)
+            send_event(json.dumps(chunk, ensure_ascii=False))
+            if not last:
+                time.sleep(self.config.chunk_interval_ms / 1e3)
+        send_event("[DONE]")
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+
+def start_server(config: MockConfig, host: str = "127.0.0.1", port: int = 0):
+    """Start the server on a background thread; returns (server, stats, base url)."""
+    stats = MockStats()
+    handler = type("Handler", (MockMistralHandler,), {"config": config, "stats": stats})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="mock-mistral", daemon=True).start()
+    return server, stats, f"http://{host}:{server.server_address[1]}"
+
+
+def add_config_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--latency-ms", type=float, default=1500, help="median time to first byte")
+    parser.add_argument("--latency-dist", choices=("lognormal", "uniform", "fixed"), default="lognormal")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="lognormal spread (tail weight)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests failing with 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="share of requests failing with 429")
+    parser.add_argument("--chunk-chars", type=int, default=40, help="characters per streamed chunk")
+    parser.add_argument("--chunk-interval-ms", type=float, default=30, help="delay between streamed chunks")
+    parser.add_argument("--seed", type=int, help="seed for reproducible latencies and errors")
+
+
+def config_from_args(args) -> MockConfig:
+    return MockConfig(latency_ms=args.latency_ms, latency_dist=args.latency_dist,
+                      latency_sigma=args.latency_sigma, error_rate=args.error_rate,
+                      rate_limit_rate=args.rate_limit_rate, chunk_chars=args.chunk_chars,
+                      chunk_interval_ms=args.chunk_interval_ms, seed=args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    server, _, url = start_server(config_from_args(args), args.host, args.port)
+    print(f"Mock Mistral listening on {url} (MISTRAL_ENDPOINT={url})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""
+Headless multi-session load test of the quiz flow.
+
+    python loadtest/run_load.py --sessions 200 --concurrency 25 [--latency-ms 1500 ...]
+
+Each simulated user runs app.py through Streamlit's AppTest: an answer
+click per question until the quiz ends (ten for the fixed quiz, fewer
+with QUIZ_MODE=adaptive), then reruns of the results page every ENRICHMENT_POLL_SECONDS
+until the full analysis lands (the browser would do this with the
+results fragment). All sessions share this process, so they share the
+Mistral client pool, rate limiter, caches and in-flight coalescing just
+like sessions on one server. Upstream calls go to the local stand-in from
+mock_mistral.py (started in-process unless --endpoint is given), never
+to the real API.
+
+Reports end-to-end latency (first page load to enriched result), time to
+the instant local result, reruns per session and upstream calls per
+completed quiz. AppTest reruns the whole script for every click, so the
+script time per rerun is an upper bound for answer clicks, which only
+rerun the question fragment in a real browser session.
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+APP_PATH = os.path.join(ROOT, "app.py")
+sys.path.insert(0, ROOT)
+
+from mock_mistral import add_config_arguments, config_from_args, start_server
+
+
+# AppTest installs a process-global Runtime for the duration of each run, so
+# script runs from different sessions can't overlap. Serializing them matches a
+# single server process anyway: reruns compete for the GIL, while the think
+# time, polling and background LLM work of all sessions still overlap.
+_script_lock = threading.Lock()
+
+
+def rerun(at, record: dict):
+    with _script_lock:
+        started = time.perf_counter()
+        at.run()
+        record["script_seconds"] += time.perf_counter() - started
+    record["reruns"] += 1
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+
+
+def percentiles(values) -> dict:
+    values = sorted(values)
+    if not values:
+        return {"p50": None, "p95": None, "p99": None, "max": None}
+    pick = lambda pct: round(values[min(len(values) - 1, int(len(values) * pct / 100))], 3)
+    return {"p50": pick(50), "p95": pick(95), "p99": pick(99), "max": round(values[-1], 3)}
+
+
+def answer_picker(rng: random.Random, distinct: int) -> random.Random:
+    """Source of option picks; ``distinct`` > 0 limits how many answer sets exist."""
+    return random.Random(rng.randrange(distinct)) if distinct else random.Random(rng.random())
+
+
+def run_session(session_id: int, args, poll_seconds: float) -> dict:
+    """Drive one user through the quiz and wait for the enriched result."""
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(args.seed * 100_003 + session_id)
+    picks = answer_picker(rng, args.distinct_answers)
+    record = {"session": session_id, "reruns": 0, "questions": 0, "script_seconds": 0.0,
+              "completed": False, "enriched": False, "error": None}
+    started = time.perf_counter()
+    try:
+        at = AppTest.from_file(APP_PATH, default_timeout=args.rerun_timeout)
+        rerun(at, record)
+        while not at.session_state.quiz_complete:
+            options = [button for button in at.button if button.key and button.key.startswith("q")]
+            time.sleep(rng.uniform(0, args.think_ms) / 1e3)
+            options[picks.randrange(len(options))].click()
+            rerun(at, record)
+            record["questions"] += 1
+        record["local_seconds"] = time.perf_counter() - started
+        record["completed"] = True
+
+        deadline = time.monotonic() + args.result_timeout
+        while not any("results are in" in s.value for s in at.success):
+            if time.monotonic() > deadline:
+                raise TimeoutError("enriched result did not arrive in time")
+            time.sleep(poll_seconds)
+            rerun(at, record)
+        record["enriched"] = True
+        record["e2e_seconds"] = time.perf_counter() - started
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+    return record
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=100, help="simulated users in total")
+    parser.add_argument("--concurrency", type=int, default=20, help="users active at the same time")
+    parser.add_argument("--ramp-seconds", type=float, default=0, help="spread session starts over this long")
+    parser.add_argument("--think-ms", type=float, default=0, help="max random pause before each click")
+    parser.add_argument("--distinct-answers", type=int, default=0,
+                        help="limit users to this many distinct answer sets (0 = random)")
+    parser.add_argument("--result-timeout", type=float, default=120, help="seconds to wait for the enriched result")
+    parser.add_argument("--rerun-timeout", type=float, default=30, help="AppTest timeout per rerun")
+    parser.add_argument("--endpoint", help="use an already running stand-in instead of starting one")
+    parser.add_argument("--output", help="also write the report as JSON to this path")
+    parser.add_argument("--result-store", help="result store URL to use (default: a fresh SQLite file per run)")
+    add_config_arguments(parser)
+    args = parser.parse_args()
+    if args.seed is None:
+        args.seed = 0
+
+    stats_url = None
+    mock_stats = None
+    if args.endpoint:
+        endpoint = args.endpoint.rstrip("/")
+        stats_url = f"{endpoint}/stats"
+    else:
+        _, mock_stats, endpoint = start_server(config_from_args(args))
+    os.environ["MISTRAL_ENDPOINT"] = endpoint
+    os.environ.setdefault("MISTRAL_API_KEY", "loadtest")
+    # Results left over from an earlier run would hide the upstream load
+    os.environ["RESULT_STORE"] = args.result_store or f"sqlite:///{tempfile.mkdtemp(prefix='loadtest-')}/results.db"
+
+    # AppTest's helper threads have no ScriptRunContext; the warning is expected here
+    # (a filter, because Streamlit resets its loggers' levels when it loads config)
+    logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").addFilter(
+        lambda record: "missing ScriptRunContext" not in record.getMessage()
+    )
+
+    # Imported after the environment is set, exactly as the app will see it
+    import httpx
+    import quiz_agent
+    from app import ENRICHMENT_POLL_SECONDS
+
+    def upstream_stats() -> dict:
+        if mock_stats is not None:
+            return mock_stats.snapshot()
+        return httpx.get(stats_url, timeout=10).json()
+
+    before = upstream_stats()
+    print(f"Driving {args.sessions} sessions ({args.concurrency} concurrent) against {endpoint}")
+
+    records = []
+    records_lock = threading.Lock()
+    started = time.perf_counter()
+
+    def session(i: int):
+        if args.ramp_seconds:
+            delay = started + args.ramp_seconds * i / args.sessions - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        record = run_session(i, args, ENRICHMENT_POLL_SECONDS)
+        with records_lock:
+            records.append(record)
+            if len(records) % max(1, args.sessions // 10) == 0:
+                print(f"  {len(records)}/{args.sessions} sessions finished")
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(session, range(args.sessions)))
+    wall = time.perf_counter() - started
+
+    after = upstream_stats()
+    completed = [r for r in records if r["completed"]]
+    enriched = [r for r in records if r["enriched"]]
+    upstream_calls = after["requests"] - before["requests"]
+    errors = {}
+    for r in records:
+        if r["error"]:
+            errors[r["error"]] = errors.get(r["error"], 0) + 1
+
+    report = {
+        "sessions": args.sessions,
+        "concurrency": args.concurrency,
+        "wall_seconds": round(wall, 2),
+        "completed": len(completed),
+        "enriched": len(enriched),
+        "quizzes_per_second": round(len(enriched) / wall, 2) if wall else None,
+        "e2e_seconds": percentiles([r["e2e_seconds"] for r in enriched]),
+        "local_result_seconds": percentiles([r["local_seconds"] for r in completed]),
+        "questions_per_quiz": percentiles([r["questions"] for r in completed]),
+        "reruns_per_session": percentiles([r["reruns"] for r in records]),
+        "script_seconds_per_rerun": percentiles([r["script_seconds"] / r["reruns"] for r in records if r["reruns"]]),
+        "upstream_calls": upstream_calls,
+        "upstream_calls_per_completed_quiz": round(upstream_calls / len(completed), 3) if completed else None,
+        "upstream": after,
+        "coalescing": quiz_agent.get_coalescing_stats(),
+        "cache": quiz_agent.get_cache_stats(),
+        "rate_limit": quiz_agent.get_rate_limit_stats(),
+        "fallbacks": quiz_agent.FALLBACKS.snapshot(),
+        "errors": errors,
+    }
+
+    print(f"\nCompleted {len(completed)}/{args.sessions}, enriched {len(enriched)} in {wall:.1f}s "
+          f"({report['quizzes_per_second']} quizzes/s)")
+    for label, key in (("End-to-end (s)", "e2e_seconds"), ("Local result (s)", "local_result_seconds"),
+                       ("Questions/quiz", "questions_per_quiz"), ("Reruns/session", "reruns_per_session"),
+                       ("Script s/rerun", "script_seconds_per_rerun")):
+        p = report[key]
+        print(f"  {label:<18} p50 {p['p50']}  p95 {p['p95']}  p99 {p['p99']}  max {p['max']}")
+    print(f"  Upstream calls     {upstream_calls} ({report['upstream_calls_per_completed_quiz']} per completed quiz), "
+          f"upstream p95 {after.get('p95_seconds')}s, peak in flight {after.get('peak_in_flight')}")
+    if report["fallbacks"]:
+        print(f"  Fallbacks          {report['fallbacks']}")
+    for error, count in errors.items():
+        print(f"  ERROR x{count}: {error}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+from typing import Callable, Dict, List, Optional, Tuple
+import os
+import json
+import time
+import bisect
+import logging
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from settings import load_env
+
+load_env()
+
+# Exporter configuration
+METRICS_PORT = os.getenv("METRICS_PORT")  # serve /metrics on this port
+METRICS_FILE = os.getenv("METRICS_FILE")  # or write the Prometheus text here
+METRICS_FILE_INTERVAL = float(os.getenv("METRICS_FILE_INTERVAL", "15"))
+METRICS_JSON_LOGS = os.getenv("METRICS_JSON_LOGS", "").lower() in ("1", "true", "yes")
+
+# Seconds; covers everything from prompt building to a slow LLM round trip
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+
+logger = logging.getLogger("quiz_agent.metrics")
+
+
+def _label_key(labels: Dict[str, str]) -> Tuple:
+    return tuple(sorted(labels.items()))
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(pairs: Tuple) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+class Counter:
+    """Monotonic counter with optional labels."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(_label_key(labels), 0)
+
+    def samples(self) -> List[Tuple[str, Tuple, float]]:
+        with self._lock:
+            return [(self.name, key, value) for key, value in self._values.items()]
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {_format_labels(key) or "total": value for key, value in self._values.items()}
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # label key -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def samples(self) -> List[Tuple[str, Tuple, float]]:
+        out = []
+        with self._lock:
+            series_items = [(key, list(series)) for key, series in self._series.items()]
+        for key, series in series_items:
+            running = 0
+            for bound, count in zip(self.buckets, series):
+                running += count
+                out.append((f"{self.name}_bucket", key + (("le", repr(float(bound))),), running))
+            out.append((f"{self.name}_bucket", key + (("le", "+Inf"),), series[-1]))
+            out.append((f"{self.name}_sum", key, series[-2]))
+            out.append((f"{self.name}_count", key, series[-1]))
+        return out
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                _format_labels(key) or "all": {"count": series[-1], "sum": round(series[-2], 6)}
+                for key, series in self._series.items()
+            }
+
+
+_registry = {}
+_registry_lock = threading.Lock()
+_collectors = []
+_timing_hooks = []
+
+
+def counter(name: str, help_text: str) -> Counter:
+    """Get or create a counter."""
+    with _registry_lock:
+        if name not in _registry:
+            _registry[name] = Counter(name, help_text)
+        return _registry[name]
+
+
+def histogram(name: str, help_text: str, buckets=DEFAULT_BUCKETS) -> Histogram:
+    """Get or create a histogram."""
+    with _registry_lock:
+        if name not in _registry:
+            _registry[name] = Histogram(name, help_text, buckets)
+        return _registry[name]
+
+
+STAGE_SECONDS = histogram("analysis_stage_seconds", "Wall time per analysis stage")
+
+
+def register_collector(fn: Callable[[], Dict[str, float]]):
+    """Add a callable returning gauge name -> value, read at export time."""
+    _collectors.append(fn)
+
+
+def add_timing_hook(fn: Callable[[str, float, dict], None]):
+    """Call ``fn(stage, seconds, labels)`` after every timed stage."""
+    _timing_hooks.append(fn)
+
+
+def remove_timing_hook(fn: Callable[[str, float, dict], None]):
+    if fn in _timing_hooks:
+        _timing_hooks.remove(fn)
+
+
+def record_stage(stage: str, seconds: float, **labels):
+    """Record a stage duration in the histogram and notify the timing hooks."""
+    STAGE_SECONDS.observe(seconds, stage=stage, **labels)
+    for hook in list(_timing_hooks):
+        try:
+            hook(stage, seconds, labels)
+        except Exception as e:
+            print(f"Timing hook error: {str(e)}")
+
+
+@contextmanager
+def timed(stage: str, **labels):
+    """Time the enclosed block as ``stage``."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - start, **labels)
+
+
+def log_event(event: str, **fields):
+    """Emit a structured JSON log line (only when JSON logs are enabled)."""
+    if _json_logs_enabled:
+        logger.info(json.dumps({"ts": round(time.time(), 3), "event": event, **fields},
+                               ensure_ascii=False, default=str))
+
+
+def _collect_gauges() -> Dict[str, float]:
+    gauges = {}
+    for fn in list(_collectors):
+        try:
+            gauges.update(fn())
+        except Exception as e:
+            print(f"Metrics collector error: {str(e)}")
+    return gauges
+
+
+def render_prometheus() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    with _registry_lock:
+        metrics = list(_registry.values())
+    for metric in metrics:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for name, key, value in metric.samples():
+            lines.append(f"{name}{_format_labels(key)} {value}")
+    for name, value in sorted(_collect_gauges().items()):
+        lines.append(f"# TYPE {name} gauge")
+        lines.append(f"{name} {float(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def snapshot() -> dict:
+    """All metrics as a JSON-friendly dict."""
+    with _registry_lock:
+        metrics = list(_registry.values())
+    data = {metric.name: metric.snapshot() for metric in metrics}
+    data["gauges"] = _collect_gauges()
+    return data
+
+
+def write_prometheus(path: str):
+    """Atomically write the Prometheus text to ``path`` (e.g. for node_exporter's textfile collector)."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(render_prometheus())
+    os.replace(tmp_path, path)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] == "/metrics":
+            body = render_prometheus().encode("utf-8")
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        elif self.path.split("?")[0] == "/metrics.json":
+            body = json.dumps(snapshot(), default=str).encode("utf-8")
+            content_type = "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _json_log_hook(stage: str, seconds: float, labels: dict):
+    log_event("stage", stage=stage, seconds=round(seconds, 6), **labels)
+
+
+_json_logs_enabled = False
+_exporters_started = False
+_exporters_lock = threading.Lock()
+
+
+def enable_json_logs():
+    """Log every timed stage and fallback as a JSON line on the quiz_agent.metrics logger."""
+    global _json_logs_enabled
+    if not _json_logs_enabled:
+        _json_logs_enabled = True
+        if not logger.handlers:
+            handler = logging.StreamHandler()
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logger.addHandler(handler)
+            logger.setLevel(logging.INFO)
+        add_timing_hook(_json_log_hook)
+
+
+def start_exporters(port: Optional[str] = METRICS_PORT, path: Optional[str] = METRICS_FILE,
+                    json_logs: bool = METRICS_JSON_LOGS):
+    """Start the configured exporters once per process; later calls do nothing."""
+    global _exporters_started
+    with _exporters_lock:
+        if _exporters_started:
+            return
+        _exporters_started = True
+
+    if json_logs:
+        enable_json_logs()
+    if port:
+        try:
+            server = ThreadingHTTPServer(("0.0.0.0", int(port)), _MetricsHandler)
+            threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        except OSError as e:
+            print(f"Could not start metrics server on port {port}: {str(e)}")
+    if path:
+        def write_periodically():
+            while True:
+                try:
+                    write_prometheus(path)
+                except OSError as e:
+                    print(f"Could not write metrics file: {str(e)}")
+                time.sleep(METRICS_FILE_INTERVAL)
+        threading.Thread(target=write_periodically, name="metrics-file", daemon=True).start()
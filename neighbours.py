@@ -0,0 +1,85 @@
+from typing import Optional, Tuple
+import threading
+import time
+
+import numpy as np
+
+
+class NeighbourIndex:
+    """
+    Previously computed analyses, searchable by answer similarity.
+
+    Each entry is an answer vector (one option index per question), the
+    locally scored type and the result. ``nearest`` finds the closest entry of
+    the same type by Hamming distance over the option indices, i.e. the
+    number of questions answered differently. Storage is a fixed block of
+    ``capacity`` rows; when it is full the least recently used entry is
+    evicted, so memory stays bounded.
+    """
+
+    def __init__(self, capacity: int, num_questions: int):
+        self.capacity = capacity
+        self._vectors = np.zeros((capacity, num_questions), dtype=np.int8)
+        self._types = np.full(capacity, -1, dtype=np.int8)  # -1 marks a free slot
+        self._last_used = np.zeros(capacity, dtype=np.float64)
+        self._results = [None] * capacity
+        self._lock = threading.Lock()
+        self._counts = {"lookups": 0, "hits": 0, "misses": 0, "inserts": 0, "evictions": 0}
+        self._distance_hist = {}
+
+    def add(self, indices: np.ndarray, type_code: int, result: dict):
+        """Store a result, replacing an existing entry with the same answers."""
+        with self._lock:
+            same = np.flatnonzero((self._types == type_code) & (self._vectors == indices).all(axis=1))
+            if len(same):
+                slot = int(same[0])
+            else:
+                free = np.flatnonzero(self._types < 0)
+                if len(free):
+                    slot = int(free[0])
+                else:
+                    slot = int(np.argmin(self._last_used))
+                    self._counts["evictions"] += 1
+                self._counts["inserts"] += 1
+            self._vectors[slot] = indices
+            self._types[slot] = type_code
+            self._last_used[slot] = time.monotonic()
+            self._results[slot] = result
+
+    def nearest(self, indices: np.ndarray, type_code: int,
+                max_distance: int) -> Tuple[Optional[int], Optional[np.ndarray], Optional[dict]]:
+        """
+        The closest stored result of the same type within ``max_distance``.
+
+        Returns (distance, stored answer vector, result) or (None, None, None).
+        Ties go to the most recently used entry.
+        """
+        with self._lock:
+            self._counts["lookups"] += 1
+            candidates = np.flatnonzero(self._types == type_code)
+            if len(candidates):
+                distances = (self._vectors[candidates] != indices).sum(axis=1)
+                best = distances.min()
+                if best <= max_distance:
+                    tied = candidates[distances == best]
+                    slot = int(tied[np.argmax(self._last_used[tied])])
+                    self._last_used[slot] = time.monotonic()
+                    self._counts["hits"] += 1
+                    self._distance_hist[int(best)] = self._distance_hist.get(int(best), 0) + 1
+                    return int(best), self._vectors[slot].copy(), self._results[slot]
+            self._counts["misses"] += 1
+            return None, None, None
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._counts)
+            stats["size"] = int(np.count_nonzero(self._types >= 0))
+            stats["hits_by_distance"] = dict(sorted(self._distance_hist.items()))
+        stats["capacity"] = self.capacity
+        stats["hit_rate"] = round(stats["hits"] / stats["lookups"], 3) if stats["lookups"] else 0.0
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._types[:] = -1
+            self._results = [None] * self.capacity
@@ -0,0 +1,122 @@
+"""
+The question bank: every quiz item with its per-option axis weights.
+
+Items live in a JSON file (question_bank.json by default, or the file named
+by QUESTION_BANK):
+
+    {
+      "axes": ["E", "N", "T", "J"],
+      "fixed_quiz": ["secret", "friday", ...],
+      "questions": [
+        {"id": "secret", "text": "Your friend just spilled a huge secret. You...",
+         "options": [{"text": "Can't help but tell someone else", "weights": {"E": 2, "J": -1}}, ...]},
+        ...
+      ]
+    }
+
+Weights are keyed by the first letter of an axis; positive values lean
+towards that letter, negative ones towards its opposite, and missing axes
+are 0. "fixed_quiz" lists the classic question set, in order, that everyone
+answers unless the adaptive quiz is switched on.
+"""
+from typing import Dict, List, Optional
+import json
+import os
+import re
+import threading
+
+from settings import load_env
+
+load_env()
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+QUESTION_BANK_PATH = os.getenv("QUESTION_BANK", os.path.join(ROOT, "question_bank.json"))
+
+# Item ids appear in shared result links, so they stay URL- and code-friendly
+ID_PATTERN = re.compile(r"^[a-z0-9_]+$")
+
+
+class QuestionBank:
+    """
+    A loaded item pool.
+
+    ``questions`` holds one dict per item in file order, shaped like the
+    quiz's question dicts ("text" and option texts under "options") plus
+    its "id" and a (first letter, ...) weight tuple per option under
+    "weights".
+    """
+
+    def __init__(self, axes: List[str], questions: List[dict], fixed_ids: List[str]):
+        self.axes = axes
+        self.questions = questions
+        self.positions = {q["id"]: i for i, q in enumerate(questions)}
+        self.fixed_positions = [self.positions[item_id] for item_id in fixed_ids]
+
+    def __len__(self) -> int:
+        return len(self.questions)
+
+    def get(self, item_id: str) -> Optional[dict]:
+        position = self.positions.get(item_id)
+        return self.questions[position] if position is not None else None
+
+    @property
+    def fixed_quiz(self) -> List[dict]:
+        """The classic question set, in order."""
+        return [self.questions[position] for position in self.fixed_positions]
+
+
+def parse_question_bank(data: dict, source: str = "question bank") -> QuestionBank:
+    """Validate decoded bank JSON and build a QuestionBank; raises ValueError on any problem."""
+    axes = data.get("axes")
+    if not isinstance(axes, list) or not axes or not all(isinstance(a, str) for a in axes):
+        raise ValueError(f"{source}: 'axes' must be a list of axis letters")
+    questions, seen = [], set()
+    for n, item in enumerate(data.get("questions") or []):
+        item_id = item.get("id")
+        where = f"{source}: question {item_id or n}"
+        if not isinstance(item_id, str) or not ID_PATTERN.match(item_id):
+            raise ValueError(f"{where}: 'id' must be lowercase letters, digits and underscores")
+        if item_id in seen:
+            raise ValueError(f"{where}: duplicate id")
+        seen.add(item_id)
+        options = item.get("options") or []
+        if not item.get("text") or len(options) < 2:
+            raise ValueError(f"{where}: needs 'text' and at least two options")
+        weights = []
+        for option in options:
+            unknown = set(option.get("weights", {})) - set(axes)
+            if not option.get("text") or unknown:
+                raise ValueError(f"{where}: every option needs 'text' and weights keyed by {axes}")
+            weights.append(tuple(option.get("weights", {}).get(axis, 0) for axis in axes))
+        questions.append({
+            "id": item_id,
+            "text": item["text"],
+            "options": [option["text"] for option in options],
+            "weights": weights,
+        })
+    if not questions:
+        raise ValueError(f"{source}: no questions")
+
+    fixed_ids = data.get("fixed_quiz") or [q["id"] for q in questions]
+    missing = [item_id for item_id in fixed_ids if item_id not in seen]
+    if missing:
+        raise ValueError(f"{source}: fixed_quiz names unknown questions {missing}")
+    return QuestionBank(axes, questions, fixed_ids)
+
+
+def load_question_bank(path: str = QUESTION_BANK_PATH) -> QuestionBank:
+    """Read and validate a question bank file."""
+    with open(path, encoding="utf-8") as f:
+        return parse_question_bank(json.load(f), source=path)
+
+
+_banks: Dict[str, QuestionBank] = {}
+_banks_lock = threading.Lock()
+
+
+def get_question_bank(path: str = QUESTION_BANK_PATH) -> QuestionBank:
+    """The process-wide bank for ``path``, loaded on first use."""
+    with _banks_lock:
+        if path not in _banks:
+            _banks[path] = load_question_bank(path)
+        return _banks[path]
@@ -1,23 +1,943 @@
-from typing import Dict
+from typing import Callable, Dict, Iterator, List, MutableMapping, Optional, Tuple
 import random
 from mistralai.client import MistralClient
 from mistralai.models.chat_completion import ChatMessage
 import os
-from dotenv import load_dotenv
+import json
+import time
+import atexit
+import hashlib
+import queue
+import threading
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+import httpx
+import numpy as np
+from settings import load_env
+from scoring import (WEIGHT_MATRIX, answer_code, encode_answers, score_answers, score_indices, tiebreak_scores,
+                     type_letters)
+from archetypes import TYPE_INDEX, get_archetype_index, questions_fingerprint
+from neighbours import NeighbourIndex
+from result_store import ResultStore, get_result_store
+from metrics import counter, histogram, log_event, record_stage, register_collector, timed
 
 # Load environment variables
-load_dotenv()
+load_env()
+
+# Analysis settings - all of these are part of the result cache key
+ANALYSIS_MODEL = "mistral-medium"
+ANALYSIS_TEMPERATURE = 0.9
+ANALYSIS_MAX_TOKENS = 1500
+PROMPT_VERSION = "1"  # bump whenever the prompt template changes
+# "text" parses TITLE:/TYPE:/... lines; "json" asks the model for a JSON object
+ANALYSIS_OUTPUT_FORMAT = os.getenv("ANALYSIS_OUTPUT_FORMAT", "text")
+# "single" writes every section in one generation; "split" writes the description
+# in one call while the short sections come from a cheaper model concurrently
+ANALYSIS_MODE = os.getenv("ANALYSIS_MODE", "single")
+SPLIT_FIELDS_MODEL = os.getenv("SPLIT_FIELDS_MODEL", "mistral-small")
+SPLIT_DESCRIPTION_MAX_TOKENS = int(os.getenv("SPLIT_DESCRIPTION_MAX_TOKENS", "1100"))
+SPLIT_FIELDS_MAX_TOKENS = int(os.getenv("SPLIT_FIELDS_MAX_TOKENS", "400"))
+# Model per result section in split mode; ANALYSIS_SECTION_MODELS overrides
+# single sections, e.g. "traits=mistral-medium,description=mistral-large"
+SECTION_MODELS = {key: SPLIT_FIELDS_MODEL for key in ("title", "type", "emoji", "traits", "strengths", "growth_areas")}
+SECTION_MODELS["description"] = ANALYSIS_MODEL
+SECTION_MODELS.update((part.strip() for part in item.split("=", 1))
+                      for item in os.getenv("ANALYSIS_SECTION_MODELS", "").split(",") if "=" in item)
+# "verbose" sends the original prompt; "compact" a condensed one that sends
+# answers as "Q3=b" codes, resolved by a question legend in the system prompt
+PROMPT_MODE = os.getenv("PROMPT_MODE", "verbose")
+# Estimated input tokens an analysis prompt may use (0 = no limit). Longer
+# prompts are built compact, then their longest answers are shortened
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "0"))
+
+# Result cache configuration
+CACHE_MAX_ENTRIES = int(os.getenv("ANALYSIS_CACHE_SIZE", "1024"))
+CACHE_TTL_SECONDS = float(os.getenv("ANALYSIS_CACHE_TTL", "86400"))
+
+# Shared Mistral client configuration
+CLIENT_POOL_SIZE = int(os.getenv("MISTRAL_POOL_SIZE", "20"))
+CLIENT_KEEPALIVE_SECONDS = float(os.getenv("MISTRAL_KEEPALIVE_SECONDS", "60"))
+CLIENT_TIMEOUT_SECONDS = int(os.getenv("MISTRAL_TIMEOUT", "120"))
+CLIENT_MAX_RETRIES = int(os.getenv("MISTRAL_MAX_RETRIES", "5"))
+CLIENT_ENDPOINT = os.getenv("MISTRAL_ENDPOINT", "https://api.mistral.ai")  # e.g. a local stand-in for load tests
+
+# Shared admission control for Mistral calls
+RATE_LIMIT_RPS = float(os.getenv("MISTRAL_RATE_LIMIT_RPS", "5"))
+RATE_LIMIT_TPM = float(os.getenv("MISTRAL_RATE_LIMIT_TPM", "500000"))
+RATE_LIMIT_QUEUE = int(os.getenv("MISTRAL_RATE_LIMIT_QUEUE", "100"))
+RATE_LIMIT_MAX_WAIT = float(os.getenv("MISTRAL_RATE_LIMIT_MAX_WAIT", "20"))
+
+# Tail-latency controls for the analysis call
+ANALYSIS_DEADLINE_SECONDS = float(os.getenv("ANALYSIS_DEADLINE", "45"))
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "95"))  # 0 disables hedging
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+BREAKER_WINDOW = int(os.getenv("BREAKER_WINDOW", "50"))
+BREAKER_MIN_REQUESTS = int(os.getenv("BREAKER_MIN_REQUESTS", "10"))
+BREAKER_FAILURE_RATE = float(os.getenv("BREAKER_FAILURE_RATE", "0.5"))
+# Slow means no first token within this long; only streams can tell, since a
+# blocking call's total time mostly depends on how much it generates
+BREAKER_SLOW_SECONDS = float(os.getenv("BREAKER_SLOW_SECONDS", "30"))
+BREAKER_COOLDOWN_SECONDS = float(os.getenv("BREAKER_COOLDOWN", "30"))
+
+# Archetype library (see archetypes.py), used whenever an index file exists
+ARCHETYPES_ENABLED = os.getenv("ARCHETYPES_ENABLED", "1").lower() in ("1", "true", "yes")
+# Add a short personalized intro to type-level archetypes with a cheap call
+ARCHETYPE_PERSONALIZE = os.getenv("ARCHETYPE_PERSONALIZE", "1").lower() in ("1", "true", "yes")
+PERSONALIZE_MODEL = os.getenv("PERSONALIZE_MODEL", "mistral-small")
+PERSONALIZE_MAX_TOKENS = int(os.getenv("PERSONALIZE_MAX_TOKENS", "250"))
+
+# Reuse of stored analyses for answers within this many differing questions
+# (same local type); a little further away, one serves as a template for a
+# short follow-up call instead of a full generation. 0 disables either.
+# Both are off by default: analyses quote specific answers, so a reused one
+# (and a template, whose text is kept and only added to) can cite an answer
+# this user didn't give
+NEIGHBOUR_REUSE_DISTANCE = int(os.getenv("NEIGHBOUR_REUSE_DISTANCE", "0"))
+NEIGHBOUR_TEMPLATE_DISTANCE = int(os.getenv("NEIGHBOUR_TEMPLATE_DISTANCE", "0"))
+NEIGHBOUR_INDEX_SIZE = int(os.getenv("NEIGHBOUR_INDEX_SIZE", "10000"))
+
+# Worker threads for background LLM enrichment; one per pooled connection by default
+ENRICHMENT_WORKERS = int(os.getenv("ENRICHMENT_WORKERS", str(CLIENT_POOL_SIZE)))
+
+_shared_client = None
+_shared_client_lock = threading.Lock()
+_client_usage = {"created_at": None, "requests": 0, "in_flight": 0, "peak_in_flight": 0}
+
+
+def _create_client(api_key: str) -> MistralClient:
+    """Create a Mistral client whose HTTP pool is sized for many concurrent sessions."""
+    client = MistralClient(api_key=api_key, endpoint=CLIENT_ENDPOINT,
+                           max_retries=CLIENT_MAX_RETRIES, timeout=CLIENT_TIMEOUT_SECONDS)
+    # MistralClient doesn't expose its connection limits, so swap in a pooled transport
+    limits = httpx.Limits(
+        max_connections=CLIENT_POOL_SIZE,
+        max_keepalive_connections=CLIENT_POOL_SIZE,
+        keepalive_expiry=CLIENT_KEEPALIVE_SECONDS,
+    )
+    client._client.close()
+    client._client = httpx.Client(
+        follow_redirects=True,
+        timeout=CLIENT_TIMEOUT_SECONDS,
+        transport=httpx.HTTPTransport(retries=CLIENT_MAX_RETRIES, limits=limits),
+    )
+    return client
+
+
+def get_shared_client() -> MistralClient:
+    """Return the process-wide Mistral client, creating it on first use."""
+    global _shared_client
+    with _shared_client_lock:
+        if _shared_client is None:
+            api_key = os.getenv("MISTRAL_API_KEY")
+            if not api_key:
+                raise ValueError("MISTRAL_API_KEY not found in environment variables")
+            _shared_client = _create_client(api_key)
+            _client_usage["created_at"] = time.time()
+        return _shared_client
+
+
+def close_shared_client():
+    """Close the shared client's connection pool. Safe to call more than once."""
+    global _shared_client
+    with _shared_client_lock:
+        if _shared_client is not None:
+            _shared_client._client.close()
+            _shared_client = None
+            _client_usage["created_at"] = None
+
+
+atexit.register(close_shared_client)
+
+
+@contextmanager
+def _track_request():
+    """Count concurrent upstream requests so the pool size can be tuned against them."""
+    with _shared_client_lock:
+        _client_usage["requests"] += 1
+        _client_usage["in_flight"] += 1
+        _client_usage["peak_in_flight"] = max(_client_usage["peak_in_flight"], _client_usage["in_flight"])
+    try:
+        yield
+    finally:
+        with _shared_client_lock:
+            _client_usage["in_flight"] -= 1
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token) for budgeting."""
+    return len(text) // 4 + 1
+
+
+class TokenBucket:
+    """Classic token bucket: holds up to ``capacity`` and refills at ``rate`` per second."""
+
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.level = capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def time_until(self, amount: float) -> float:
+        """Seconds until ``amount`` is available (0 if it already is)."""
+        missing = amount - self.level
+        if missing <= 0:
+            return 0.0
+        return missing / self.rate if self.rate > 0 else float("inf")
+
+
+class Ticket:
+    """A caller's place in the rate limiter queue."""
+
+    def __init__(self, limiter: "RateLimiter", tokens: int):
+        self.limiter = limiter
+        self.tokens = tokens
+        self.status = "queued"  # queued -> admitted | rejected | timed_out
+
+    @property
+    def admitted(self) -> bool:
+        return self.status == "admitted"
+
+    def position(self) -> int:
+        """1-based position in the queue, or 0 once the ticket has left it."""
+        return self.limiter.position(self)
+
+    def estimated_wait(self) -> float:
+        """Estimated seconds until this ticket is admitted."""
+        return self.limiter.estimated_wait(self)
+
+
+class RateLimiter:
+    """
+    Shared admission control for upstream calls.
+
+    Requests wait in a bounded FIFO queue until both the requests/sec and the
+    tokens/min budgets allow them through. Callers that would wait longer than
+    ``max_wait`` (or find the queue full) are turned away immediately so they
+    can serve the local result instead of piling up behind a 429.
+    """
+
+    def __init__(self, requests_per_second: float = RATE_LIMIT_RPS,
+                 tokens_per_minute: float = RATE_LIMIT_TPM,
+                 max_queue: int = RATE_LIMIT_QUEUE,
+                 max_wait: float = RATE_LIMIT_MAX_WAIT):
+        self.requests = TokenBucket(max(1.0, requests_per_second), requests_per_second)
+        self.tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60)
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._counts = {"admitted": 0, "rejected": 0, "timed_out": 0}
+
+    def acquire(self, tokens: int, timeout: Optional[float] = None,
+                on_queue: Optional[Callable[[Ticket], None]] = None) -> Ticket:
+        """Queue for admission and block until admitted, rejected or timed out."""
+        timeout = self.max_wait if timeout is None else timeout
+        ticket = Ticket(self, tokens)
+        with self._cond:
+            self._refill()
+            if len(self._queue) >= self.max_queue or tokens > self.tokens.capacity:
+                return self._finish(ticket, "rejected")
+            self._queue.append(ticket)
+            if self._estimated_wait(ticket) > timeout:
+                return self._finish(ticket, "rejected")
+        if on_queue is not None:
+            on_queue(ticket)
+
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                self._refill()
+                wait = None
+                if self._queue[0] is ticket:
+                    wait = max(self.requests.time_until(1), self.tokens.time_until(tokens))
+                    if wait <= 0:
+                        self.requests.level -= 1
+                        self.tokens.level -= tokens
+                        return self._finish(ticket, "admitted")
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return self._finish(ticket, "timed_out")
+                self._cond.wait(remaining if wait is None else min(wait, remaining))
+
+    def settle(self, ticket: Ticket, actual_tokens: int):
+        """Refund the unused part of an admitted ticket's token estimate."""
+        if not ticket.admitted:
+            return
+        with self._cond:
+            self._refill()
+            self.tokens.level = min(self.tokens.capacity,
+                                    self.tokens.level + max(0, ticket.tokens - actual_tokens))
+            self._cond.notify_all()
+
+    def position(self, ticket: Ticket) -> int:
+        with self._cond:
+            for i, queued in enumerate(self._queue):
+                if queued is ticket:
+                    return i + 1
+        return 0
+
+    def estimated_wait(self, ticket: Ticket) -> float:
+        with self._cond:
+            self._refill()
+            return self._estimated_wait(ticket)
+
+    def stats(self) -> dict:
+        """Admission counts and current queue depth."""
+        with self._cond:
+            counts = dict(self._counts)
+            counts["queued"] = len(self._queue)
+        counts["max_queue"] = self.max_queue
+        return counts
+
+    def _estimated_wait(self, ticket: Ticket) -> float:
+        # Everyone ahead (and the ticket itself) has to fit through both buckets
+        requests_needed = 0
+        tokens_needed = 0
+        for queued in self._queue:
+            requests_needed += 1
+            tokens_needed += queued.tokens
+            if queued is ticket:
+                return max(self.requests.time_until(requests_needed),
+                           self.tokens.time_until(tokens_needed))
+        return 0.0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.requests.refill(now)
+        self.tokens.refill(now)
+
+    def _finish(self, ticket: Ticket, status: str) -> Ticket:
+        if ticket in self._queue:
+            self._queue.remove(ticket)
+        ticket.status = status
+        self._counts[status] += 1
+        self._cond.notify_all()
+        return ticket
+
+
+_rate_limiter = RateLimiter()
+
+
+def get_rate_limit_stats() -> dict:
+    """Admission counts and queue depth of the shared rate limiter."""
+    return _rate_limiter.stats()
+
+
+class DeadlineExceeded(Exception):
+    """The analysis didn't finish within its deadline."""
+
+
+class UpstreamUnavailable(Exception):
+    """An upstream call was refused or came back empty; ``reason`` is the fallback reason."""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class LatencyTracker:
+    """Rolling window of recent upstream latencies."""
+
+    def __init__(self, size: int = 200):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))
+        return samples[index]
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+
+class CircuitBreaker:
+    """
+    Stops calling upstream while it is failing or too slow.
+
+    Outcomes are kept in a rolling window; once at least ``min_requests`` are
+    recorded and the share of errors and slow calls reaches ``failure_rate``
+    the breaker opens and every call short-circuits to the fallback. After
+    ``cooldown`` seconds a single probe is let through (half-open): success
+    closes the breaker again, failure re-opens it.
+    """
+
+    def __init__(self, window: int = BREAKER_WINDOW,
+                 min_requests: int = BREAKER_MIN_REQUESTS,
+                 failure_rate: float = BREAKER_FAILURE_RATE,
+                 slow_seconds: float = BREAKER_SLOW_SECONDS,
+                 cooldown: float = BREAKER_COOLDOWN_SECONDS):
+        self.min_requests = min_requests
+        self.failure_rate = failure_rate
+        self.slow_seconds = slow_seconds
+        self.cooldown = cooldown
+        self.state = "closed"
+        self._outcomes = deque(maxlen=window)  # True for a failed or slow call
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+        self._counts = {"short_circuited": 0, "opened": 0}
+
+    def allow(self) -> bool:
+        """Whether a call may go upstream right now."""
+        with self._lock:
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.cooldown:
+                self.state = "half_open"
+            if self.state == "closed":
+                return True
+            if self.state == "half_open" and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self._counts["short_circuited"] += 1
+            return False
+
+    def cancel(self):
+        """Give back an allowed call that never went upstream."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record(self, success: bool, latency: Optional[float] = None):
+        """
+        Record the outcome of an allowed call.
+
+        ``latency`` is the time to the first token. Blocking calls only know
+        their total time, so they pass None and count as failed only on an
+        error (which includes missing their deadline).
+        """
+        failed = not success or (latency is not None and latency > self.slow_seconds)
+        with self._lock:
+            self._outcomes.append(failed)
+            if self.state == "half_open":
+                self._probe_in_flight = False
+                if failed:
+                    self._open()
+                else:
+                    self.state = "closed"
+                    self._outcomes.clear()
+            elif self.state == "closed" and len(self._outcomes) >= self.min_requests:
+                if sum(self._outcomes) / len(self._outcomes) >= self.failure_rate:
+                    self._open()
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = dict(self._counts)
+            counts["state"] = self.state
+            counts["window_failure_rate"] = (
+                sum(self._outcomes) / len(self._outcomes) if self._outcomes else 0.0
+            )
+        return counts
+
+    def _open(self):
+        self.state = "open"
+        self._opened_at = time.monotonic()
+        self._counts["opened"] += 1
+
+
+_latency = LatencyTracker()
+_breaker = CircuitBreaker()
+_hedge_counts = {"hedged": 0, "hedge_wins": 0, "deadline_exceeded": 0, "last_hedge_delay": None}
+_hedge_lock = threading.Lock()
+
+# Upstream calls run here so the caller can stop waiting at its deadline
+_upstream_executor = ThreadPoolExecutor(max_workers=CLIENT_POOL_SIZE * 2,
+                                        thread_name_prefix="upstream")
+# Split mode's short-section calls, made alongside the description
+_split_executor = ThreadPoolExecutor(max_workers=ENRICHMENT_WORKERS, thread_name_prefix="split")
+# Streams are read here; twice the workers leaves room for streams abandoned at their deadline
+_stream_executor = ThreadPoolExecutor(max_workers=ENRICHMENT_WORKERS * 2, thread_name_prefix="stream")
+_STREAM_END = object()
+
+
+def _count_hedge(name: str, value=None):
+    with _hedge_lock:
+        if value is None:
+            _hedge_counts[name] += 1
+        else:
+            _hedge_counts[name] = value
+
+
+def call_with_deadline(fn, deadline: float, ticket: Optional[Ticket] = None, model: str = ANALYSIS_MODEL):
+    """
+    Run ``fn()`` upstream and return its result before the monotonic ``deadline``.
+
+    If the first call is still running once it passes the HEDGE_PERCENTILE of
+    recent latencies, an identical second call is started (as long as the
+    rate limiter can admit it straight away) and whichever finishes first
+    wins. Raises DeadlineExceeded if neither finishes in time; the stragglers
+    are left to complete in the background.
+
+    Every call that returns, the winner or a straggler, has its usage
+    recorded against ``model`` and settles one admitted ticket: the
+    caller's ``ticket`` (reserved for ``fn``'s request) or the hedge's own.
+    """
+    start = time.monotonic()
+    tickets = [ticket] if ticket is not None else []
+    tickets_lock = threading.Lock()
+
+    def settle(future: Future):
+        if future.cancelled() or future.exception() is not None:
+            return
+        usage = getattr(future.result(), "usage", None)
+        if usage is None:
+            return
+        _record_usage(usage, model)
+        with tickets_lock:
+            settled = tickets.pop() if tickets else None
+        if settled is not None:
+            _rate_limiter.settle(settled, usage.total_tokens)
+
+    primary = _upstream_executor.submit(fn)
+    primary.add_done_callback(settle)
+    pending = {primary}
+
+    hedge_delay = None
+    if HEDGE_PERCENTILE > 0 and len(_latency) >= HEDGE_MIN_SAMPLES:
+        hedge_delay = _latency.percentile(HEDGE_PERCENTILE)
+    if ticket is not None and hedge_delay is not None and start + hedge_delay < deadline:
+        done, _ = wait(pending, timeout=hedge_delay)
+        if not done:
+            hedge_ticket = _rate_limiter.acquire(ticket.tokens, timeout=0)
+            if hedge_ticket.admitted:
+                with tickets_lock:
+                    tickets.append(hedge_ticket)
+                hedge = _upstream_executor.submit(fn)
+                hedge.add_done_callback(settle)
+                pending.add(hedge)
+                _count_hedge("hedged")
+                _count_hedge("last_hedge_delay", round(hedge_delay, 3))
+
+    error = None
+    while pending:
+        done, pending = wait(pending, timeout=max(0.0, deadline - time.monotonic()),
+                             return_when=FIRST_COMPLETED)
+        if not done:
+            _count_hedge("deadline_exceeded")
+            raise DeadlineExceeded(f"analysis deadline of {deadline - start:.0f}s exceeded")
+        for future in done:
+            if future.exception() is None:
+                _latency.record(time.monotonic() - start)
+                if future is not primary:
+                    _count_hedge("hedge_wins")
+                return future.result()
+            error = future.exception()
+    raise error
+
+
+def stream_with_deadline(open_stream: Callable[[], Iterator], deadline: float) -> Iterator:
+    """
+    Yield the chunks of ``open_stream()`` until the monotonic ``deadline``.
+
+    The stream is read on a worker thread, so an upstream that stalls, or
+    never sends a first token, can't hold the caller past the deadline:
+    DeadlineExceeded is raised then, whether or not a chunk arrived. The
+    worker drops the stream once its next chunk comes in or the client
+    times out.
+    """
+    chunks = queue.Queue()
+    abandoned = threading.Event()
+
+    def pump():
+        stream = None
+        try:
+            with _track_request():
+                stream = open_stream()
+                for chunk in stream:
+                    if abandoned.is_set():
+                        break
+                    chunks.put((chunk, None))
+        except Exception as e:
+            chunks.put((None, e))
+        finally:
+            if hasattr(stream, "close"):
+                stream.close()
+            chunks.put((_STREAM_END, None))
+
+    start = time.monotonic()
+    _stream_executor.submit(pump)
+    try:
+        while True:
+            try:
+                chunk, error = chunks.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                chunk, error = None, None
+            if error is not None:
+                raise error
+            if chunk is _STREAM_END:
+                return
+            if chunk is None or time.monotonic() > deadline:
+                raise DeadlineExceeded(f"stream deadline of {deadline - start:.0f}s exceeded")
+            yield chunk
+    finally:
+        abandoned.set()
+
+
+def get_resilience_stats() -> dict:
+    """Circuit breaker state, hedging counts and recent latency percentiles."""
+    with _hedge_lock:
+        stats = dict(_hedge_counts)
+    stats["breaker"] = _breaker.stats()
+    stats["latency_p50"] = _latency.percentile(50)
+    stats["latency_p95"] = _latency.percentile(95)
+    return stats
+
+
+# Instrumentation
+FALLBACKS = counter("analysis_fallbacks_total", "Analyses that fell back to the local result, by reason")
+PROMPT_TOKENS = counter("mistral_prompt_tokens_total", "Prompt tokens reported by Mistral")
+COMPLETION_TOKENS = counter("mistral_completion_tokens_total", "Completion tokens reported by Mistral")
+ARCHETYPES_SERVED = counter("analysis_archetypes_total", "Analyses served from the archetype library")
+NEIGHBOURS_SERVED = counter("analysis_neighbours_total", "Analyses served from a stored near-identical answer set")
+PROMPT_SIZE = histogram("analysis_prompt_tokens", "Estimated input tokens per analysis request, by prompt mode",
+                        buckets=(250, 500, 750, 1000, 1500, 2000, 3000, 4000, 6000, 8000, 16000))
+PROMPT_TRIMS = counter("analysis_prompt_trimmed_total",
+                       "Prompts over PROMPT_TOKEN_BUDGET, by how they were cut down (compact, answers, over)")
+
+
+def _error_reason(error: Exception) -> str:
+    if isinstance(error, UpstreamUnavailable):
+        return error.reason
+    return "deadline" if isinstance(error, (DeadlineExceeded, TimeoutError)) else "api_error"
+
+
+def _record_usage(usage, model: str = ANALYSIS_MODEL):
+    """Count the token usage reported with a response."""
+    if usage is None:
+        return
+    PROMPT_TOKENS.inc(usage.prompt_tokens or 0, model=model)
+    COMPLETION_TOKENS.inc(usage.completion_tokens or 0, model=model)
+
+
+def _settle_stream(ticket: Ticket, usage, messages: List[ChatMessage], streamed_chars: int):
+    """
+    Refund the unused part of a streamed request's reservation.
+
+    Uses the usage sent with the final chunk; a stream cut short never gets
+    that far, so it is settled on an estimate of what was sent and received.
+    """
+    if usage is not None:
+        _rate_limiter.settle(ticket, usage.total_tokens)
+    elif streamed_chars:
+        _rate_limiter.settle(ticket, sum(estimate_tokens(m.content) for m in messages) + streamed_chars // 4 + 1)
+
+
+def get_client_pool_info() -> dict:
+    """Pool configuration and usage of the shared client."""
+    with _shared_client_lock:
+        info = dict(_client_usage)
+        info["active"] = _shared_client is not None
+    info["pool_size"] = CLIENT_POOL_SIZE
+    info["keepalive_seconds"] = CLIENT_KEEPALIVE_SECONDS
+    info["timeout_seconds"] = CLIENT_TIMEOUT_SECONDS
+    return info
+
+
+def current_prompt_version() -> str:
+    """Version of the prompt this process sends, including the prompt mode and budget, output format or split-mode models."""
+    version = PROMPT_VERSION
+    if PROMPT_MODE == "compact":
+        version += "+compact"
+    if PROMPT_TOKEN_BUDGET > 0:
+        version += f"+budget{PROMPT_TOKEN_BUDGET}"
+    if ANALYSIS_MODE == "split":
+        return version + "+split:" + ",".join(f"{key}={model}" for key, model in sorted(SECTION_MODELS.items()))
+    if ANALYSIS_OUTPUT_FORMAT != "text":
+        return f"{version}+{ANALYSIS_OUTPUT_FORMAT}"
+    return version
+
+
+def answer_fingerprint(answers: Dict[int, str], questions,
+                       model: str = ANALYSIS_MODEL,
+                       temperature: float = ANALYSIS_TEMPERATURE,
+                       max_tokens: int = ANALYSIS_MAX_TOKENS,
+                       prompt_version: Optional[str] = None) -> str:
+    """
+    Build a stable cache key from the answers and the generation settings.
+
+    Answers to the fixed quiz options are keyed by their compact option
+    indices plus a fingerprint of the question set; free-text answers by
+    their full text.
+    """
+    if prompt_version is None:
+        prompt_version = current_prompt_version()
+    indices = encode_answers(answers, questions)
+    if indices is not None:
+        encoded_answers = f"{questions_fingerprint(questions)}:{indices.tobytes().hex()}"
+    else:
+        encoded_answers = [[questions[num]['text'], answer] for num, answer in sorted(answers.items())]
+    payload = {
+        "answers": encoded_answers,
+        "model": model,
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+        "prompt_version": prompt_version,
+    }
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class AnalysisCache:
+    """Layered result cache: per-session dict, process-wide LRU with TTL, persistent shared store."""
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES,
+                 ttl_seconds: float = CACHE_TTL_SECONDS,
+                 store: Optional[ResultStore] = None,
+                 prompt_version: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.store = store
+        self.prompt_version = prompt_version or current_prompt_version()
+        self._entries = OrderedDict()  # key -> (expires_at, result)
+        self._lock = threading.Lock()
+        self._counts = {"session_hits": 0, "memory_hits": 0, "store_hits": 0, "misses": 0, "store_errors": 0}
+
+    def get(self, key: str, session: Optional[MutableMapping] = None,
+            count: bool = True) -> Optional[dict]:
+        """
+        Look the key up in each layer in turn, promoting hits to the faster layers.
+
+        Pass ``count=False`` for a repeat lookup of a key already counted,
+        so it doesn't show up twice in the stats.
+        """
+        record = self._count if count else (lambda name: None)
+        if session is not None and key in session:
+            record("session_hits")
+            return session[key]
+
+        result = self._memory_get(key)
+        if result is not None:
+            record("memory_hits")
+        else:
+            result = self._store_get(key)
+            if result is None:
+                record("misses")
+                return None
+            record("store_hits")
+            self._memory_put(key, result)
+
+        if session is not None:
+            session[key] = result
+        return result
+
+    def put(self, key: str, result: dict, session: Optional[MutableMapping] = None):
+        """Store a result in every layer."""
+        if session is not None:
+            session[key] = result
+        self._memory_put(key, result)
+        self._store_put(key, result)
+
+    def stats(self) -> dict:
+        """Hit and miss counts per layer."""
+        with self._lock:
+            counts = dict(self._counts)
+            counts["size"] = len(self._entries)
+        hits = counts["session_hits"] + counts["memory_hits"] + counts["store_hits"]
+        lookups = hits + counts["misses"]
+        counts["hits"] = hits
+        counts["hit_rate"] = hits / lookups if lookups else 0.0
+        counts["store"] = self.store.url if self.store is not None else None
+        return counts
+
+    def clear(self):
+        """Drop the in-memory layer and reset the counters (the persistent store is left alone)."""
+        with self._lock:
+            self._entries.clear()
+            for name in self._counts:
+                self._counts[name] = 0
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counts[name] += 1
+
+    def _memory_get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, result = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return result
+
+    def _memory_put(self, key: str, result: dict):
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl_seconds, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _store_get(self, key: str) -> Optional[dict]:
+        if self.store is None:
+            return None
+        try:
+            with timed("result_store", op="get"):
+                return self.store.get(key, self.prompt_version)
+        except Exception as e:
+            # A broken store costs an upstream call, never the analysis itself
+            self._count("store_errors")
+            print(f"Could not read from the result store: {str(e)}")
+            return None
+
+    def _store_put(self, key: str, result: dict):
+        if self.store is None:
+            return
+        try:
+            with timed("result_store", op="put"):
+                self.store.put(key, self.prompt_version, result, self.ttl_seconds)
+        except Exception as e:
+            self._count("store_errors")
+            print(f"Could not write to the result store: {str(e)}")
+
+
+# Shared by every session in this process, and through the store by every process
+_analysis_cache = AnalysisCache(store=get_result_store())
+
+
+class SingleFlight:
+    """
+    Collapse concurrent requests for the same key into one upstream call.
+
+    The first caller for a key starts the work and registers a handle (any
+    object with ``result()``); callers arriving while it is in flight get the
+    same handle back instead of starting their own.
+    """
 
-class PersonalityAnalyzer:
     def __init__(self):
-        api_key = os.getenv("MISTRAL_API_KEY")
-        if not api_key:
-            raise ValueError("MISTRAL_API_KEY not found in environment variables")
-        self.client = MistralClient(api_key=api_key)
-        
-    def generate_analysis_prompt(self, answers: Dict[int, str], questions) -> str:
-        """Generate a prompt for Mistral AI based on user's answers."""
-        prompt = """Analyze these quiz responses and give us a personality deep-dive! Mix professional MBTI insights with relatable examples.
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self._counts = {"calls": 0, "coalesced": 0}
+
+    def join(self, key, start):
+        """Return ``(handle, coalesced)``, calling ``start()`` only if nothing is in flight."""
+        with self._lock:
+            self._counts["calls"] += 1
+            handle = self._in_flight.get(key)
+            if handle is not None:
+                self._counts["coalesced"] += 1
+                return handle, True
+            handle = start()
+            self._in_flight[key] = handle
+            return handle, False
+
+    def release(self, key, handle):
+        """Forget a finished handle so later calls start fresh work."""
+        with self._lock:
+            if self._in_flight.get(key) is handle:
+                del self._in_flight[key]
+
+    def do(self, key, fn):
+        """Run ``fn()`` once for all concurrent callers with the same key."""
+        future, coalesced = self.join(key, Future)
+        if coalesced:
+            return future.result()
+        try:
+            result = fn()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            self.release(key, future)
+
+    def stats(self) -> dict:
+        """How many requests were made and how many shared an in-flight call."""
+        with self._lock:
+            counts = dict(self._counts)
+            counts["in_flight"] = len(self._in_flight)
+        counts["coalesce_rate"] = counts["coalesced"] / counts["calls"] if counts["calls"] else 0.0
+        return counts
+
+
+# Blocking and streaming analyses are registered under separate key prefixes
+_in_flight = SingleFlight()
+
+SYSTEM_PROMPT = """You are a personality analyst who deeply understands MBTI theory while keeping things relatable. 
+                    For each analysis:
+                    - Break down cognitive functions in a way that makes sense (like explaining how Fe users are the friends who always know when someone's upset)
+                    - Use specific examples from their answers to support your type assessment
+                    - Mix professional insights with casual observations
+                    - Explain MBTI concepts clearly without getting too technical
+                    - Connect their type to real-world behaviors and tendencies
+                    - Keep it balanced between formal MBTI theory and friendly chat
+                    """
+
+# What the model is asked to write under each header of the text format
+SECTION_INSTRUCTIONS = {
+    "TITLE": "[A creative nickname that captures their essence]",
+    "TYPE": "[MBTI type with a clear, relatable explanation of why]",
+    "EMOJI": "[A spot-on emoji for their vibe]",
+    "DESCRIPTION": "[A thorough analysis that mixes MBTI theory with real-world examples from their answers. Make it engaging - like a friend who really gets MBTI explaining things over coffee. Minimum 300 words.]",
+    "TRAITS": "[Key personality traits with specific examples from their answers]",
+    "STRENGTHS": "[Their superpowers, based on their type and answers]",
+    "GROWTH_AREAS": "[Gentle suggestions for development, explained in a supportive way]",
+}
+
+
+def format_instructions(headers) -> str:
+    """Text-format instructions asking for just the given section headers, in order."""
+    return "        Format your response like this:\n" + "".join(
+        f"        {header}: {SECTION_INSTRUCTIONS[header]}\n" for header in headers)
+
+
+TEXT_FORMAT_INSTRUCTIONS = format_instructions(SECTION_INSTRUCTIONS)
+
+JSON_FORMAT_INSTRUCTIONS = """        Respond with a single JSON object and nothing else, using exactly these keys:
+        "title": string - a creative nickname that captures their essence
+        "type": string - MBTI type with a clear, relatable explanation of why
+        "emoji": string - a spot-on emoji for their vibe
+        "description": string - a thorough analysis that mixes MBTI theory with real-world examples from their answers. Make it engaging - like a friend who really gets MBTI explaining things over coffee. Minimum 300 words.
+        "traits": array of strings - key personality traits with specific examples from their answers
+        "strengths": array of strings - their superpowers, based on their type and answers
+        "growth_areas": array of strings - gentle suggestions for development, explained in a supportive way
+"""
+
+# Split mode: the description call gets the usual analysis prompt with only
+# this format, the short sections a prompt of their own
+SPLIT_DESCRIPTION_INSTRUCTIONS = """        Their answers score as {mbti}. Write only the description, formatted like this:
+        DESCRIPTION: """ + SECTION_INSTRUCTIONS["DESCRIPTION"] + """
+        The title, traits, strengths and growth areas are written separately, so leave them out.
+"""
+
+SPLIT_FIELDS_PROMPT = """Here are someone's personality quiz responses. Their answers score as {mbti}.
+
+{instructions}        Keep every section to a single line; separate list items with commas.
+
+        Here are their responses:
+{answers}"""
+
+# Short follow-up that personalizes a type-level archetype
+PERSONALIZE_PROMPT = """Here is the general profile of an {mbti} ("{title}"):
+{description}
+
+These are their quiz answers:
+{answers}
+Write two short paragraphs (under 150 words in total) that connect this profile to their specific answers, speaking to them directly. Plain text only, no headings."""
+
+# Follow-up that adapts a stored analysis to a few differing answers
+NEIGHBOUR_DELTA_PROMPT = """Here is a personality profile of an {mbti} ("{title}"), written for someone whose quiz answers were almost the same as this person's:
+{description}
+
+This person answered differently on these questions:
+{differences}
+Write one short paragraph (under 100 words) that speaks to them directly about what their different answers add to this picture. Plain text only, no headings."""
+
+# The verbose analysis prompt: this brief, the format instructions, the
+# answers and the closing line
+ANALYSIS_BRIEF = """Analyze these quiz responses and give us a personality deep-dive! Mix professional MBTI insights with relatable examples.
 
         1. Core MBTI Analysis:
         - Break down their type preferences (E/I, S/N, T/F, J/P)
@@ -38,235 +958,1277 @@ class PersonalityAnalyzer:
         - Their approach to challenges
         - Natural talents and potential blind spots
 
-        Format your response like this:
-        TITLE: [A creative nickname that captures their essence]
-        TYPE: [MBTI type with a clear, relatable explanation of why]
-        EMOJI: [A spot-on emoji for their vibe]
-        DESCRIPTION: [A thorough analysis that mixes MBTI theory with real-world examples from their answers. Make it engaging - like a friend who really gets MBTI explaining things over coffee. Minimum 300 words.]
-        TRAITS: [Key personality traits with specific examples from their answers]
-        STRENGTHS: [Their superpowers, based on their type and answers]
-        GROWTH_AREAS: [Gentle suggestions for development, explained in a supportive way]
+"""
+ANALYSIS_CLOSING = "\nGive us a balanced analysis that's both insightful and relatable. Mix some casual language with proper MBTI insights!"
+
+# The same asks, condensed, for PROMPT_MODE=compact
+COMPACT_SYSTEM_PROMPT = ("You are a personality analyst who knows MBTI theory deeply and keeps it relatable: "
+                         "explain cognitive functions through everyday behaviour, support the type with specific "
+                         "answers, and balance professional insight with friendly chat.")
+COMPACT_BRIEF = """Give a personality deep-dive from these quiz answers, mixing MBTI insight with casual, relatable language. Cover:
+- their E/I, S/N, T/F and J/P preferences, citing the answers that reveal them, and their cognitive function stack
+- energy, decision-making, social, stress and communication style
+- friendships, work/study style, challenges, natural talents and blind spots
+- famous people or characters of the same type
+
+"""
+COMPACT_ANSWERS_LEGEND = "Their answers, as Q<number>=<option letter>, or Q<number>: their own words:\n"
+COMPACT_QUESTIONS_LEGEND = "The quiz questions and their lettered options:\n"
+OPTION_LETTERS = "abcdefghijklmnopqrstuvwxyz"
+
+PROMPT_MODES = ("verbose", "compact")
+MIN_ANSWER_CHARS = 40  # budget trimming never shortens an answer below this
+PROMPT_LEGEND_CACHE_SIZE = 256  # question sets whose compact legend is kept (adaptive quizzes vary)
+
+
+def compact_text(text: str) -> str:
+    """Strip the indentation and trailing spaces the verbose templates carry."""
+    return "\n".join(line.strip() for line in text.splitlines()) + ("\n" if text.endswith("\n") else "")
+
+
+def _shorten(text: str, limit: Optional[int]) -> str:
+    if limit is None or len(text) <= limit:
+        return text
+    return text[:limit - 1].rstrip() + "…"
+
+
+class PromptBuilder:
+    """
+    Builds analysis prompts from parts assembled once per format.
+
+    "verbose" reproduces the original prompt exactly; "compact" uses
+    COMPACT_BRIEF, strips template indentation and sends each answer as a
+    short "Q3=b" code, resolved by a legend of every question and its
+    lettered options that is built once per question set and appended to
+    COMPACT_SYSTEM_PROMPT, so it is the same leading text on every request
+    for that set. With a
+    ``token_budget``, a prompt that doesn't fit is rebuilt compact and then
+    its longest answers are shortened (never below MIN_ANSWER_CHARS) until
+    it fits; the static parts alone can still exceed a very small budget.
+    """
+
+    def __init__(self, mode: str = PROMPT_MODE, token_budget: int = PROMPT_TOKEN_BUDGET):
+        if mode not in PROMPT_MODES:
+            raise ValueError(f"Unknown prompt mode {mode!r}; expected one of {PROMPT_MODES}")
+        self.mode = mode
+        self.token_budget = token_budget
+        self._frames: Dict[Tuple[str, str], Tuple[str, str]] = {}
+        self._legends = OrderedDict()  # question set -> compact system prompt with its legend
+        self._legends_lock = threading.Lock()
+
+    def system_prompt(self, mode: str, questions=()) -> str:
+        if mode != "compact":
+            return SYSTEM_PROMPT
+        if not questions:
+            return COMPACT_SYSTEM_PROMPT
+        key = tuple((q["text"], tuple(q["options"])) for q in questions)
+        with self._legends_lock:
+            system = self._legends.get(key)
+            if system is not None:
+                self._legends.move_to_end(key)
+                return system
+        parts = [COMPACT_SYSTEM_PROMPT, "\n\n", COMPACT_QUESTIONS_LEGEND]
+        for question_num, question in enumerate(questions, 1):
+            parts += ("Q", str(question_num), " ", question["text"])
+            for letter, option in zip(OPTION_LETTERS, question["options"]):
+                parts += (" ", letter, ") ", option)
+            parts.append("\n")
+        system = "".join(parts)
+        with self._legends_lock:
+            self._legends[key] = system
+            while len(self._legends) > PROMPT_LEGEND_CACHE_SIZE:
+                self._legends.popitem(last=False)
+        return system
 
-        Here are their responses:\n"""
+    def _frame(self, mode: str, format_instructions: str) -> Tuple[str, str]:
+        """The text before and after the answers, built once per mode and format."""
+        key = (mode, format_instructions)
+        frame = self._frames.get(key)
+        if frame is None:
+            if mode == "compact":
+                frame = (COMPACT_BRIEF + compact_text(format_instructions) + "\n" + COMPACT_ANSWERS_LEGEND,
+                         ANALYSIS_CLOSING)
+            else:
+                frame = (ANALYSIS_BRIEF + format_instructions + "\n        Here are their responses:\n",
+                         ANALYSIS_CLOSING)
+            self._frames[key] = frame
+        return frame
+
+    @staticmethod
+    def answer_parts(mode: str, answers: Dict[int, str], questions, limit: Optional[int] = None,
+                     parts: Optional[List[str]] = None) -> List[str]:
+        """
+        The answers block as pieces for one join, appended to ``parts`` if
+        given; ``limit`` caps the characters of each answer. Answers are
+        never copied into per-answer strings first, as free-text answers
+        can be long.
+        """
+        if parts is None:
+            parts = []
+        if mode == "compact":
+            for question_num, answer in answers.items():
+                options = questions[question_num]["options"]
+                if answer in options and options.index(answer) < len(OPTION_LETTERS):
+                    parts += ("Q", str(question_num + 1), "=", OPTION_LETTERS[options.index(answer)], "\n")
+                else:
+                    parts += ("Q", str(question_num + 1), ": ", _shorten(answer, limit), "\n")
+        else:
+            for question_num, answer in answers.items():
+                parts += ("Question: ", questions[question_num]["text"], "\nAnswer: ",
+                          _shorten(answer, limit), "\n\n")
+        return parts
+
+    def fit(self, render: Callable[[str, Optional[int]], str], answers: Dict[int, str], questions,
+            prompt: Optional[str] = None) -> Tuple[str, str, dict]:
+        """
+        Render a prompt within the token budget.
+
+        ``render(mode, limit)`` returns the user prompt for a mode and
+        per-answer character limit; ``prompt`` is its output for this
+        builder's mode with no limit, when already rendered; ``questions``
+        picks the compact system prompt's legend. Returns the
+        system prompt, the user prompt and its size: {"mode", "tokens",
+        "trimmed"}.
+        """
+        mode = self.mode
+        system = self.system_prompt(mode, questions)
+        if prompt is None:
+            prompt = render(mode, None)
+        tokens = estimate_tokens(system) + estimate_tokens(prompt)
+        if self.token_budget <= 0 or tokens <= self.token_budget:
+            return system, prompt, {"mode": mode, "tokens": tokens, "trimmed": None}
+
+        trimmed = None
+        if mode != "compact":
+            mode, trimmed = "compact", "compact"
+            system, prompt = self.system_prompt(mode, questions), render(mode, None)
+            tokens = estimate_tokens(system) + estimate_tokens(prompt)
+        longest = max((len(answer) for answer in answers.values()), default=0)
+        if tokens > self.token_budget and longest > MIN_ANSWER_CHARS:
+            # The largest per-answer limit that fits, by bisection
+            low, high = MIN_ANSWER_CHARS, longest
+            while low < high:
+                middle = (low + high + 1) // 2
+                if estimate_tokens(system) + estimate_tokens(render(mode, middle)) <= self.token_budget:
+                    low = middle
+                else:
+                    high = middle - 1
+            prompt, trimmed = render(mode, low), "answers"
+            tokens = estimate_tokens(system) + estimate_tokens(prompt)
+        if tokens > self.token_budget:
+            trimmed = "over"
+        return system, prompt, {"mode": mode, "tokens": tokens, "trimmed": trimmed}
+
+    def build(self, answers: Dict[int, str], questions, format_instructions: str) -> Tuple[str, str, dict]:
+        """System prompt, analysis prompt and prompt size for these answers."""
+        def render(mode: str, limit: Optional[int]) -> str:
+            head, tail = self._frame(mode, format_instructions)
+            parts = self.answer_parts(mode, answers, questions, limit, [head])
+            parts.append(tail)
+            return "".join(parts)
+        return self.fit(render, answers, questions, render(self.mode, None))
+
+    def build_fields(self, answers: Dict[int, str], questions, mbti: str, instructions: str) -> Tuple[str, str, dict]:
+        """The split-mode prompt for the short sections, in the same mode and budget."""
+        def render(mode: str, limit: Optional[int]) -> str:
+            template = SPLIT_FIELDS_PROMPT if mode == "verbose" else _COMPACT_SPLIT_FIELDS_PROMPT
+            return template.format(mbti=mbti, answers="".join(self.answer_parts(mode, answers, questions, limit)),
+                                   instructions=instructions if mode == "verbose" else compact_text(instructions))
+        return self.fit(render, answers, questions)
+
+
+_COMPACT_SPLIT_FIELDS_PROMPT = compact_text(SPLIT_FIELDS_PROMPT).replace(
+    "{instructions}        ", "{instructions}").replace("Here are their responses:\n", COMPACT_ANSWERS_LEGEND)
+
+_prompt_builders: Dict[Tuple[str, int], PromptBuilder] = {}
+
+
+def get_prompt_builder() -> PromptBuilder:
+    """The shared builder for the current PROMPT_MODE and PROMPT_TOKEN_BUDGET."""
+    key = (PROMPT_MODE, PROMPT_TOKEN_BUDGET)
+    builder = _prompt_builders.get(key)
+    if builder is None:
+        builder = _prompt_builders.setdefault(key, PromptBuilder(*key))
+    return builder
+
+
+def record_prompt_size(stats: dict):
+    """Report the size of a prompt about to be sent."""
+    PROMPT_SIZE.observe(stats["tokens"], mode=stats["mode"])
+    if stats["trimmed"]:
+        PROMPT_TRIMS.inc(how=stats["trimmed"])
+
+
+# Expected shape of a JSON-mode response
+ANALYSIS_SCHEMA = {
+    "title": str,
+    "type": str,
+    "emoji": str,
+    "description": str,
+    "traits": list,
+    "strengths": list,
+    "growth_areas": list,
+}
+
+# How each "HEADER:" line of the text format is handled: the result key and
+# whether the header holds a single value, starts the description, holds a
+# list, or (EMOJI) sets a value without changing the current section
+SECTION_TABLE = {
+    "TITLE": ("title", "scalar"),
+    "TYPE": ("type", "scalar"),
+    "EMOJI": ("emoji", "inline"),
+    "DESCRIPTION": ("description", "text"),
+    "TRAITS": ("traits", "list"),
+    "STRENGTHS": ("strengths", "list"),
+    "GROWTH_AREAS": ("growth_areas", "list"),
+}
+SECTION_HEADERS = tuple(f"{name}:" for name in SECTION_TABLE)
+SECTION_KEYS = {key: name for name, (key, _) in SECTION_TABLE.items()}
+LIST_SECTIONS = ("traits", "strengths", "growth_areas")
+
+# Values used when the model leaves a section out
+RESULT_DEFAULTS = {
+    "title": "The Personality Explorer",
+    "type": "Personality Type Analysis",
+    "emoji": "✨",
+    "traits": ["Unique", "Complex", "Multifaceted"],
+    "strengths": ["Adaptability", "Insight", "Growth Mindset"],
+    "growth_areas": ["Continuing to explore", "Embracing change", "Self-discovery"],
+}
+
+
+def split_plan() -> List[Tuple[str, List[str]]]:
+    """
+    The calls split mode makes, as (model, result keys): the description on
+    its own first, then the other sections grouped by model.
+    """
+    plan = [(SECTION_MODELS["description"], ["description"])]
+    groups = {}
+    for key in SECTION_KEYS:
+        if key != "description":
+            groups.setdefault(SECTION_MODELS[key], []).append(key)
+    plan.extend(groups.items())
+    return plan
+
+
+def _empty_sections() -> dict:
+    return {"title": "", "type": "", "emoji": "", "description": [],
+            "traits": [], "strengths": [], "growth_areas": []}
+
+
+def _clean_item(item: str) -> str:
+    """Strip a leading bullet from a list item."""
+    if item.startswith("- ") or item.startswith("• "):
+        return item[2:]
+    return item
+
+
+def _apply_line(sections: dict, current: Optional[str], line: str):
+    """
+    Apply one stripped, non-empty line to ``sections``.
+
+    Returns ``(current_section, changed_key)``. List items are cleaned as they
+    are added so no further passes are needed.
+    """
+    name, colon, _ = line.partition(":")
+    entry = SECTION_TABLE.get(name) if colon else None
+    if entry is not None:
+        key, kind = entry
+        if kind == "text":
+            return key, None
+        value = line.replace(name + ":", "").strip()
+        if kind == "list":
+            items = value.split(",") if value and ',' in value else [value]
+            sections[key] = [_clean_item(item.strip()) for item in items if item.strip()]
+            return key, key
+        sections[key] = value
+        return (current if kind == "inline" else key), key
+
+    if current == "description":
+        sections["description"].append(line)
+        return current, current
+    if current in LIST_SECTIONS and not line.startswith("-"):
+        sections[current].append(_clean_item(line))
+        return current, current
+    return current, None
+
+
+def _finalize_sections(sections: dict) -> dict:
+    """Join the description and fill in defaults for anything missing."""
+    result = {key: sections[key] or default for key, default in RESULT_DEFAULTS.items()}
+    result["description"] = "\n\n".join(sections["description"])
+    return {key: result[key] for key in ("title", "type", "emoji", "description",
+                                         "traits", "strengths", "growth_areas")}
+
+
+def _parse_sections(response_text: str, current: Optional[str] = None) -> dict:
+    """Raw sections of a text-format response, before defaults are applied."""
+    sections = _empty_sections()
+    for line in response_text.split('\n'):
+        line = line.strip()
+        if line:
+            current, _ = _apply_line(sections, current, line)
+    return sections
+
+
+def parse_response_text(response_text: str) -> dict:
+    """Table-driven single-pass parser for the TITLE:/TYPE:/... text format."""
+    return _finalize_sections(_parse_sections(response_text))
+
+
+def parse_json_response(response_text: str) -> Optional[dict]:
+    """
+    Validate a JSON-mode response against ANALYSIS_SCHEMA in a single pass.
+
+    String fields are stripped, list fields keep their non-empty string
+    items, and missing or mistyped fields get the usual defaults. Returns
+    None if the text isn't a JSON object at all.
+    """
+    try:
+        data = json.loads(response_text)
+    except ValueError:
+        return None
+    if not isinstance(data, dict):
+        return None
+
+    result = {}
+    for key, expected in ANALYSIS_SCHEMA.items():
+        value = data.get(key)
+        if expected is str:
+            value = value.strip() if isinstance(value, str) else ""
+        elif isinstance(value, list):
+            value = [_clean_item(item.strip()) for item in value
+                     if isinstance(item, str) and item.strip()]
+        elif isinstance(value, str) and value.strip():
+            value = [_clean_item(item.strip()) for item in value.split(",") if item.strip()]
+        else:
+            value = []
+        result[key] = value or RESULT_DEFAULTS.get(key, value)
+    return result
+
+
+class StreamingResponseParser:
+    """
+    Incremental version of PersonalityAnalyzer._parse_mistral_response.
+
+    Feed it text chunks as they arrive from the streaming API. TITLE, TYPE and
+    EMOJI become available as soon as their lines are complete, and DESCRIPTION
+    text (including the line still being written) can be read at any time.
+    ``finish()`` returns the same dict the batch parser would for the full text.
+    """
+
+    def __init__(self):
+        self.sections = _empty_sections()
+        self.current_section = None
+        self._buffer = ""
+
+    def feed(self, chunk: str) -> set:
+        """Consume a chunk of text and return the names of the sections that changed."""
+        self._buffer += chunk
+        changed = set()
+        *lines, self._buffer = self._buffer.split('\n')
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            self.current_section, section = _apply_line(self.sections, self.current_section, line)
+            if section:
+                changed.add(section)
+        if self.current_section == "description" and self._pending_description():
+            changed.add("description")
+        return changed
+
+    def snapshot(self) -> dict:
+        """The result so far, without any defaults filled in."""
+        description = list(self.sections["description"])
+        pending = self._pending_description()
+        if pending:
+            description.append(pending)
+        return {
+            "title": self.sections["title"],
+            "type": self.sections["type"],
+            "emoji": self.sections["emoji"],
+            "description": "\n\n".join(description),
+            "traits": list(self.sections["traits"]),
+            "strengths": list(self.sections["strengths"]),
+            "growth_areas": list(self.sections["growth_areas"])
+        }
+
+    def finish(self) -> dict:
+        """Flush the last line and return the final result with defaults applied."""
+        line = self._buffer.strip()
+        self._buffer = ""
+        if line:
+            self.current_section, _ = _apply_line(self.sections, self.current_section, line)
+        return _finalize_sections(self.sections)
+
+    def _pending_description(self) -> str:
+        """The incomplete line at the end of the buffer, unless it may turn out to be a header."""
+        if self.current_section != "description":
+            return ""
+        pending = self._buffer.strip()
+        if any(pending.startswith(h) or h.startswith(pending) for h in SECTION_HEADERS):
+            return ""
+        return pending
+
+
+FALLBACK_DESCRIPTION = "Analysis unavailable at the moment. Please try again later."
+
+# Canned per-letter content for the instant local result
+LETTER_TRAITS = {
+    "E": "Energized by people", "I": "Recharges with alone time",
+    "N": "Big-picture thinker", "S": "Grounded in the here and now",
+    "T": "Logic-first decision maker", "F": "Leads with empathy",
+    "J": "Loves a good plan", "P": "Goes with the flow",
+}
+LETTER_STRENGTHS = {
+    "E": "Rallying the group", "I": "Deep focus",
+    "N": "Spotting possibilities", "S": "Noticing the details",
+    "T": "Cutting through the noise", "F": "Reading the room",
+    "J": "Following through", "P": "Adapting on the fly",
+}
+LETTER_GROWTH_AREAS = {
+    "E": "Making room for quiet reflection", "I": "Speaking up sooner",
+    "N": "Sweating the small stuff", "S": "Trusting a hunch now and then",
+    "T": "Saying the feelings part out loud", "F": "Setting boundaries",
+    "J": "Leaving room for surprises", "P": "Finishing what you start",
+}
+TEMPERAMENTS = {
+    "NF": ("Idealist", "🌈"), "NT": ("Strategist", "🧠"),
+    "SJ": ("Guardian", "🛡️"), "SP": ("Explorer", "🧭"),
+}
+
+
+def _keyword_type(answers: Dict[int, str]) -> str:
+    """Guess a type from free-text answers with a simple keyword count."""
+    # Analyze answers for personality tendencies
+    answers_text = ' '.join(answers.values()).lower()
+    
+    # Simple keyword analysis
+    keywords = {
+        'E': ['out', 'social', 'friends', 'party', 'people', 'group'],
+        'I': ['alone', 'quiet', 'few', 'home', 'individual'],
+        'S': ['detail', 'fact', 'practical', 'present', 'reality'],
+        'N': ['future', 'possibility', 'imagine', 'theory', 'abstract'],
+        'T': ['logic', 'analyze', 'think', 'pros and cons', 'objective'],
+        'F': ['feel', 'value', 'harmony', 'emotion', 'care'],
+        'J': ['plan', 'organize', 'structure', 'decide', 'control'],
+        'P': ['flexible', 'adapt', 'spontaneous', 'flow', 'explore']
+    }
+    
+    # Count occurrences
+    scores = {letter: sum(answers_text.count(word) for word in words) 
+             for letter, words in keywords.items()}
+    
+    # Determine type
+    mbti = ''
+    mbti += 'E' if scores['E'] > scores['I'] else 'I'
+    mbti += 'N' if scores['N'] > scores['S'] else 'S'
+    mbti += 'T' if scores['T'] > scores['F'] else 'F'
+    mbti += 'J' if scores['J'] > scores['P'] else 'P'
+    
+    return mbti
+
+
+def canned_result(mbti: str, description: str = "") -> dict:
+    """The canned title, traits, strengths and growth areas for a type."""
+    temperament = mbti[1] + (mbti[2] if mbti[1] == "N" else mbti[3])
+    role, emoji = TEMPERAMENTS[temperament]
+    
+    return {
+        "title": f"The {mbti} {role}",
+        "type": mbti,
+        "emoji": emoji,
+        "description": description,
+        "traits": [LETTER_TRAITS[letter] for letter in mbti],
+        "strengths": [LETTER_STRENGTHS[letter] for letter in mbti],
+        "growth_areas": [LETTER_GROWTH_AREAS[letter] for letter in mbti]
+    }
+
+
+def local_analysis(answers: Dict[int, str], questions=None, description: str = "") -> dict:
+    """
+    Build a result without calling the LLM.
+
+    The type comes from the local scorer when the answers match the fixed
+    quiz options (falling back to a keyword count for free text), and the
+    traits, strengths and growth areas are canned per type letter.
+    """
+    # Score the fixed quiz options locally when we can
+    local = score_answers(answers, questions) if questions is not None else None
+    mbti = local["type"] if local is not None else _keyword_type(answers)
+    return canned_result(mbti, description)
+
+
+class PersonalityAnalyzer:
+    def __init__(self, client: Optional[MistralClient] = None,
+                 output_format: str = ANALYSIS_OUTPUT_FORMAT,
+                 reuse_results: bool = True,
+                 prompt_builder: Optional[PromptBuilder] = None):
+        self._client = client
+        self.output_format = output_format
+        self.reuse_results = reuse_results
+        self.prompt_builder = prompt_builder or get_prompt_builder()
+        self.prompt_stats = None  # size of the last prompt built: mode, estimated tokens, how it was trimmed
+        self.used_fallback = False
+        self.fallback_reason = None
+        self.truncated = False
+        self.served_from = None
+    
+    @property
+    def client(self) -> MistralClient:
+        # Created on first use, so archetype results can be served without an API key
+        if self._client is None:
+            self._client = get_shared_client()
+        return self._client
+        
+    def generate_analysis_prompt(self, answers: Dict[int, str], questions,
+                                 format_instructions: Optional[str] = None) -> str:
+        """Generate a prompt for Mistral AI based on user's answers."""
+        return self._build_prompt(answers, questions, format_instructions)[1]
+
+    def _build_prompt(self, answers: Dict[int, str], questions,
+                      format_instructions: Optional[str] = None) -> Tuple[str, str, dict]:
+        """System prompt, analysis prompt and prompt size, from this analyzer's prompt builder."""
+        if format_instructions is None:
+            format_instructions = JSON_FORMAT_INSTRUCTIONS if self.output_format == "json" else TEXT_FORMAT_INSTRUCTIONS
+        return self.prompt_builder.build(answers, questions, format_instructions)
+
+    def _build_messages(self, answers: Dict[int, str], questions) -> List[ChatMessage]:
+        """Build the chat messages for an analysis request."""
+        with timed("prompt"):
+            system, prompt, self.prompt_stats = self._build_prompt(answers, questions)
+        record_prompt_size(self.prompt_stats)
+        return [
+            ChatMessage(role="system", content=system),
+            ChatMessage(role="user", content=prompt)
+        ]
+
+    def _serve_precomputed(self, answers: Dict[int, str], questions) -> Optional[dict]:
+        """
+        Serve from earlier work instead of a full generation when possible.
+
+        In order: an exact archetype pattern, a stored analysis of answers
+        within NEIGHBOUR_REUSE_DISTANCE, a slightly further one adapted by a
+        short follow-up call, then the type-level archetype (personalized
+        when possible). Returns None when a full analysis is needed.
+        """
+        if not self.reuse_results:
+            return None
+        indices = encode_answers(answers, questions)
+        if indices is None:
+            return None
+        mbti = str(type_letters(score_indices(indices), tiebreak_scores(indices)))
+        
+        match, archetype = None, None
+        index = get_archetype_index() if ARCHETYPES_ENABLED else None
+        if index is not None and index.meta.get("questions") == questions_fingerprint(questions):
+            with timed("archetype"):
+                match, archetype = index.lookup(mbti, answer_code(indices))
+        if match == "exact":
+            ARCHETYPES_SERVED.inc(match=match, personalized="false")
+            self.served_from = "archetype"
+            return archetype
+        
+        search_distance = max(NEIGHBOUR_REUSE_DISTANCE, NEIGHBOUR_TEMPLATE_DISTANCE)
+        if search_distance > 0:
+            with timed("neighbour"):
+                distance, neighbour_indices, neighbour = _neighbours.nearest(
+                    indices, TYPE_INDEX[mbti], search_distance)
+            if neighbour is not None and distance <= NEIGHBOUR_REUSE_DISTANCE:
+                NEIGHBOURS_SERVED.inc(mode="reuse")
+                self.served_from = "neighbour"
+                return dict(neighbour)
+            if neighbour is not None:
+                differences = "".join(
+                    f"- {questions[q]['text']} They chose \"{answers[q]}\" instead of "
+                    f"\"{questions[q]['options'][neighbour_indices[q]]}\"\n"
+                    for q in np.flatnonzero(neighbour_indices != indices)
+                )
+                prompt = NEIGHBOUR_DELTA_PROMPT.format(mbti=mbti, title=neighbour["title"],
+                                                       description=neighbour["description"],
+                                                       differences=differences)
+                addition = self._short_completion(prompt)
+                if addition:
+                    NEIGHBOURS_SERVED.inc(mode="template")
+                    self.served_from = "neighbour"
+                    return dict(neighbour, description=f"{neighbour['description']}\n\n{addition}")
         
-        for question_num, answer in answers.items():
-            prompt += f"Question: {questions[question_num]['text']}\n"
-            prompt += f"Answer: {answer}\n\n"
+        if archetype is None:
+            return None
+        personalized = False
+        if ARCHETYPE_PERSONALIZE:
+            answer_lines = "".join(f"- {questions[q]['text']} {answer}\n" for q, answer in answers.items())
+            intro = self._short_completion(PERSONALIZE_PROMPT.format(
+                mbti=archetype["type"], title=archetype["title"],
+                description=archetype["description"], answers=answer_lines))
+            if intro:
+                archetype["description"] = f"{intro}\n\n{archetype['description']}"
+                personalized = True
+        ARCHETYPES_SERVED.inc(match=match, personalized=str(personalized).lower())
+        self.served_from = "archetype"
+        return archetype
+
+    def _short_completion(self, prompt: str) -> Optional[str]:
+        """A short, cheap completion that adapts precomputed text, or None if it can't be had right now."""
+        if not os.getenv("MISTRAL_API_KEY") or not _breaker.allow():
+            return None
+        # There is already a good answer to serve, so never queue for this call
+        ticket = _rate_limiter.acquire(estimate_tokens(prompt) + PERSONALIZE_MAX_TOKENS, timeout=0)
+        if not ticket.admitted:
+            _breaker.cancel()
+            return None
         
-        prompt += "\nGive us a balanced analysis that's both insightful and relatable. Mix some casual language with proper MBTI insights!"
+        def chat():
+            with _track_request():
+                return self.client.chat(
+                    model=PERSONALIZE_MODEL,
+                    messages=[ChatMessage(role="user", content=prompt)],
+                    temperature=ANALYSIS_TEMPERATURE,
+                    max_tokens=PERSONALIZE_MAX_TOKENS
+                )
         
-        return prompt
+        started = time.monotonic()
+        try:
+            with timed("upstream", mode="personalize"):
+                response = call_with_deadline(chat, started + ANALYSIS_DEADLINE_SECONDS, ticket, PERSONALIZE_MODEL)
+        except Exception as e:
+            _breaker.record(False)
+            print(f"Personalization failed: {str(e)}")
+            return None
+        _breaker.record(True)
+        if not response or not response.choices:
+            return None
+        return (response.choices[0].message.content or "").strip() or None
+
+    def _response_format(self) -> Optional[dict]:
+        """Ask the API for a JSON object in JSON mode; leave the default otherwise."""
+        return {"type": "json_object"} if self.output_format == "json" else None
+
+    def _request_tokens(self, messages: List[ChatMessage]) -> int:
+        """Token budget to reserve for a request: the prompt plus the full completion."""
+        return sum(estimate_tokens(m.content) for m in messages) + ANALYSIS_MAX_TOKENS
 
     def analyze_responses(self, answers: Dict[int, str], questions) -> dict:
         """Use Mistral AI to analyze quiz responses and generate a personality profile."""
         try:
+            precomputed = self._serve_precomputed(answers, questions)
+            if precomputed is not None:
+                return precomputed
+            
             if not os.getenv("MISTRAL_API_KEY"):
                 print("No API key found! Please check your .env file")
-                return self._get_fallback_analysis(answers)
+                return self._get_fallback_analysis(answers, questions, reason="no_key")
             
-            prompt = self.generate_analysis_prompt(answers, questions)
+            if ANALYSIS_MODE == "split":
+                return self._analyze_split(answers, questions)
             
-            messages = [
-                ChatMessage(
-                    role="system", 
-                    content="""You are a personality analyst who deeply understands MBTI theory while keeping things relatable. 
-                    For each analysis:
-                    - Break down cognitive functions in a way that makes sense (like explaining how Fe users are the friends who always know when someone's upset)
-                    - Use specific examples from their answers to support your type assessment
-                    - Mix professional insights with casual observations
-                    - Explain MBTI concepts clearly without getting too technical
-                    - Connect their type to real-world behaviors and tendencies
-                    - Keep it balanced between formal MBTI theory and friendly chat
-                    """
-                ),
-                ChatMessage(role="user", content=prompt)
-            ]
+            messages = self._build_messages(answers, questions)
+            
+            # Skip straight to the fallback while upstream is unhealthy
+            if not _breaker.allow():
+                print("Mistral circuit breaker is open, serving the local result")
+                return self._get_fallback_analysis(answers, questions, reason="circuit_open")
+            
+            tokens = self._request_tokens(messages)
+            ticket = _rate_limiter.acquire(tokens)
+            if not ticket.admitted:
+                _breaker.cancel()
+                print(f"Mistral budget exceeded ({ticket.status}), serving the local result")
+                return self._get_fallback_analysis(answers, questions, reason="rate_limited")
             
             try:
-                response = self.client.chat(
-                    model="mistral-medium",
-                    messages=messages,
-                    temperature=0.9,
-                    max_tokens=1500
-                )
+                def chat():
+                    with _track_request():
+                        return self.client.chat(
+                            model=ANALYSIS_MODEL,
+                            messages=messages,
+                            temperature=ANALYSIS_TEMPERATURE,
+                            max_tokens=ANALYSIS_MAX_TOKENS,
+                            response_format=self._response_format()
+                        )
+                
+                started = time.monotonic()
+                try:
+                    response = call_with_deadline(chat, started + ANALYSIS_DEADLINE_SECONDS, ticket)
+                except Exception:
+                    _breaker.record(False)
+                    raise
+                _breaker.record(True)
+                record_stage("upstream", time.monotonic() - started, mode="chat")
                 
                 # The response structure has changed - let's handle it correctly
                 if not response or not response.choices:
                     print("Empty response from Mistral API")
-                    return self._get_fallback_analysis(answers)
+                    return self._get_fallback_analysis(answers, questions, reason="empty_response")
                 
                 # Get the message content from the first choice
                 message_content = response.choices[0].message.content
                 if not message_content:
                     print("Empty message content from API")
-                    return self._get_fallback_analysis(answers)
+                    return self._get_fallback_analysis(answers, questions, reason="empty_response")
                     
-                result = self._parse_mistral_response(message_content)
-                return result
+                try:
+                    with timed("parse"):
+                        return self._parse_mistral_response(message_content)
+                except Exception as parse_error:
+                    print(f"Error parsing AI response: {str(parse_error)}")
+                    return self._get_fallback_analysis(answers, questions, reason="parse_error")
                 
             except Exception as api_error:
                 print(f"API Error: {str(api_error)}")
-                return self._get_fallback_analysis(answers)
+                return self._get_fallback_analysis(answers, questions, reason=_error_reason(api_error))
             
         except Exception as e:
             print(f"General Error: {str(e)}")
-            return self._get_fallback_analysis(answers)
+            return self._get_fallback_analysis(answers, questions, reason="error")
     
-    def _parse_mistral_response(self, response_text: str) -> dict:
-        """Parse the Mistral AI response into structured format."""
+    def stream_responses(self, answers: Dict[int, str], questions,
+                         on_queue: Optional[Callable[[Ticket], None]] = None) -> Iterator[dict]:
+        """
+        Stream the analysis from Mistral AI.
+
+        Yields a partial result every time a section grows; the last dict
+        yielded is the complete result (or the fallback analysis on failure).
+        In JSON mode nothing can be shown early, so only the final result is
+        yielded. ``on_queue`` receives the rate limiter ticket while the request waits
+        for admission. A stream still running at the analysis deadline is cut
+        short and whatever arrived so far becomes the result.
+        """
+        self.used_fallback = False
+        precomputed = self._serve_precomputed(answers, questions)
+        if precomputed is not None:
+            yield precomputed
+            return
+        
+        if not os.getenv("MISTRAL_API_KEY"):
+            print("No API key found! Please check your .env file")
+            yield self._get_fallback_analysis(answers, questions, reason="no_key")
+            return
+
+        # Skip straight to the fallback while upstream is unhealthy; in split
+        # mode this one check covers every call of the analysis
+        if not _breaker.allow():
+            print("Mistral circuit breaker is open, serving the local result")
+            yield self._get_fallback_analysis(answers, questions, reason="circuit_open")
+            return
+
+        if ANALYSIS_MODE == "split":
+            yield from self._stream_split(answers, questions, on_queue)
+            return
+
+        messages = self._build_messages(answers, questions)
+        ticket = _rate_limiter.acquire(self._request_tokens(messages), on_queue=on_queue)
+        if not ticket.admitted:
+            _breaker.cancel()
+            print(f"Mistral budget exceeded ({ticket.status}), serving the local result")
+            yield self._get_fallback_analysis(answers, questions, reason="rate_limited")
+            return
+
+        parser = StreamingResponseParser()
+        json_chunks = []
+        received = False
+        usage = None
+        streamed_chars = 0
+        started = time.monotonic()
+        deadline = started + ANALYSIS_DEADLINE_SECONDS
+        first_chunk_latency = None
         try:
-            sections = {
-                "title": "",
-                "type": "",
-                "emoji": "",
-                "description": [],
-                "traits": [],
-                "strengths": [],
-                "growth_areas": []
-            }
-            
-            current_section = None
-            lines = response_text.split('\n')
-            
-            for line in lines:
-                line = line.strip()
-                if not line:
+            for chunk in stream_with_deadline(lambda: self.client.chat_stream(
+                model=ANALYSIS_MODEL,
+                messages=messages,
+                temperature=ANALYSIS_TEMPERATURE,
+                max_tokens=ANALYSIS_MAX_TOKENS,
+                response_format=self._response_format()
+            ), deadline):
+                if first_chunk_latency is None:
+                    first_chunk_latency = time.monotonic() - started
+                    record_stage("upstream_first_token", first_chunk_latency)
+                # Only the final chunk carries usage
+                if getattr(chunk, "usage", None) is not None:
+                    usage = chunk.usage
+                    _record_usage(usage)
+                if not chunk.choices:
                     continue
-                    
-                if line.startswith("TITLE:"):
-                    current_section = "title"
-                    sections["title"] = line.replace("TITLE:", "").strip()
-                elif line.startswith("TYPE:"):
-                    current_section = "type"
-                    sections["type"] = line.replace("TYPE:", "").strip()
-                elif line.startswith("EMOJI:"):
-                    sections["emoji"] = line.replace("EMOJI:", "").strip()
-                elif line.startswith("DESCRIPTION:"):
-                    current_section = "description"
-                elif line.startswith("TRAITS:"):
-                    current_section = "traits"
-                    traits = line.replace("TRAITS:", "").strip()
-                    if traits and ',' in traits:
-                        sections["traits"] = [t.strip() for t in traits.split(",")]
-                    else:
-                        sections["traits"] = [traits] if traits else []
-                elif line.startswith("STRENGTHS:"):
-                    current_section = "strengths"
-                    strengths = line.replace("STRENGTHS:", "").strip()
-                    if strengths and ',' in strengths:
-                        sections["strengths"] = [s.strip() for s in strengths.split(",")]
-                    else:
-                        sections["strengths"] = [strengths] if strengths else []
-                elif line.startswith("GROWTH_AREAS:"):
-                    current_section = "growth_areas"
-                    areas = line.replace("GROWTH_AREAS:", "").strip()
-                    if areas and ',' in areas:
-                        sections["growth_areas"] = [a.strip() for a in areas.split(",")]
-                    else:
-                        sections["growth_areas"] = [areas] if areas else []
-                elif current_section == "description":
-                    sections["description"].append(line)
-                elif current_section == "traits" and line and not line.startswith("-"):
-                    sections["traits"].append(line)
-                elif current_section == "strengths" and line and not line.startswith("-"):
-                    sections["strengths"].append(line)
-                elif current_section == "growth_areas" and line and not line.startswith("-"):
-                    sections["growth_areas"].append(line)
-            
-            # Clean up lists - remove any empty strings
-            sections["traits"] = [t for t in sections["traits"] if t]
-            sections["strengths"] = [s for s in sections["strengths"] if s]
-            sections["growth_areas"] = [a for a in sections["growth_areas"] if a]
-            
-            # Handle bullet points if present
-            for key in ["traits", "strengths", "growth_areas"]:
-                new_items = []
-                for item in sections[key]:
-                    if item.startswith("- "):
-                        new_items.append(item[2:])
-                    elif item.startswith("• "):
-                        new_items.append(item[2:])
-                    else:
-                        new_items.append(item)
-                sections[key] = new_items
-            
-            return {
-                "title": sections["title"] or "The Personality Explorer",
-                "type": sections["type"] or "Personality Type Analysis",
-                "emoji": sections["emoji"] or "✨",
-                "description": "\n\n".join(sections["description"]),
-                "traits": sections["traits"] or ["Unique", "Complex", "Multifaceted"],
-                "strengths": sections["strengths"] or ["Adaptability", "Insight", "Growth Mindset"],
-                "growth_areas": sections["growth_areas"] or ["Continuing to explore", "Embracing change", "Self-discovery"]
-            }
-        except Exception as e:
-            print(f"Error parsing AI response: {str(e)}")
-            return self._get_fallback_analysis(answers)
+                content = chunk.choices[0].delta.content
+                if not content:
+                    continue
+                received = True
+                streamed_chars += len(content)
+                if self.output_format == "json":
+                    # JSON can't be shown until it's complete, so just collect it
+                    json_chunks.append(content)
+                elif parser.feed(content):
+                    yield parser.snapshot()
+        except DeadlineExceeded:
+            # Keep whatever has streamed so far rather than blanking the page
+            print("Analysis deadline exceeded, ending the stream early")
+            _count_hedge("deadline_exceeded")
+            self.truncated = True
+        except Exception as api_error:
+            _breaker.record(False)
+            print(f"API Error: {str(api_error)}")
+            yield self._get_fallback_analysis(answers, questions, reason=_error_reason(api_error))
+            return
+        finally:
+            _settle_stream(ticket, usage, messages, streamed_chars)
+        # Streams are judged on time to first token; the full generation is slow by design
+        _breaker.record(received, first_chunk_latency or 0.0)
+        record_stage("upstream", time.monotonic() - started, mode="stream")
+
+        if not received:
+            print("Empty message content from API")
+            yield self._get_fallback_analysis(answers, questions,
+                                              reason="deadline" if self.truncated else "empty_response")
+            return
+        try:
+            with timed("parse"):
+                if self.output_format == "json":
+                    result = self._parse_mistral_response("".join(json_chunks))
+                else:
+                    result = parser.finish()
+        except Exception as parse_error:
+            print(f"Error parsing AI response: {str(parse_error)}")
+            result = self._get_fallback_analysis(answers, questions, reason="parse_error")
+        yield result
+
+    def _split_requests(self, answers: Dict[int, str], questions) -> List[dict]:
+        """The split-mode calls for these answers: model, result keys, messages and token limits."""
+        mbti = local_analysis(answers, questions)["type"]
+        requests = []
+        with timed("prompt"):
+            for model, keys in split_plan():
+                if keys == ["description"]:
+                    system, prompt, stats = self._build_prompt(
+                        answers, questions, SPLIT_DESCRIPTION_INSTRUCTIONS.format(mbti=mbti))
+                    max_tokens = SPLIT_DESCRIPTION_MAX_TOKENS
+                else:
+                    system, prompt, stats = self.prompt_builder.build_fields(
+                        answers, questions, mbti, format_instructions(SECTION_KEYS[key] for key in keys))
+                    max_tokens = SPLIT_FIELDS_MAX_TOKENS
+                record_prompt_size(stats)
+                messages = [ChatMessage(role="system", content=system),
+                            ChatMessage(role="user", content=prompt)]
+                requests.append({
+                    "model": model,
+                    "keys": keys,
+                    "part": "description" if keys == ["description"] else "fields",
+                    "messages": messages,
+                    "max_tokens": max_tokens,
+                    "tokens": sum(estimate_tokens(m.content) for m in messages) + max_tokens,
+                })
+        return requests
+
+    def _split_call(self, request: dict, deadline: float, ticket: Optional[Ticket] = None) -> dict:
+        """
+        Make one split-mode call and return the raw sections it produced.
+
+        The circuit breaker is asked once for the whole analysis, before the
+        description's ``ticket`` is acquired, so a half-open probe lets every
+        part through; each call still records its own outcome.
+        """
+        if ticket is None:
+            ticket = _rate_limiter.acquire(request["tokens"])
+            if not ticket.admitted:
+                raise UpstreamUnavailable("rate_limited")
+
+        def chat():
+            with _track_request():
+                return self.client.chat(
+                    model=request["model"],
+                    messages=request["messages"],
+                    temperature=ANALYSIS_TEMPERATURE,
+                    max_tokens=request["max_tokens"]
+                )
+
+        started = time.monotonic()
+        try:
+            response = call_with_deadline(chat, deadline, ticket, request["model"])
+        except Exception:
+            _breaker.record(False)
+            raise
+        _breaker.record(True)
+        record_stage("upstream", time.monotonic() - started, mode="split", part=request["part"])
+        if not response or not response.choices or not response.choices[0].message.content:
+            raise UpstreamUnavailable("empty_response")
+        # The description call may leave out its header
+        return _parse_sections(response.choices[0].message.content,
+                               current="description" if request["part"] == "description" else None)
+
+    def _merge_split(self, answers: Dict[int, str], questions, description: str,
+                     requests: List[dict], futures: list, deadline: float) -> dict:
+        """
+        Combine the description with the short sections as their calls finish.
+
+        Sections whose call failed keep the local result's values; such a
+        mixed result counts as a partial fallback so it isn't shared.
+        """
+        result = local_analysis(answers, questions, description=description)
+        for request, future in zip(requests, futures):
+            try:
+                sections = future.result(timeout=max(0.0, deadline - time.monotonic()))
+            except Exception as e:
+                reason = f"partial_{_error_reason(e)}"
+                print(f"Split-mode sections {', '.join(request['keys'])} failed ({str(e) or reason}), using local ones")
+                self.used_fallback = True
+                self.fallback_reason = reason
+                FALLBACKS.inc(reason=reason)
+                log_event("fallback", reason=reason)
+                continue
+            for key in request["keys"]:
+                if sections[key]:
+                    result[key] = sections[key]
+        return result
+
+    def _analyze_split(self, answers: Dict[int, str], questions) -> dict:
+        """Split mode: the description and the short sections from concurrent calls, merged."""
+        # Skip straight to the fallback while upstream is unhealthy
+        if not _breaker.allow():
+            print("Mistral circuit breaker is open, serving the local result")
+            return self._get_fallback_analysis(answers, questions, reason="circuit_open")
+        requests = self._split_requests(answers, questions)
+        ticket = _rate_limiter.acquire(requests[0]["tokens"])
+        if not ticket.admitted:
+            _breaker.cancel()
+            print(f"Mistral budget exceeded ({ticket.status}), serving the local result")
+            return self._get_fallback_analysis(answers, questions, reason="rate_limited")
+        started = time.monotonic()
+        deadline = started + ANALYSIS_DEADLINE_SECONDS
+        # The short sections are generated while this thread waits for the description
+        futures = [_split_executor.submit(self._split_call, request, deadline) for request in requests[1:]]
+        try:
+            sections = self._split_call(requests[0], deadline, ticket)
+        except Exception as api_error:
+            print(f"API Error: {str(api_error)}")
+            return self._get_fallback_analysis(answers, questions, reason=_error_reason(api_error))
+        if not sections["description"]:
+            print("Empty description from API")
+            return self._get_fallback_analysis(answers, questions, reason="empty_response")
+        result = self._merge_split(answers, questions, "\n\n".join(sections["description"]),
+                                   requests[1:], futures, deadline)
+        record_stage("upstream", time.monotonic() - started, mode="split")
+        return result
+
+    def _stream_split(self, answers: Dict[int, str], questions,
+                      on_queue: Optional[Callable[[Ticket], None]] = None) -> Iterator[dict]:
+        """Split mode for stream_responses(): stream the description, merging in the short sections as they land."""
+        requests = self._split_requests(answers, questions)
+        description_request = requests[0]
+        ticket = _rate_limiter.acquire(description_request["tokens"], on_queue=on_queue)
+        if not ticket.admitted:
+            _breaker.cancel()
+            print(f"Mistral budget exceeded ({ticket.status}), serving the local result")
+            yield self._get_fallback_analysis(answers, questions, reason="rate_limited")
+            return
+
+        started = time.monotonic()
+        deadline = started + ANALYSIS_DEADLINE_SECONDS
+        futures = [_split_executor.submit(self._split_call, request, deadline) for request in requests[1:]]
+        landed = {}
+        parser = StreamingResponseParser()
+        parser.current_section = "description"
+        received = False
+        usage = None
+        streamed_chars = 0
+        first_chunk_latency = None
+        try:
+            for chunk in stream_with_deadline(lambda: self.client.chat_stream(
+                model=description_request["model"],
+                messages=description_request["messages"],
+                temperature=ANALYSIS_TEMPERATURE,
+                max_tokens=description_request["max_tokens"]
+            ), deadline):
+                if first_chunk_latency is None:
+                    first_chunk_latency = time.monotonic() - started
+                    record_stage("upstream_first_token", first_chunk_latency)
+                if getattr(chunk, "usage", None) is not None:
+                    usage = chunk.usage
+                    _record_usage(usage, description_request["model"])
+                changed = False
+                for request, future in zip(requests[1:], futures):
+                    if future.done() and request["part"] not in landed and future.exception() is None:
+                        landed[request["part"]] = {key: future.result()[key] for key in request["keys"]}
+                        changed = True
+                content = chunk.choices[0].delta.content if chunk.choices else None
+                if content:
+                    received = True
+                    streamed_chars += len(content)
+                    changed = bool(parser.feed(content)) or changed
+                if changed:
+                    snapshot = parser.snapshot()
+                    for sections in landed.values():
+                        snapshot.update((key, value) for key, value in sections.items() if value)
+                    yield snapshot
+        except DeadlineExceeded:
+            print("Analysis deadline exceeded, ending the stream early")
+            _count_hedge("deadline_exceeded")
+            self.truncated = True
+        except Exception as api_error:
+            _breaker.record(False)
+            print(f"API Error: {str(api_error)}")
+            yield self._get_fallback_analysis(answers, questions, reason=_error_reason(api_error))
+            return
+        finally:
+            _settle_stream(ticket, usage, description_request["messages"], streamed_chars)
+        _breaker.record(received, first_chunk_latency or 0.0)
+        record_stage("upstream", time.monotonic() - started, mode="split_stream")
+
+        description = parser.finish()["description"] if received else ""
+        if not description:
+            print("Empty message content from API")
+            yield self._get_fallback_analysis(answers, questions,
+                                              reason="deadline" if self.truncated else "empty_response")
+            return
+        yield self._merge_split(answers, questions, description, requests[1:], futures, deadline)
+
+    def _parse_mistral_response(self, response_text: str) -> dict:
+        """Parse the Mistral AI response into structured format."""
+        if self.output_format == "json":
+            result = parse_json_response(response_text)
+            if result is not None:
+                return result
+            # The model ignored JSON mode; the text parser still gets the defaults right
+        return parse_response_text(response_text)
     
-    def _get_fallback_analysis(self, answers: Dict[int, str]) -> dict:
+    def _get_fallback_analysis(self, answers: Dict[int, str], questions=None,
+                               reason: str = "error") -> dict:
         """Provide a fallback analysis based on actual answers."""
-        # Analyze answers for personality tendencies
-        answers_text = ' '.join(answers.values()).lower()
-        
-        # Simple keyword analysis
-        keywords = {
-            'E': ['out', 'social', 'friends', 'party', 'people', 'group'],
-            'I': ['alone', 'quiet', 'few', 'home', 'individual'],
-            'S': ['detail', 'fact', 'practical', 'present', 'reality'],
-            'N': ['future', 'possibility', 'imagine', 'theory', 'abstract'],
-            'T': ['logic', 'analyze', 'think', 'pros and cons', 'objective'],
-            'F': ['feel', 'value', 'harmony', 'emotion', 'care'],
-            'J': ['plan', 'organize', 'structure', 'decide', 'control'],
-            'P': ['flexible', 'adapt', 'spontaneous', 'flow', 'explore']
-        }
-        
-        # Count occurrences
-        scores = {letter: sum(answers_text.count(word) for word in words) 
-                 for letter, words in keywords.items()}
-        
-        # Determine type
-        mbti = ''
-        mbti += 'E' if scores['E'] > scores['I'] else 'I'
-        mbti += 'N' if scores['N'] > scores['S'] else 'S'
-        mbti += 'T' if scores['T'] > scores['F'] else 'F'
-        mbti += 'J' if scores['J'] > scores['P'] else 'P'
-        
-        return {
-            "title": f"The {mbti} Explorer",
-            "type": mbti,
-            "emoji": "✨",
-            "description": "Analysis unavailable at the moment. Please try again later.",
-            "traits": ["Analytical", "Adaptable", "Thoughtful"],
-            "strengths": ["Problem solving", "Communication", "Creativity"],
-            "growth_areas": ["Balance", "Patience", "Self-reflection"]
-        }
+        self.used_fallback = True
+        self.fallback_reason = reason
+        FALLBACKS.inc(reason=reason)
+        log_event("fallback", reason=reason)
+        return local_analysis(answers, questions, description=FALLBACK_DESCRIPTION)
 
-def analyze_personality(answers: Dict[int, str], questions) -> dict:
+def analyze_personality(answers: Dict[int, str], questions,
+                        session_cache: Optional[MutableMapping] = None) -> dict:
     """
     Wrapper function to analyze quiz responses using the PersonalityAnalyzer.
+
+    Results are memoized by answer fingerprint, in this process and in the
+    persistent result store that every replica shares, so answers analyzed
+    by any process are never sent upstream again. Pass a per-session mapping
+    as ``session_cache`` so that reruns within a session never leave the process.
+    Fallback results are only kept in the session layer so a transient API
+    failure is not shared with other sessions. Concurrent calls with the same
+    answers share a single upstream request.
     """
+    return analyze_personality_outcome(answers, questions, session_cache)[0]
+
+def analyze_personality_outcome(answers: Dict[int, str], questions,
+                                session_cache: Optional[MutableMapping] = None) -> Tuple[dict, Optional[str]]:
+    """
+    analyze_personality(), plus the fallback reason when any part of the
+    result is local rather than generated (a split-mode section failing
+    too), or None. A result from the session layer reports None even if
+    it was a fallback, as only that layer keeps them.
+    """
+    key = answer_fingerprint(answers, questions)
+    cached = _analysis_cache.get(key, session_cache)
+    if cached is not None:
+        return cached, None
+
+    # Identical answers already being analyzed by another session share that call
+    result, reason = _in_flight.do(("analyze", key), lambda: _run_analysis(key, answers, questions))
+    if session_cache is not None:
+        session_cache[key] = result
+    return result, reason
+
+def _run_analysis(key: str, answers: Dict[int, str], questions) -> Tuple[dict, Optional[str]]:
+    # A caller that missed the cache just before the previous leader stored
+    # its result and left the single flight becomes a new leader; look again
+    # so it reuses that result instead of calling upstream a second time
+    cached = _analysis_cache.get(key, count=False)
+    if cached is not None:
+        return cached, None
     analyzer = PersonalityAnalyzer()
-    return analyzer.analyze_responses(answers, questions)
+    result = analyzer.analyze_responses(answers, questions)
+    if analyzer.used_fallback:
+        return result, analyzer.fallback_reason
+    _analysis_cache.put(key, result)
+    if analyzer.served_from is None:
+        _remember_neighbour(answers, questions, result)
+    return result, None
+
+def stream_personality(answers: Dict[int, str], questions,
+                       session_cache: Optional[MutableMapping] = None,
+                       on_queue: Optional[Callable[[Ticket], None]] = None) -> Iterator[dict]:
+    """
+    Streaming counterpart of analyze_personality().
+
+    Yields partial results as the analysis is generated; the last dict is the
+    final result. Cached results are yielded once, straight away.
+    """
+    key = answer_fingerprint(answers, questions)
+    cached = _analysis_cache.get(key, session_cache)
+    if cached is not None:
+        yield cached
+        return
+
+    analyzer = PersonalityAnalyzer()
+    result = None
+    for result in analyzer.stream_responses(answers, questions, on_queue=on_queue):
+        yield result
+
+    # Fallbacks and truncated streams are not worth sharing with other sessions
+    if analyzer.used_fallback or analyzer.truncated:
+        if session_cache is not None:
+            session_cache[key] = result
+    else:
+        _analysis_cache.put(key, result, session_cache)
+        if analyzer.served_from is None:
+            _remember_neighbour(answers, questions, result)
+
+_enrichment_executor = ThreadPoolExecutor(max_workers=ENRICHMENT_WORKERS,
+                                          thread_name_prefix="enrichment")
+
+
+class AnalysisJob:
+    """
+    A streaming LLM analysis running on a worker thread.
+
+    Keep the job in session state and poll it from later reruns: ``partial``
+    holds the latest streamed snapshot and ``result()`` the final dict once
+    ``done()`` is true. While the request waits for the rate limiter,
+    ``queue_status()`` reports its position and estimated wait.
+    """
+
+    def __init__(self, answers: Dict[int, str], questions,
+                 session_cache: Optional[MutableMapping] = None,
+                 result: Optional[dict] = None):
+        self.partial = result
+        self.ticket = None
+        if result is not None:
+            # Already stored, so there is nothing to run
+            self.future = Future()
+            self.future.set_result(result)
+        else:
+            self.future = _enrichment_executor.submit(self._run, answers, questions, session_cache)
+
+    def _run(self, answers: Dict[int, str], questions, session_cache) -> dict:
+        result = None
+        try:
+            for result in stream_personality(answers, questions, session_cache,
+                                             on_queue=self._queued):
+                self.partial = result
+        except Exception as e:
+            print(f"Background analysis error: {str(e)}")
+            result = local_analysis(answers, questions, description=FALLBACK_DESCRIPTION)
+        return result
+
+    def _queued(self, ticket: Ticket):
+        self.ticket = ticket
+
+    def queue_status(self) -> Optional[dict]:
+        """Queue position and estimated wait while waiting for admission, else None."""
+        ticket = self.ticket
+        if ticket is None or ticket.status != "queued":
+            return None
+        return {"position": ticket.position(), "estimated_wait": ticket.estimated_wait()}
+
+    def done(self) -> bool:
+        return self.future.done()
+
+    def result(self, timeout: Optional[float] = None) -> dict:
+        return self.future.result(timeout)
+
+
+def submit_analysis(answers: Dict[int, str], questions,
+                    session_cache: Optional[MutableMapping] = None) -> AnalysisJob:
+    """
+    Start the LLM analysis in the background and return its job handle.
+
+    A stored result comes back as an already finished job. If another
+    session is already analyzing the same answers, its job is returned
+    instead so both sessions follow one upstream stream.
+    """
+    key = answer_fingerprint(answers, questions)
+    stored = _analysis_cache.get(key, session_cache)
+    if stored is not None:
+        return AnalysisJob(answers, questions, session_cache, result=stored)
+    # The job's stream_personality() checks the cache again before going
+    # upstream, in case an earlier job stored this result since the miss above
+    job, coalesced = _in_flight.join(
+        ("stream", key), lambda: AnalysisJob(answers, questions, session_cache)
+    )
+    if coalesced:
+        if session_cache is not None:
+            job.future.add_done_callback(lambda f: session_cache.__setitem__(key, f.result()))
+    else:
+        job.future.add_done_callback(lambda f: _in_flight.release(("stream", key), job))
+    return job
+
+def _collect_gauges() -> dict:
+    """Flatten the component stats into gauges for the metrics exporters."""
+    gauges = {}
+    for prefix, stats in (("analysis_cache", get_cache_stats()),
+                          ("analysis_coalesce", get_coalescing_stats()),
+                          ("analysis_neighbours", get_neighbour_stats()),
+                          ("mistral_rate_limit", get_rate_limit_stats()),
+                          ("mistral_pool", get_client_pool_info())):
+        for name, value in stats.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                gauges[f"{prefix}_{name}"] = value
+    resilience = get_resilience_stats()
+    breaker = resilience.pop("breaker")
+    gauges["mistral_breaker_state"] = ("closed", "half_open", "open").index(breaker["state"])
+    gauges["mistral_breaker_short_circuited"] = breaker["short_circuited"]
+    gauges["mistral_breaker_opened"] = breaker["opened"]
+    for name, value in resilience.items():
+        if value is not None:
+            gauges[f"mistral_{name}"] = value
+    return gauges
+
+
+register_collector(_collect_gauges)
+
+_neighbours = NeighbourIndex(NEIGHBOUR_INDEX_SIZE, len(WEIGHT_MATRIX))
+
+
+def _remember_neighbour(answers: Dict[int, str], questions, result: dict):
+    """Make a freshly generated analysis available for reuse by similar answers."""
+    if max(NEIGHBOUR_REUSE_DISTANCE, NEIGHBOUR_TEMPLATE_DISTANCE) <= 0:
+        return
+    indices = encode_answers(answers, questions)
+    if indices is None:
+        return
+    mbti = str(type_letters(score_indices(indices), tiebreak_scores(indices)))
+    # Only fresh LLM analyses are stored, never reused ones, so nothing drifts
+    # more than one hop from the answers it was written for
+    _neighbours.add(indices, TYPE_INDEX[mbti], result)
+
+
+def get_neighbour_stats() -> dict:
+    """Nearest-neighbour index size, hit rate and how often hits were reused or adapted."""
+    stats = _neighbours.stats()
+    stats["reused"] = NEIGHBOURS_SERVED.value(mode="reuse")
+    stats["templated"] = NEIGHBOURS_SERVED.value(mode="template")
+    return stats
+
+
+def get_coalescing_stats() -> dict:
+    """How many analysis requests were coalesced onto an identical in-flight one."""
+    return _in_flight.stats()
+
+def get_cache_stats() -> dict:
+    """Hit and miss counts for the analysis result cache."""
+    return _analysis_cache.stats()
 
 def get_mistral_analysis(text: str) -> str:
     """Get raw analysis from Mistral AI."""
     try:
-        api_key = os.getenv("MISTRAL_API_KEY")
-        if not api_key:
-            raise ValueError("MISTRAL_API_KEY not found in environment variables")
-            
-        client = MistralClient(api_key=api_key)
+        client = get_shared_client()
         messages = [
             ChatMessage(role="system", content="You are an insightful personality analyst."),
             ChatMessage(role="user", content=text)
         ]
         
-        response = client.chat(
-            model="mistral-medium",  # Changed from tiny to medium for better analysis
-            messages=messages,
-            temperature=0.7,
-            max_tokens=500
-        )
+        with _track_request():
+            response = client.chat(
+                model="mistral-medium",  # Changed from tiny to medium for better analysis
+                messages=messages,
+                temperature=0.7,
+                max_tokens=500
+            )
         
         return response.choices[0].message.content
     except Exception as e:
@@ -0,0 +1,427 @@
+"""
+Persistent analysis results shared by every app process.
+
+    python result_store.py info [--store URL]
+    python result_store.py export [--store URL] [--prompt-version V] [--output results.jsonl]
+    python result_store.py import results.jsonl [--store URL]
+    python result_store.py prune [--store URL] [--keep-version V]
+
+Results are keyed by answer fingerprint and prompt version. The store is
+chosen with a URL: ``sqlite:///path/to/results.db`` (the default, a
+SQLite database in WAL mode that any number of processes on a host can
+read while one writes) or ``dir:///path`` (one JSON file per result, the
+old ANALYSIS_CACHE_DIR layout). Other backends can be added with
+``register_backend``.
+
+``export`` writes one JSON line per stored result and ``import`` loads such
+a file, keeping whichever copy of a result is newer, so a new replica can
+be warmed from an existing one before it takes traffic.
+"""
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, Optional
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+from settings import load_env
+
+load_env()
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_STORE_URL = f"sqlite:///{os.path.join(ROOT, 'results.db')}"
+# ANALYSIS_CACHE_DIR predates the store and still selects the directory backend
+_legacy_dir = os.getenv("ANALYSIS_CACHE_DIR")
+RESULT_STORE_URL = os.getenv("RESULT_STORE", f"dir:///{_legacy_dir}" if _legacy_dir else DEFAULT_STORE_URL)
+RESULT_STORE_BUSY_TIMEOUT = float(os.getenv("RESULT_STORE_BUSY_TIMEOUT", "5"))
+# Idle SQLite connections kept open for reuse; busier moments open (and then close) extra ones
+RESULT_STORE_POOL_SIZE = int(os.getenv("RESULT_STORE_POOL_SIZE", "4"))
+
+IMPORT_BATCH_SIZE = 500
+
+
+class ResultStore(ABC):
+    """
+    Interface of a persistent result store.
+
+    A row is ``{"fingerprint", "prompt_version", "result", "created_at",
+    "expires_at"}``; ``export`` yields rows in that shape and ``import_rows``
+    accepts them.
+    """
+
+    url = ""
+
+    @abstractmethod
+    def get(self, fingerprint: str, prompt_version: str) -> Optional[dict]:
+        """The stored result, or None if there is none or it has expired."""
+
+    @abstractmethod
+    def put(self, fingerprint: str, prompt_version: str, result: dict, ttl_seconds: float):
+        """Store a result for ``ttl_seconds``, replacing any older copy."""
+
+    @abstractmethod
+    def export(self, prompt_version: Optional[str] = None) -> Iterator[dict]:
+        """Every live row, optionally only those of one prompt version."""
+
+    @abstractmethod
+    def import_rows(self, rows: Iterable[dict]) -> int:
+        """Store the rows, keeping existing entries that are newer; returns how many were written."""
+
+    @abstractmethod
+    def prune(self, keep_version: Optional[str] = None) -> int:
+        """Delete expired rows, and rows of other prompt versions if ``keep_version`` is given."""
+
+    @abstractmethod
+    def stats(self) -> dict:
+        """Backend name and entry counts."""
+
+    def close(self):
+        pass
+
+
+class SQLiteResultStore(ResultStore):
+    """
+    Results in one SQLite database in WAL mode.
+
+    Readers never block each other or the writer, so every process and
+    thread can look results up concurrently; writers wait up to
+    RESULT_STORE_BUSY_TIMEOUT seconds for the write lock. Every operation
+    borrows a connection from a small pool, so concurrent lookups still
+    run side by side, and at most ``pool_size`` idle connections stay
+    open however many threads (Streamlit starts one per rerun) use the
+    store.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS results (
+            fingerprint TEXT NOT NULL,
+            prompt_version TEXT NOT NULL,
+            result TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            expires_at REAL NOT NULL,
+            PRIMARY KEY (fingerprint, prompt_version)
+        ) WITHOUT ROWID
+    """
+    UPSERT = """
+        INSERT INTO results (fingerprint, prompt_version, result, created_at, expires_at)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (fingerprint, prompt_version) DO UPDATE SET
+            result = excluded.result, created_at = excluded.created_at, expires_at = excluded.expires_at
+        WHERE excluded.created_at > results.created_at
+    """
+
+    def __init__(self, path: str, busy_timeout: float = RESULT_STORE_BUSY_TIMEOUT,
+                 pool_size: int = RESULT_STORE_POOL_SIZE):
+        self.path = path
+        self.url = f"sqlite:///{path}"
+        self.busy_timeout = busy_timeout
+        self.pool_size = pool_size
+        self._idle = []
+        self._closed = False
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(self.SCHEMA)
+            conn.commit()
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout, check_same_thread=False)
+        # WAL only needs a sync at checkpoints; a crash can lose the last
+        # few results but never corrupts the database
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a pooled connection for one operation."""
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            conn = self._open()
+        try:
+            yield conn
+        finally:
+            with self._lock:
+                if not self._closed and len(self._idle) < self.pool_size:
+                    self._idle.append(conn)
+                    conn = None
+            if conn is not None:
+                conn.close()
+
+    def get(self, fingerprint: str, prompt_version: str) -> Optional[dict]:
+        with self._connection() as conn:
+            row = conn.execute(
+                "SELECT result FROM results WHERE fingerprint = ? AND prompt_version = ? AND expires_at > ?",
+                (fingerprint, prompt_version, time.time()),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, fingerprint: str, prompt_version: str, result: dict, ttl_seconds: float):
+        now = time.time()
+        with self._connection() as conn, conn:
+            conn.execute(self.UPSERT, (fingerprint, prompt_version,
+                                       json.dumps(result, ensure_ascii=False), now, now + ttl_seconds))
+
+    def export(self, prompt_version: Optional[str] = None) -> Iterator[dict]:
+        query = "SELECT fingerprint, prompt_version, result, created_at, expires_at FROM results WHERE expires_at > ?"
+        params = [time.time()]
+        if prompt_version is not None:
+            query += " AND prompt_version = ?"
+            params.append(prompt_version)
+        with self._connection() as conn:
+            for fingerprint, version, result, created_at, expires_at in conn.execute(query, params):
+                yield {"fingerprint": fingerprint, "prompt_version": version, "result": json.loads(result),
+                       "created_at": created_at, "expires_at": expires_at}
+
+    def import_rows(self, rows: Iterable[dict]) -> int:
+        with self._connection() as conn:
+            return self._import(conn, rows)
+
+    def _import(self, conn: sqlite3.Connection, rows: Iterable[dict]) -> int:
+        now = time.time()
+        written = 0
+        batch = []
+
+        def flush():
+            nonlocal written
+            with conn:
+                before = conn.total_changes
+                conn.executemany(self.UPSERT, batch)
+                written += conn.total_changes - before
+            batch.clear()
+
+        for row in rows:
+            if row["expires_at"] <= now:
+                continue
+            batch.append((row["fingerprint"], row["prompt_version"],
+                          json.dumps(row["result"], ensure_ascii=False),
+                          row["created_at"], row["expires_at"]))
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                flush()
+        if batch:
+            flush()
+        return written
+
+    def prune(self, keep_version: Optional[str] = None) -> int:
+        with self._connection() as conn, conn:
+            if keep_version is None:
+                cursor = conn.execute("DELETE FROM results WHERE expires_at <= ?", (time.time(),))
+            else:
+                cursor = conn.execute("DELETE FROM results WHERE expires_at <= ? OR prompt_version != ?",
+                                      (time.time(), keep_version))
+        return cursor.rowcount
+
+    def stats(self) -> dict:
+        with self._connection() as conn:
+            by_version = dict(conn.execute(
+                "SELECT prompt_version, COUNT(*) FROM results WHERE expires_at > ? GROUP BY prompt_version",
+                (time.time(),),
+            ).fetchall())
+        return {
+            "backend": "sqlite",
+            "entries": sum(by_version.values()),
+            "entries_by_prompt_version": by_version,
+            "bytes": os.path.getsize(self.path) if os.path.exists(self.path) else 0,
+        }
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+class DirectoryResultStore(ResultStore):
+    """One JSON file per result in a directory, written atomically."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.url = f"dir:///{path}"
+
+    def _file(self, fingerprint: str) -> str:
+        # The fingerprint already covers the prompt version
+        return os.path.join(self.path, f"{fingerprint}.json")
+
+    def _read(self, file_path: str) -> Optional[dict]:
+        try:
+            with open(file_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, fingerprint: str, entry: dict):
+        os.makedirs(self.path, exist_ok=True)
+        tmp_path = f"{self._file(fingerprint)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, self._file(fingerprint))
+
+    def _entries(self) -> Iterator[tuple]:
+        try:
+            names = os.listdir(self.path)
+        except OSError:
+            return
+        for name in names:
+            if name.endswith(".json"):
+                entry = self._read(os.path.join(self.path, name))
+                if entry is not None:
+                    yield name[:-len(".json")], entry
+
+    def get(self, fingerprint: str, prompt_version: str) -> Optional[dict]:
+        entry = self._read(self._file(fingerprint))
+        if entry is None or entry.get("expires_at", 0) < time.time():
+            return None
+        # Files written before the store existed carry no version
+        if entry.get("prompt_version", prompt_version) != prompt_version:
+            return None
+        return entry.get("result")
+
+    def put(self, fingerprint: str, prompt_version: str, result: dict, ttl_seconds: float):
+        now = time.time()
+        self._write(fingerprint, {"prompt_version": prompt_version, "created_at": now,
+                                  "expires_at": now + ttl_seconds, "result": result})
+
+    def export(self, prompt_version: Optional[str] = None) -> Iterator[dict]:
+        now = time.time()
+        for fingerprint, entry in self._entries():
+            version = entry.get("prompt_version")
+            if entry.get("expires_at", 0) <= now or version is None:
+                continue
+            if prompt_version is not None and version != prompt_version:
+                continue
+            yield {"fingerprint": fingerprint, "prompt_version": version, "result": entry["result"],
+                   "created_at": entry.get("created_at", 0.0), "expires_at": entry["expires_at"]}
+
+    def import_rows(self, rows: Iterable[dict]) -> int:
+        now = time.time()
+        written = 0
+        for row in rows:
+            if row["expires_at"] <= now:
+                continue
+            existing = self._read(self._file(row["fingerprint"]))
+            if existing is not None and existing.get("created_at", 0.0) > row["created_at"]:
+                continue
+            self._write(row["fingerprint"], {key: row[key] for key in
+                                             ("prompt_version", "created_at", "expires_at", "result")})
+            written += 1
+        return written
+
+    def prune(self, keep_version: Optional[str] = None) -> int:
+        now = time.time()
+        removed = 0
+        for fingerprint, entry in list(self._entries()):
+            stale = keep_version is not None and entry.get("prompt_version") != keep_version
+            if entry.get("expires_at", 0) <= now or stale:
+                try:
+                    os.remove(self._file(fingerprint))
+                    removed += 1
+                except OSError:
+                    pass
+        return removed
+
+    def stats(self) -> dict:
+        by_version = {}
+        for row in self.export():
+            by_version[row["prompt_version"]] = by_version.get(row["prompt_version"], 0) + 1
+        return {"backend": "dir", "entries": sum(by_version.values()), "entries_by_prompt_version": by_version}
+
+
+_backends: Dict[str, Callable[[str], ResultStore]] = {
+    "sqlite": SQLiteResultStore,
+    "dir": DirectoryResultStore,
+}
+
+
+def register_backend(scheme: str, factory: Callable[[str], ResultStore]):
+    """Make ``<scheme>:///<location>`` URLs open a store built by ``factory(location)``."""
+    _backends[scheme] = factory
+
+
+def open_result_store(url: str) -> Optional[ResultStore]:
+    """Open the store a URL names; ``off`` (or an empty URL) means no store."""
+    if not url or url.lower() in ("off", "none", "0"):
+        return None
+    scheme, sep, location = url.partition(":///")
+    if not sep:
+        # A bare path is a SQLite database
+        scheme, location = "sqlite", url
+    if scheme not in _backends:
+        raise ValueError(f"Unknown result store backend '{scheme}' (known: {', '.join(sorted(_backends))})")
+    # As with SQLAlchemy URLs, sqlite:///results.db is relative and sqlite:////srv/results.db absolute
+    return _backends[scheme](os.path.expanduser(location))
+
+
+_default_store = None
+_default_store_opened = False
+_default_store_lock = threading.Lock()
+
+
+def get_result_store() -> Optional[ResultStore]:
+    """The store configured by RESULT_STORE, opened on first use; None if it is off or can't be opened."""
+    global _default_store, _default_store_opened
+    with _default_store_lock:
+        if not _default_store_opened:
+            _default_store_opened = True
+            try:
+                _default_store = open_result_store(RESULT_STORE_URL)
+            except (OSError, ValueError, sqlite3.Error) as e:
+                print(f"Result store unavailable, continuing without it: {str(e)}")
+        return _default_store
+
+
+def read_jsonl(path: str) -> Iterator[dict]:
+    with (sys.stdin if path == "-" else open(path, encoding="utf-8")) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--store", default=RESULT_STORE_URL, help="store URL (default: RESULT_STORE)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("info", help="count the stored results")
+    export_parser = commands.add_parser("export", help="write every live result as JSON lines")
+    export_parser.add_argument("--prompt-version", help="only results of this prompt version")
+    export_parser.add_argument("--output", default="-", help="file to write (default: stdout)")
+    import_parser = commands.add_parser("import", help="load results exported from another store")
+    import_parser.add_argument("input", help="JSONL file written by export ('-' for stdin)")
+    prune_parser = commands.add_parser("prune", help="delete expired results")
+    prune_parser.add_argument("--keep-version", help="also delete results of every other prompt version")
+    args = parser.parse_args()
+
+    store = open_result_store(args.store)
+    if store is None:
+        parser.error("no result store configured")
+    if args.command == "info":
+        print(json.dumps({"url": store.url, **store.stats()}, indent=2))
+    elif args.command == "export":
+        count = 0
+        out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+        try:
+            for row in store.export(args.prompt_version):
+                out.write(json.dumps(row, ensure_ascii=False) + "\n")
+                count += 1
+        finally:
+            if out is not sys.stdout:
+                out.close()
+        print(f"Exported {count} results from {store.url}", file=sys.stderr)
+    elif args.command == "import":
+        started = time.perf_counter()
+        written = store.import_rows(read_jsonl(args.input))
+        print(f"Imported {written} results into {store.url} in {time.perf_counter() - started:.2f}s")
+    else:
+        print(f"Removed {store.prune(args.keep_version)} results from {store.url}")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
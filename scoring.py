@@ -0,0 +1,224 @@
+from typing import Dict, Optional
+import numpy as np
+
+from question_bank import QUESTION_BANK_PATH, get_question_bank
+
+# MBTI axes as (first letter, second letter, label). Scores are the percentage
+# leaning towards the first letter; an exact 50 is a tie, broken by
+# tiebreak_scores() (and only falls to the second letter if no answer leans).
+AXES = (
+    ("E", "I", "Extraversion-Introversion"),
+    ("N", "S", "Intuition-Sensing"),
+    ("T", "F", "Thinking-Feeling"),
+    ("J", "P", "Judging-Perceiving"),
+)
+
+# Axis weights (E, N, T, J) for every option of the fixed quiz (app.QUESTIONS),
+# in the same order. Positive values lean towards the first letter of the axis.
+_bank = get_question_bank()
+if _bank.axes != [first for first, _, _ in AXES]:
+    raise ValueError(f"{QUESTION_BANK_PATH}: axes must be {[first for first, _, _ in AXES]}")
+OPTION_WEIGHTS = [question["weights"] for question in _bank.fixed_quiz]
+FIXED_QUESTION_IDS = [question["id"] for question in _bank.fixed_quiz]
+
+POLE_NAMES = {
+    "E": "Extraversion", "I": "Introversion",
+    "N": "Intuition", "S": "Sensing",
+    "T": "Thinking", "F": "Feeling",
+    "J": "Judging", "P": "Perceiving",
+}
+
+SKIPPED = -1  # option index for an unanswered question
+
+
+def build_weight_matrix(option_weights) -> np.ndarray:
+    """
+    Turn per-option weights into a (questions, options + 1, axes) matrix.
+
+    The extra all-zero option row at the end means an index of -1 (a skipped
+    question) contributes nothing.
+    """
+    num_options = max(len(options) for options in option_weights)
+    matrix = np.zeros((len(option_weights), num_options + 1, len(AXES)), dtype=np.float32)
+    for q, options in enumerate(option_weights):
+        for o, weights in enumerate(options):
+            matrix[q, o] = weights
+    return matrix
+
+
+WEIGHT_MATRIX = build_weight_matrix(OPTION_WEIGHTS)
+
+
+def axis_norms(weight_matrix: np.ndarray) -> np.ndarray:
+    """Largest possible absolute score per axis, used to scale raw scores to percentages."""
+    norms = np.abs(weight_matrix).max(axis=1).sum(axis=0)
+    return np.where(norms > 0, norms, 1)
+
+
+WEIGHT_NORMS = axis_norms(WEIGHT_MATRIX)
+
+# All 16 types indexed by a 4-bit code (bit set = first letter of that axis)
+TYPE_TABLE = np.array([
+    "".join(first if code & (1 << (len(AXES) - 1 - axis)) else second
+            for axis, (first, second, _) in enumerate(AXES))
+    for code in range(2 ** len(AXES))
+])
+
+
+def is_fixed_quiz(questions) -> bool:
+    """Whether ``questions`` is the fixed quiz that WEIGHT_MATRIX was built for."""
+    if len(questions) != WEIGHT_MATRIX.shape[0]:
+        return False
+    return all(q.get("id", item_id) == item_id for q, item_id in zip(questions, FIXED_QUESTION_IDS))
+
+
+def option_indices(answers: Dict[int, str], questions) -> Optional[np.ndarray]:
+    """Option index per question (SKIPPED if unanswered), or None for an answer that isn't an option."""
+    indices = np.full(len(questions), SKIPPED, dtype=np.int8)
+    for question_num, answer in answers.items():
+        try:
+            indices[question_num] = questions[question_num]['options'].index(answer)
+        except (IndexError, ValueError):
+            return None
+    return indices
+
+
+def encode_answers(answers: Dict[int, str], questions) -> Optional[np.ndarray]:
+    """
+    Map answers to the fixed quiz, keyed by question number, to option indices.
+
+    Unanswered questions become SKIPPED. Returns None if the questions aren't
+    the fixed quiz or an answer isn't one of its options.
+    """
+    if not is_fixed_quiz(questions):
+        return None
+    return option_indices(answers, questions)
+
+
+def question_weight_matrix(questions) -> Optional[np.ndarray]:
+    """
+    The weight matrix for any question list: WEIGHT_MATRIX for the fixed
+    quiz, else built from the questions' own "weights" (as question bank
+    items carry). None if some question has no weights.
+    """
+    if is_fixed_quiz(questions):
+        return WEIGHT_MATRIX
+    if not questions or any("weights" not in q for q in questions):
+        return None
+    return build_weight_matrix([q["weights"] for q in questions])
+
+
+def answer_code(indices) -> Optional[int]:
+    """
+    Pack a complete answer vector into one integer, two bits (a base-4 digit)
+    per question with the first question most significant.
+
+    Returns None if a question was skipped or has more than four options.
+    """
+    indices = np.asarray(indices, dtype=np.int64)
+    if indices.size == 0 or (indices < 0).any() or (indices > 3).any():
+        return None
+    return int(indices @ (4 ** np.arange(len(indices) - 1, -1, -1)))
+
+
+def decode_answer_code(code: int, num_questions: int) -> np.ndarray:
+    """Inverse of answer_code()."""
+    return ((code // 4 ** np.arange(num_questions - 1, -1, -1)) % 4).astype(np.int8)
+
+
+def score_indices(indices, weight_matrix: np.ndarray = WEIGHT_MATRIX,
+                  norms: Optional[np.ndarray] = None,
+                  chunk_size: int = 1_000_000) -> np.ndarray:
+    """
+    Score option-index vectors in one batched pass.
+
+    ``indices`` is shaped (questions,) or (n, questions). Returns the
+    percentage leaning towards the first letter of each axis, shaped (4,) or
+    (n, 4). Large batches are processed in chunks so memory stays at
+    O(chunk_size * axes) regardless of the number of answer vectors.
+    """
+    if norms is None:
+        norms = WEIGHT_NORMS if weight_matrix is WEIGHT_MATRIX else axis_norms(weight_matrix)
+    indices = np.asarray(indices)
+    if indices.ndim == 1:
+        raw = weight_matrix[np.arange(weight_matrix.shape[0]), indices].sum(axis=0)
+        return np.clip(50 + 50 * raw / norms, 0, 100)
+
+    batch = indices
+    percentages = np.empty((batch.shape[0], weight_matrix.shape[2]), dtype=np.float32)
+    for start in range(0, batch.shape[0], chunk_size):
+        chunk = batch[start:start + chunk_size]
+        raw = np.zeros((chunk.shape[0], weight_matrix.shape[2]), dtype=np.float32)
+        for q in range(weight_matrix.shape[0]):
+            raw += weight_matrix[q, chunk[:, q]]
+        percentages[start:start + chunk_size] = 50 + 50 * raw / norms
+    np.clip(percentages, 0, 100, out=percentages)
+    return percentages
+
+
+def tiebreak_scores(indices, weight_matrix: np.ndarray = WEIGHT_MATRIX) -> np.ndarray:
+    """
+    Direction of the last answered question that leans on each axis: +1 for
+    the first letter, -1 for the second, 0 if no answer leans either way.
+
+    Shaped like score_indices()' result. type_letters() uses it for axes
+    that score exactly 50, so a tie follows the most recent answer rather
+    than always going to the second letter.
+    """
+    indices = np.asarray(indices)
+    if indices.ndim == 1:
+        # Last question first, so argmax finds the last non-zero weight (or a zero if none)
+        rows = weight_matrix[np.arange(weight_matrix.shape[0]), indices][::-1]
+        return np.sign(rows[(rows != 0).argmax(axis=0), np.arange(rows.shape[1])]).astype(np.int8)
+
+    tiebreak = np.zeros((indices.shape[0], weight_matrix.shape[2]), dtype=np.int8)
+    for q in range(weight_matrix.shape[0]):
+        lean = np.sign(weight_matrix[q, indices[:, q]]).astype(np.int8)
+        tiebreak = np.where(lean != 0, lean, tiebreak)
+    return tiebreak
+
+
+def type_letters(percentages, tiebreak=None) -> np.ndarray:
+    """
+    Turn axis percentages into MBTI type strings (one per row for batches).
+
+    An axis at exactly 50 goes to the first letter if ``tiebreak`` (from
+    tiebreak_scores()) is positive there, else to the second.
+    """
+    percentages = np.asarray(percentages)
+    tiebreak = np.zeros(percentages.shape, dtype=np.int8) if tiebreak is None else np.asarray(tiebreak)
+    leans_first = np.where(percentages == 50, tiebreak > 0, percentages > 50)
+    weights = 1 << np.arange(len(AXES) - 1, -1, -1)
+    return TYPE_TABLE[leans_first.astype(np.int64) @ weights]
+
+
+def score_answers(answers: Dict[int, str], questions) -> Optional[dict]:
+    """
+    Score a single answer set locally.
+
+    Works for the fixed quiz and for any set of question bank items (as the
+    adaptive quiz asks). Returns the MBTI type and a label -> percentage
+    mapping for each axis, or None if the answers can't be scored.
+    """
+    weight_matrix = question_weight_matrix(questions)
+    if weight_matrix is None:
+        return None
+    indices = option_indices(answers, questions)
+    if indices is None:
+        return None
+    percentages = score_indices(indices, weight_matrix)
+    tiebreak = tiebreak_scores(indices, weight_matrix) if (percentages == 50).any() else None
+    return {
+        "type": str(type_letters(percentages, tiebreak)),
+        "axes": {label: round(float(pct), 1) for (_, _, label), pct in zip(AXES, percentages)},
+    }
+
+
+def pole_scores(axis_scores: Dict[str, float]) -> Dict[str, float]:
+    """Expand axis percentages into a score for each of the eight poles, in axis order."""
+    poles = {}
+    for first, second, label in AXES:
+        pct = axis_scores[label]
+        poles[POLE_NAMES[first]] = pct
+        poles[POLE_NAMES[second]] = round(100 - pct, 1)
+    return poles
@@ -0,0 +1,15 @@
+import threading
+
+_env_loaded = False
+_env_lock = threading.Lock()
+
+
+def load_env():
+    """Load the .env file into the environment once per process; later calls are free."""
+    global _env_loaded
+    with _env_lock:
+        if _env_loaded:
+            return
+        from dotenv import load_dotenv
+        load_dotenv()
+        _env_loaded = True
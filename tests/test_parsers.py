@@ -0,0 +1,64 @@
+import json
+
+import pytest
+
+from bench_parsers import legacy_parse, make_response
+from quiz_agent import StreamingResponseParser, parse_json_response, parse_response_text
+
+EDGE_CASES = {
+    "no_headers": "Just a paragraph the model wrote without any headers.\nAnd a second line.",
+    "bullets_only": "TRAITS:\n- Curious\n• Loyal\n- \nSTRENGTHS:\n- Listening\nGROWTH_AREAS:\n• Saying no",
+    "inline_lists": "TITLE: The Spark\nTYPE: ENFP\nTRAITS: warm, curious , bold\nSTRENGTHS: energy\nGROWTH_AREAS:",
+    "blank_lines": "\n\nTITLE:   Spaced Out  \n\nDESCRIPTION:\n\nFirst.\n\n\nSecond.\n\nEMOJI: 🌙\n",
+    "headers_in_text": "DESCRIPTION:\nYou love a good TITLE: reveal.\nTYPE: INFJ\nMore description after the type.",
+    "empty": "",
+}
+
+
+def responses():
+    cases = {name: make_response(paragraphs, items)["text"]
+             for name, (paragraphs, items) in (("realistic", (6, 5)), ("large", (200, 100)))}
+    cases.update(EDGE_CASES)
+    return cases
+
+
+@pytest.mark.parametrize("name,text", responses().items())
+def test_single_pass_parser_matches_legacy(name, text):
+    assert parse_response_text(text) == legacy_parse(text)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 10_000])
+@pytest.mark.parametrize("name,text", responses().items())
+def test_streaming_parser_matches_batch(name, text, chunk_size):
+    parser = StreamingResponseParser()
+    for start in range(0, len(text), chunk_size):
+        parser.feed(text[start:start + chunk_size])
+    assert parser.finish() == parse_response_text(text)
+
+
+def test_streaming_snapshot_shows_the_description_being_written():
+    parser = StreamingResponseParser()
+    assert parser.feed("TITLE: The Spark\nDESCRIPTION:\nHalf a sent") == {"title", "description"}
+    assert parser.snapshot()["description"] == "Half a sent"
+    # A pending line that could still become a header is held back
+    parser.feed("ence.\nTRA")
+    assert parser.snapshot()["description"] == "Half a sentence."
+
+
+def test_json_parser_matches_text_parser():
+    response = make_response(6, 5)
+    from_json, from_text = parse_json_response(response["json"]), parse_response_text(response["text"])
+    # The text parser strips every line; JSON strings are only stripped at the ends
+    paragraphs = [[p.strip() for p in result.pop("description").split("\n\n")] for result in (from_json, from_text)]
+    assert paragraphs[0] == paragraphs[1]
+    assert from_json == from_text
+
+
+def test_json_parser_fills_defaults_and_rejects_non_objects():
+    result = parse_json_response(json.dumps({"title": "  Spaced  ", "traits": ["a", "", 3]}))
+    defaults = parse_response_text("")
+    assert result["title"] == "Spaced"
+    assert result["traits"] == ["a"]
+    assert result["strengths"] == defaults["strengths"]
+    assert parse_json_response("TITLE: not json") is None
+    assert parse_json_response("[1, 2]") is None
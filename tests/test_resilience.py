@@ -0,0 +1,137 @@
+import threading
+import time
+
+import pytest
+
+from quiz_agent import CircuitBreaker, RateLimiter
+
+
+def wait_for(condition, timeout: float = 2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached in time"
+        time.sleep(0.005)
+
+
+def drained_limiter(requests_per_second: float, **kwargs) -> RateLimiter:
+    """A limiter whose request bucket is empty, so every caller has to queue."""
+    limiter = RateLimiter(requests_per_second=requests_per_second, tokens_per_minute=1e6, **kwargs)
+    limiter.requests.level = 0
+    return limiter
+
+
+def queue_in_background(limiter: RateLimiter, tokens: int = 10, timeout: float = None):
+    """Start acquire() on a thread; returns (thread, list that receives the ticket once queued)."""
+    queued = []
+    thread = threading.Thread(target=limiter.acquire, args=(tokens, timeout),
+                              kwargs={"on_queue": queued.append}, daemon=True)
+    thread.start()
+    wait_for(lambda: queued)
+    return thread, queued
+
+
+def test_queue_positions_are_first_in_first_out():
+    limiter = drained_limiter(4, max_queue=10, max_wait=5)
+    first_thread, (first,) = queue_in_background(limiter)
+    second_thread, (second,) = queue_in_background(limiter)
+    assert (first.position(), second.position()) == (1, 2)
+    assert 0 < first.estimated_wait() < second.estimated_wait()
+
+    first_thread.join(2)
+    assert first.admitted and first.position() == 0
+    assert second.position() == 1
+    second_thread.join(2)
+    assert second.admitted
+    assert limiter.stats()["admitted"] == 2
+
+
+def test_full_queue_and_long_waits_are_rejected_up_front():
+    limiter = drained_limiter(1, max_queue=1, max_wait=5)
+    thread, _ = queue_in_background(limiter)
+    assert limiter.acquire(10).status == "rejected"  # queue full
+    thread.join(2)
+
+    limiter = drained_limiter(1, max_queue=10, max_wait=0.1)
+    started = time.monotonic()
+    ticket = limiter.acquire(10)
+    assert ticket.status == "rejected" and ticket.position() == 0
+    assert time.monotonic() - started < 0.1
+    assert limiter.acquire(10**9, timeout=60).status == "rejected"  # more tokens than a minute holds
+
+
+def test_queued_ticket_times_out_and_leaves_the_queue():
+    limiter = drained_limiter(5, max_queue=10, max_wait=5)
+
+    def stall(ticket):
+        # Once queued, take the budget back so the estimate no longer holds
+        limiter.requests.level -= 10
+
+    started = time.monotonic()
+    ticket = limiter.acquire(10, timeout=0.3, on_queue=stall)
+    assert ticket.status == "timed_out"
+    assert 0.3 <= time.monotonic() - started < 1.5
+    assert ticket.position() == 0
+    assert limiter.stats()["timed_out"] == 1 and limiter.stats()["queued"] == 0
+
+
+def test_settle_refunds_the_unused_estimate():
+    limiter = RateLimiter(requests_per_second=100, tokens_per_minute=1000, max_queue=10, max_wait=5)
+    limiter.tokens.rate = 0  # no refill, so the level shows exactly what is charged
+    ticket = limiter.acquire(400)
+    assert ticket.admitted and limiter.tokens.level == 600
+    limiter.settle(ticket, 150)
+    assert limiter.tokens.level == 850
+    limiter.settle(ticket, 10_000)  # never charges more than was admitted
+    assert limiter.tokens.level == 850
+
+
+@pytest.fixture
+def breaker():
+    return CircuitBreaker(window=10, min_requests=4, failure_rate=0.5, slow_seconds=1.0, cooldown=0.05)
+
+
+def trip(breaker: CircuitBreaker):
+    for _ in range(4):
+        assert breaker.allow()
+        breaker.record(False)
+
+
+def test_breaker_opens_once_enough_calls_fail(breaker):
+    for _ in range(3):
+        breaker.record(False)
+    assert breaker.state == "closed"  # below min_requests
+    breaker.record(True)
+    breaker.record(False)
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    assert breaker.stats()["short_circuited"] == 1
+
+
+def test_half_open_lets_a_single_probe_through(breaker):
+    trip(breaker)
+    time.sleep(0.06)
+    assert breaker.allow() and breaker.state == "half_open"
+    assert not breaker.allow()  # the probe is still in flight
+    breaker.record(True)
+    assert breaker.state == "closed"
+    assert breaker.stats()["window_failure_rate"] == 0
+
+
+def test_failed_probe_reopens_and_cancel_frees_the_probe(breaker):
+    trip(breaker)
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.cancel()
+    assert breaker.allow()  # a cancelled probe never went upstream
+    breaker.record(False)
+    assert breaker.state == "open"
+    assert breaker.stats()["opened"] == 2
+
+
+def test_only_slow_first_tokens_count_as_failures(breaker):
+    for _ in range(4):
+        breaker.record(True)  # blocking calls: no latency, judged on success alone
+    assert breaker.state == "closed"
+    for _ in range(4):
+        breaker.record(True, latency=5.0)  # streams slower than slow_seconds to the first token
+    assert breaker.state == "open"
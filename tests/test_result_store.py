@@ -0,0 +1,84 @@
+import threading
+
+import pytest
+
+from result_store import DirectoryResultStore, SQLiteResultStore, open_result_store
+
+RESULT = {"title": "The Midnight Strategist", "type": "INFJ", "traits": ["Quiet", "Loyal"]}
+
+
+@pytest.fixture(params=["sqlite", "dir"])
+def store(request, tmp_path):
+    location = tmp_path / ("results.db" if request.param == "sqlite" else "results")
+    store = open_result_store(f"{request.param}:///{location}")
+    yield store
+    store.close()
+
+
+def test_urls_pick_the_backend(tmp_path):
+    assert isinstance(open_result_store(f"sqlite:///{tmp_path / 'a.db'}"), SQLiteResultStore)
+    assert isinstance(open_result_store(f"dir:///{tmp_path / 'a'}"), DirectoryResultStore)
+    assert isinstance(open_result_store(str(tmp_path / "b.db")), SQLiteResultStore)
+    assert open_result_store("off") is None
+    with pytest.raises(ValueError):
+        open_result_store("redis:///somewhere")
+
+
+def test_put_get_round_trip(store):
+    store.put("abc", "1", RESULT, ttl_seconds=60)
+    assert store.get("abc", "1") == RESULT
+    assert store.get("abc", "2") is None
+    assert store.get("missing", "1") is None
+
+
+def test_expired_results_are_not_served_and_get_pruned(store):
+    store.put("old", "1", RESULT, ttl_seconds=-1)
+    store.put("new", "1", RESULT, ttl_seconds=60)
+    assert store.get("old", "1") is None
+    assert store.prune() == 1
+    assert store.stats()["entries"] == 1
+
+
+def test_prune_keeps_only_the_current_prompt_version(store):
+    store.put("a", "1", RESULT, ttl_seconds=60)
+    store.put("b", "2", RESULT, ttl_seconds=60)
+    assert store.prune(keep_version="2") == 1
+    assert store.stats()["entries_by_prompt_version"] == {"2": 1}
+
+
+@pytest.mark.parametrize("target_backend", ["sqlite", "dir"])
+def test_export_import_round_trip_across_backends(store, tmp_path, target_backend):
+    store.put("a", "1", RESULT, ttl_seconds=60)
+    store.put("b", "2", dict(RESULT, type="ENFP"), ttl_seconds=60)
+    target = open_result_store(f"{target_backend}:///{tmp_path / 'target'}")
+    try:
+        assert target.import_rows(store.export()) == 2
+        assert target.get("a", "1") == RESULT
+        assert target.get("b", "2")["type"] == "ENFP"
+        assert sorted(row["fingerprint"] for row in target.export(prompt_version="1")) == ["a"]
+    finally:
+        target.close()
+
+
+def test_import_keeps_the_newer_copy(store):
+    store.put("a", "1", RESULT, ttl_seconds=60)
+    row = next(store.export())
+    older = dict(row, result=dict(RESULT, title="Older"), created_at=row["created_at"] - 100)
+    store.import_rows([older])
+    assert store.get("a", "1") == RESULT
+    newer = dict(row, result=dict(RESULT, title="Newer"), created_at=row["created_at"] + 100)
+    store.import_rows([newer])
+    assert store.get("a", "1")["title"] == "Newer"
+
+
+def test_sqlite_pool_is_bounded_across_threads(tmp_path):
+    store = SQLiteResultStore(str(tmp_path / "results.db"), pool_size=2)
+    store.put("a", "1", RESULT, ttl_seconds=60)
+    threads = [threading.Thread(target=store.get, args=("a", "1")) for _ in range(50)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(store._idle) <= 2
+    store.close()
+    assert store._idle == []
@@ -0,0 +1,74 @@
+import numpy as np
+
+from scoring import (SKIPPED, TYPE_TABLE, WEIGHT_MATRIX, build_weight_matrix, decode_answer_code,
+                     answer_code, score_answers, score_indices, tiebreak_scores, type_letters)
+from app import QUESTIONS
+
+NUM_QUESTIONS = WEIGHT_MATRIX.shape[0]
+
+
+def random_indices(count: int, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).integers(SKIPPED, 4, (count, NUM_QUESTIONS)).astype(np.int8)
+
+
+def test_batched_scores_match_single_vectors_and_chunking():
+    batch = random_indices(500)
+    single = np.array([score_indices(indices) for indices in batch])
+    np.testing.assert_allclose(score_indices(batch), single, rtol=1e-6)
+    np.testing.assert_allclose(score_indices(batch, chunk_size=7), single, rtol=1e-6)
+
+
+def test_scores_are_centred_and_skips_count_for_nothing():
+    assert (score_indices(np.full(NUM_QUESTIONS, SKIPPED, dtype=np.int8)) == 50).all()
+    scores = score_indices(random_indices(2000))
+    assert ((scores >= 0) & (scores <= 100)).all()
+
+
+def test_every_fixed_question_is_balanced_on_every_axis():
+    # Each axis is symmetric: its options' weights sum to zero for every question
+    assert not WEIGHT_MATRIX.sum(axis=1).any()
+
+
+def test_tiebreak_follows_the_last_answer_that_leans():
+    weights = build_weight_matrix([
+        [[1, 0, 0, 0], [-1, 0, 0, 0]],
+        [[-2, 0, 0, 0], [0, 0, 0, 0]],
+    ])
+    assert tiebreak_scores([0, 0], weights).tolist() == [-1, 0, 0, 0]
+    assert tiebreak_scores([0, 1], weights).tolist() == [1, 0, 0, 0]
+    assert tiebreak_scores([SKIPPED, 1], weights).tolist() == [0, 0, 0, 0]
+
+
+def test_batched_tiebreak_matches_single_vectors():
+    batch = random_indices(2000, seed=1)
+    single = np.array([tiebreak_scores(indices) for indices in batch])
+    assert (tiebreak_scores(batch) == single).all()
+
+
+def test_type_letters_break_exact_ties():
+    tied = np.array([50.0, 50.0, 50.0, 50.0])
+    assert str(type_letters(tied)) == "ISFP"
+    assert str(type_letters(tied, np.array([1, -1, 1, 0]))) == "ESTP"
+    # The tie-break only applies to an axis at exactly 50
+    assert str(type_letters(np.array([60.0, 40.0, 50.0, 50.0]), np.array([-1, 1, 1, 1]))) == "ESTJ"
+    batch = type_letters(np.array([tied, tied]), np.array([[1, 1, 1, 1], [-1, -1, -1, -1]]))
+    assert batch.tolist() == ["ENTJ", "ISFP"]
+
+
+def test_type_table_covers_every_type_once():
+    assert len(set(TYPE_TABLE.tolist())) == 16
+
+
+def test_answer_codes_round_trip():
+    indices = np.array([3, 0, 1, 2, 3, 3, 0, 1, 2, 0], dtype=np.int8)[:NUM_QUESTIONS]
+    assert (decode_answer_code(answer_code(indices), NUM_QUESTIONS) == indices).all()
+    assert answer_code(np.array([0, SKIPPED])) is None
+
+
+def test_score_answers_uses_the_tiebreak():
+    answers = {i: q["options"][i % len(q["options"])] for i, q in enumerate(QUESTIONS)}
+    result = score_answers(answers, QUESTIONS)
+    indices = np.array([i % len(q["options"]) for i, q in enumerate(QUESTIONS)])
+    expected = type_letters(score_indices(indices), tiebreak_scores(indices))
+    assert result["type"] == str(expected)
+    assert score_answers({0: "not an option"}, QUESTIONS) is None